@@ -28,6 +28,10 @@ impl SystemConfig {
         Ok(())
     }
 
+    pub fn is_shutdown_requested(&self) -> bool {
+        self.shutdown_signal.load(Ordering::SeqCst)
+    }
+
     pub fn set_shutdown_state(&self, state: ShutdownState) {
         self.shutdown_state.store(state as usize, Ordering::SeqCst);
     }
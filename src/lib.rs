@@ -1,6 +1,7 @@
 pub mod py_modules;
 pub mod utils;
 pub mod py_automation;
+pub mod supervisor;
 pub mod config;
 pub mod platform_specific;
 pub mod errors;
\ No newline at end of file
@@ -1,12 +1,14 @@
 mod py_modules;
 mod utils;
 mod py_automation;
+mod supervisor;
 mod platform_specific;
 mod config;
 mod errors;
 
 use std::fs;
 use std::sync::Arc;
+use std::time::Instant;
 use anyhow::Result;
 use dotenv::dotenv;
 use log::{error, info};
@@ -27,6 +29,10 @@ use crate::py_modules::py_setup::PythonSetup;
 #[allow(unused_imports)]
 use crate::utils::{try_import_package, parse_requirements};
 
+use crate::utils::{
+    fingerprint_path, import_sweep, read_fingerprint, write_fingerprint, StartupTimings,
+};
+
 #[tokio::main]
 async fn main() -> Result<()> {
     env_logger::init();
@@ -67,9 +73,18 @@ async fn main() -> Result<()> {
         }
     });
 
-    // Инициализируем Python окружение
+    let mut timings = StartupTimings::new();
+
+    // Инициализируем Python окружение; если отпечаток окружения совпадает с последним
+    // успешным запуском, установка зависимостей и проверка импортов не блокируют запуск
     let python_setup = PythonSetup::new()?;
-    python_setup.ensure_environment()?;
+    let stored_fingerprint = read_fingerprint();
+    let fast_path = stored_fingerprint.is_some() && python_setup.fingerprint() == stored_fingerprint;
+    if fast_path {
+        info!("Отпечаток окружения не изменился, используется быстрый запуск");
+    }
+    python_setup.ensure_environment(fast_path)?;
+    timings.phase("python_env");
 
     // Создаем директорию для кэша Playwright и проверяем установку
     let playwright_cache = std::env::current_dir()?.join("target").join("playwright-cache");
@@ -89,22 +104,42 @@ async fn main() -> Result<()> {
         }
         Ok(())
     })?;
+    timings.phase("playwright_check");
 
     // Проверяем все необходимые Python импорты
     let required_packages = parse_requirements()?;
-    Python::with_gil(|py| {
-        for package in &required_packages {
-            if let Err(e) = try_import_package(py, package) {
-                error!("Ошибка импорта пакета {}: {}", package, e);
-                return Err(anyhow!("Ошибка импорта: {}", e));
+    if fast_path {
+        // Окружение не изменилось: проверка выполняется в фоне параллельно с логином Telegram
+        tokio::task::spawn_blocking(move || {
+            let started = Instant::now();
+            match import_sweep(&required_packages) {
+                Ok(()) => info!("Фоновая проверка импортов завершена за {:.2}с", started.elapsed().as_secs_f64()),
+                Err(e) => {
+                    error!("Фоновая проверка импортов завершилась ошибкой: {}", e);
+                    // Окружение повреждено: при следующем запуске выполняется полная проверка
+                    if let Ok(path) = fingerprint_path() {
+                        let _ = fs::remove_file(path);
+                    }
+                }
             }
+        });
+    } else {
+        import_sweep(&required_packages)?;
+        timings.phase("import_sweep");
+        match python_setup.fingerprint() {
+            Some(fingerprint) => {
+                if let Err(e) = write_fingerprint(fingerprint) {
+                    error!("Не удалось сохранить отпечаток окружения: {}", e);
+                }
+            }
+            None => error!("Не удалось вычислить отпечаток окружения"),
         }
-        Ok(())
-    })?;
+    }
+    timings.report();
 
     // Запуск автоматизации
     info!("Запуск автоматизации...");
-    if let Err(e) = py_automation::run_automation().await {
+    if let Err(e) = supervisor::supervise(Arc::clone(&config)).await {
         error!("Ошибка автоматизации: {}", e);
         return Err(e);
     }
@@ -1,45 +1,134 @@
 use anyhow::{Result, anyhow};
-use log::{info, error};
+use log::{info, error, warn};
 #[allow(unused_imports)]
 use pyo3::{Python, PyResult, types::IntoPyDict};
-use tokio::time::timeout;
+use std::sync::Arc;
 use std::time::Duration;
+use tokio::time::{interval, sleep, MissedTickBehavior};
 
-pub async fn run_automation() -> Result<()> {
+use crate::config::SystemConfig;
+
+// Интервал проверки состояния автоматизации
+const WATCHDOG_INTERVAL: Duration = Duration::from_secs(5);
+// Время ожидания завершения после запроса отмены, после него процесс завершается
+const CANCEL_GRACE_PERIOD: Duration = Duration::from_secs(30);
+
+/// Максимальное время без heartbeat цикла событий Python (AUTOMATION_HEARTBEAT_TIMEOUT, сек)
+fn heartbeat_timeout() -> f64 {
+    std::env::var("AUTOMATION_HEARTBEAT_TIMEOUT")
+        .ok()
+        .and_then(|value| value.parse::<f64>().ok())
+        .unwrap_or(120.0)
+}
+
+/// Время с последнего heartbeat цикла событий Python (-1, если цикл не запущен)
+fn heartbeat_age() -> Result<f64> {
+    Python::with_gil(|py| -> PyResult<f64> {
+        py.import("runtime_control")?
+            .getattr("heartbeat_age")?
+            .call0()?
+            .extract()
+    })
+    .map_err(|e| anyhow!("Python error: {:?}", e))
+}
+
+/// Кооперативная отмена основной задачи автоматизации
+pub fn request_cancel() -> Result<bool> {
+    Python::with_gil(|py| -> PyResult<bool> {
+        py.import("runtime_control")?
+            .getattr("request_cancel")?
+            .call0()?
+            .extract()
+    })
+    .map_err(|e| anyhow!("Python error: {:?}", e))
+}
+
+/// Выполнение initialize_automation в цикле событий runtime_control (блокирующий вызов)
+fn run_blocking() -> Result<bool> {
+    Python::with_gil(|py| -> PyResult<bool> {
+        let automation_module = py.import("action")?;
+
+        // Передаем функцию initialize_automation без вызова,
+        // корутина создается внутри цикла событий
+        let entrypoint = automation_module.getattr("initialize_automation")?;
+
+        py.import("runtime_control")?
+            .getattr("run")?
+            .call1((entrypoint,))?
+            .extract()
+    })
+    .map_err(|e| anyhow!("Python error: {:?}", e))
+}
+
+pub async fn run_automation(config: Arc<SystemConfig>) -> Result<bool> {
     info!("Запуск автоматизации...");
-    
-    // Создаем Python контекст с таймаутом
-    match timeout(Duration::from_secs(30), async {
-        Python::with_gil(|py| -> PyResult<()> {
-            let automation_module = py.import("action")?;
-            
-            // Вызываем initialize_automation без параметров, 
-            // так как теперь она сама инициализирует логин
-            let coroutine = automation_module
-                .getattr("initialize_automation")?
-                .call0()?;
-            
-            // Запускаем корутину
-            py.import("asyncio")?
-                .getattr("run")?
-                .call1((coroutine,))?;
-            
-            Ok(())
-        })
-    }).await {
-        Ok(result) => match result {
-            Ok(_) => {
-                info!("Автоматизация успешно завершена");
-                Ok(())
-            },
-            Err(e) => {
-                error!("Ошибка при выполнении автоматизации: {:?}", e);
-                Err(anyhow!("Python error: {:?}", e))
+
+    // Python выполняется в отдельном блокирующем потоке, рабочие потоки Tokio остаются свободны.
+    // Цикл событий Python освобождает GIL во время ожидания ввода-вывода,
+    // поэтому watchdog может обращаться к runtime_control параллельно
+    let mut handle = tokio::task::spawn_blocking(run_blocking);
+
+    let mut watchdog = interval(WATCHDOG_INTERVAL);
+    watchdog.set_missed_tick_behavior(MissedTickBehavior::Delay);
+    let timeout = heartbeat_timeout();
+    let mut cancel_requested = false;
+
+    loop {
+        tokio::select! {
+            joined = &mut handle => {
+                return match joined {
+                    Ok(Ok(result)) => {
+                        info!("Автоматизация завершена с результатом: {}", result);
+                        Ok(result)
+                    },
+                    Ok(Err(e)) => {
+                        error!("Ошибка при выполнении автоматизации: {:?}", e);
+                        Err(e)
+                    },
+                    Err(e) => {
+                        error!("Поток автоматизации завершился аварийно: {}", e);
+                        Err(anyhow!("Поток автоматизации завершился аварийно: {}", e))
+                    }
+                };
+            }
+            _ = watchdog.tick(), if !cancel_requested => {
+                let reason = if config.is_shutdown_requested() {
+                    Some("запрошена остановка".to_string())
+                } else {
+                    // Обращение к Python может ждать GIL, поэтому выполняется вне рабочих потоков Tokio
+                    match tokio::task::spawn_blocking(heartbeat_age).await {
+                        Ok(Ok(age)) if age > timeout => Some(format!("нет heartbeat {:.0} сек", age)),
+                        Ok(Ok(_)) => None,
+                        Ok(Err(e)) => {
+                            warn!("Не удалось получить heartbeat автоматизации: {}", e);
+                            None
+                        }
+                        Err(e) => {
+                            warn!("Ошибка потока проверки heartbeat: {}", e);
+                            None
+                        }
+                    }
+                };
+
+                if let Some(reason) = reason {
+                    warn!("Остановка автоматизации: {}", reason);
+                    match tokio::task::spawn_blocking(request_cancel).await {
+                        Ok(Ok(true)) => info!("Запрос отмены передан в цикл событий Python"),
+                        Ok(Ok(false)) => warn!("Цикл событий Python не запущен, отмена не передана"),
+                        Ok(Err(e)) => error!("Ошибка запроса отмены автоматизации: {}", e),
+                        Err(e) => error!("Ошибка потока запроса отмены: {}", e),
+                    }
+                    cancel_requested = true;
+                }
+            }
+            _ = sleep(CANCEL_GRACE_PERIOD), if cancel_requested => {
+                // Поток с циклом событий Python продолжает работать и держит GIL:
+                // перезапуск в том же процессе невозможен, а завершение runtime Tokio
+                // будет бесконечно ждать блокирующую задачу, поэтому процесс завершается явно
+                error!("Автоматизация не завершилась после запроса отмены, принудительное завершение процесса");
+                log::logger().flush();
+                std::process::exit(1);
             }
-        },
-        Err(_) => {
-            error!("Таймаут выполнения автоматизации");
-            Err(anyhow!("Таймаут автоматизации"))
         }
     }
-}
\ No newline at end of file
+}
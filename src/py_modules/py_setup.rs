@@ -6,6 +6,15 @@ use log::{info, error, debug};
 use pyo3::Python;
 use glob::glob;
 
+// Переменные окружения, ограничивающие потоки BLAS/OpenMP (как в resource_config.py)
+const BLAS_ENV_VARS: [&str; 5] = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+];
+
 pub struct PythonSetup {
     venv_path: PathBuf,
     requirements_path: PathBuf,
@@ -20,7 +29,17 @@ impl PythonSetup {
         })
     }
 
-    pub fn ensure_environment(&self) -> Result<()> {
+    /// Отпечаток виртуального окружения (None, если окружение еще не создано)
+    pub fn fingerprint(&self) -> Option<u64> {
+        if !self.venv_path.exists() {
+            return None;
+        }
+        crate::utils::venv_fingerprint(&self.venv_path, &self.requirements_path).ok()
+    }
+
+    /// skip_install - окружение не изменилось с последнего успешного запуска,
+    /// установка зависимостей через pip пропускается
+    pub fn ensure_environment(&self, skip_install: bool) -> Result<()> {
         info!("Проверка Python окружения...");
 
         // Создаем виртуальное окружение, если его нет
@@ -32,6 +51,9 @@ impl PythonSetup {
         let playwright_cache = env::current_dir()?.join("target").join("playwright-cache");
         env::set_var("PLAYWRIGHT_BROWSERS_PATH", playwright_cache.to_str().unwrap());
 
+        // Потоки BLAS ограничиваются до первого импорта numpy
+        self.configure_thread_budget();
+
         // Добавляем окружение Python
         Python::with_gil(|py| {
             let sys = py.import("sys")?;
@@ -45,7 +67,11 @@ impl PythonSetup {
         self.setup_python_paths()?;
         
         // Проверяем и устанавливаем зависимости
-        self.install_dependencies()?;
+        if skip_install {
+            info!("Окружение не изменилось, установка зависимостей пропущена");
+        } else {
+            self.install_dependencies()?;
+        }
 
         // Устанавливаем браузеры Playwright
         self.setup_playwright()?;
@@ -56,6 +82,26 @@ impl PythonSetup {
         Ok(())
     }
 
+    /// Бюджет потоков BLAS/OpenMP на сессию (та же формула, что в ThreadBudget):
+    /// библиотеки читают переменные только при загрузке, поэтому они задаются до импорта numpy
+    fn configure_thread_budget(&self) {
+        let read_number = |name: &str| -> Option<usize> {
+            env::var(name).ok()?.split_whitespace().next()?.parse::<usize>().ok()
+        };
+        let sessions = read_number("BOT_SESSION_COUNT").unwrap_or(1).max(1);
+        let explicit = read_number("BOT_THREADS_PER_SESSION").unwrap_or(0);
+        let cpus = std::thread::available_parallelism().map(|n| n.get()).unwrap_or(1);
+        let threads = if explicit > 0 { explicit } else { (cpus / sessions).max(1) };
+
+        for name in BLAS_ENV_VARS {
+            // Значение, заданное пользователем явно, не переопределяется
+            if env::var_os(name).is_none() {
+                env::set_var(name, threads.to_string());
+            }
+        }
+        info!("Потоки BLAS/OpenMP: {} на сессию (ядер: {}, сессий: {})", threads, cpus, sessions);
+    }
+
     fn create_virtual_environment(&self) -> Result<()> {
         info!("Создание виртуального окружения Python...");
         
@@ -13,12 +13,18 @@ from telethon.tl.types import DataJSON
 from telethon.tl.types import InputUser
 from urllib.parse import urlparse
 from bot_handle import handle_webapp
+import runtime_control
 
 # Загрузка переменных окружения
 load_dotenv()
 
 # Получение настройки логирования из .env
 ENABLE_LOGGING = os.getenv('ENABLE_LOGGING', 'true').lower() == 'true'
+# Сохранение клиента Telegram между перезапусками сессии супервизором
+KEEP_WARM_SESSION = os.getenv('KEEP_WARM_SESSION', 'true').lower() == 'true'
+
+# Логин, сохраненный для следующего запуска (только при KEEP_WARM_SESSION)
+_warm_login = None
 
 class TelegramMiniAppAutomation:
     def __init__(self, client: TelegramClient, app_url: str, device_config: dict, bot_metadata: dict = None, webapp_data: dict = None):
@@ -198,8 +204,16 @@ class TelegramMiniAppAutomation:
             logger.error(f"Ошибка при навигации: {e}")
             return False
 
+async def _cleanup_warm_login():
+    """Отключение сохраненного клиента Telegram при завершении работы"""
+    global _warm_login
+    if _warm_login:
+        await _warm_login.cleanup()
+        _warm_login = None
+
 async def initialize_automation() -> bool:
     """Точка входа для вызова из Rust"""
+    global _warm_login
     tracer = None
     automation = None
     login = None
@@ -217,12 +231,21 @@ async def initialize_automation() -> bool:
             return False
             
         try:
-            logger.info("Создание объекта TelegramLogin")
-            login = TelegramLogin(
-                api_id=int(api_id),
-                api_hash=api_hash,
-                phone=phone
-            )
+            if _warm_login and _warm_login.client and _warm_login.client.loop is not asyncio.get_running_loop():
+                # Клиент привязан к оставленному циклу событий и не может быть использован
+                logger.warning("Сохраненный клиент Telegram относится к другому циклу событий")
+                _warm_login = None
+
+            if _warm_login and _warm_login.phone == phone:
+                logger.info("Используется сохраненный объект TelegramLogin")
+                login = _warm_login
+            else:
+                logger.info("Создание объекта TelegramLogin")
+                login = TelegramLogin(
+                    api_id=int(api_id),
+                    api_hash=api_hash,
+                    phone=phone
+                )
             
             # Выполняем подключение
             success, url, device_config, bot_metadata, webapp_data = await login.connect()
@@ -337,9 +360,17 @@ async def initialize_automation() -> bool:
     finally:
         # Корректное закрытие ресурсов
         try:
-            if login:
+            if login and KEEP_WARM_SESSION and login.client and login.client.is_connected():
+                # Клиент остается подключенным для быстрого перезапуска,
+                # отключение выполняется в runtime_control.shutdown()
+                if _warm_login is None:
+                    runtime_control.register_shutdown(_cleanup_warm_login)
+                _warm_login = login
+                logger.debug("Клиент Telegram сохранен для следующего запуска")
+            elif login:
                 logger.debug("Очистка ресурсов логина")
                 await login.cleanup()
+                _warm_login = None
         except Exception as e:
             logger.error(f"Ошибка при закрытии ресурсов: {e}")
 
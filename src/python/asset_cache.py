@@ -0,0 +1,273 @@
+# asset_cache.py
+"""
+Перехват запросов WebApp через Playwright route
+- Ресурсы игры (JS, WASM, изображения, атласы, звуки, шрифты) отдаются из локального кэша
+  на диске, общего для всех контекстов и аккаунтов
+- Без проверки отдаются только неизменяемые ресурсы: путь с хэшем содержимого или
+  Cache-Control: immutable. Остальные отдаются, пока не истек max-age, затем
+  перепроверяются условным запросом (ETag / Last-Modified)
+- Содержимое хранится по SHA-256 (одинаковые файлы с разных URL хранятся один раз)
+- Запросы аналитики и рекламы блокируются
+- Индекс записывается на диск пакетами и при завершении навигации
+- Для каждой навигации выводится время загрузки и объем сэкономленного трафика
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from loguru import logger
+from playwright.async_api import BrowserContext, Route
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENABLE_ASSET_CACHE = os.getenv('ENABLE_ASSET_CACHE', 'false').lower() == 'true'
+ASSET_CACHE_DIR = os.getenv('ASSET_CACHE_DIR', './cache/assets')
+# Хосты, ресурсы которых кэшируются (через запятую)
+ASSET_CACHE_HOSTS = [host.strip() for host in
+                     os.getenv('ASSET_CACHE_HOSTS', 'games.pluto.vision').split(',') if host.strip()]
+# Подстроки URL, запросы к которым блокируются (через запятую)
+BLOCKED_URL_PATTERNS = [pattern.strip() for pattern in os.getenv(
+    'BLOCKED_URL_PATTERNS',
+    'google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,'
+    'connect.facebook.net,mc.yandex.ru,amplitude.com,mixpanel.com,hotjar.com,clarity.ms'
+).split(',') if pattern.strip()]
+
+# Расширения неизменяемых ресурсов игры
+CACHEABLE_EXTENSIONS = ('.js', '.wasm', '.png', '.jpg', '.jpeg', '.webp', '.gif', '.json',
+                        '.atlas', '.plist', '.bin', '.cconb', '.astc', '.ktx', '.pkm',
+                        '.mp3', '.ogg', '.wav', '.ttf', '.woff', '.woff2', '.css')
+# Заголовки, которые не сохраняются: тело хранится уже распакованным
+SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'date')
+# Хэш содержимого в пути (index.5b0f3.js, main-8c1e4a2f.wasm): такой URL не меняет содержимое
+HASHED_PATH_PATTERN = re.compile(r'[./_-](?=[0-9a-f]*[0-9])[0-9a-f]{5,}(?=[./_-])', re.IGNORECASE)
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+# Количество новых записей, после которого индекс записывается на диск
+INDEX_FLUSH_BATCH = 50
+
+class AssetCache:
+    """Кэш ресурсов игры на диске с адресацией по содержимому"""
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
+        return cls._instance
+
+    def _initialize(self):
+        self.cache_dir = Path(ASSET_CACHE_DIR)
+        self.blob_dir = self.cache_dir / 'blobs'
+        self.index_path = self.cache_dir / 'index.json'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index: Dict[str, Dict] = self._load_index()
+        self._dirty = 0
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'blocked': 0,
+                      'bytes_saved': 0, 'bytes_fetched': 0}
+        logger.info(f"Кэш ресурсов WebApp: {self.cache_dir} ({len(self.index)} записей)")
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """Загрузка индекса URL -> хэш содержимого"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        """Атомарное сохранение индекса"""
+        temp_path = self.index_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(temp_path, self.index_path)
+        self._dirty = 0
+
+    def flush(self):
+        """Запись индекса на диск, если в нем есть несохраненные изменения"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self._save_index()
+            except OSError as e:
+                logger.error(f"Ошибка сохранения индекса кэша ресурсов: {e}")
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    async def attach(self, context: BrowserContext):
+        """Подключение перехвата запросов к контексту браузера"""
+        await context.route("**/*", self._handle_route)
+        logger.debug("Перехват запросов WebApp подключен")
+
+    @staticmethod
+    def is_blocked(url: str) -> bool:
+        """Запрос к аналитике или рекламе"""
+        return any(pattern in url for pattern in BLOCKED_URL_PATTERNS)
+
+    @staticmethod
+    def is_cacheable(url: str, method: str) -> bool:
+        """Неизменяемый ресурс игры"""
+        if method != 'GET':
+            return False
+        parsed = urlparse(url)
+        if parsed.hostname not in ASSET_CACHE_HOSTS:
+            return False
+        return parsed.path.lower().endswith(CACHEABLE_EXTENSIONS)
+
+    @staticmethod
+    def freshness(url: str, headers: Dict[str, str]) -> Dict:
+        """Срок актуальности ресурса по пути и заголовкам ответа"""
+        cache_control = headers.get('cache-control', '').lower()
+        immutable = ('immutable' in cache_control
+                     or bool(HASHED_PATH_PATTERN.search(urlparse(url).path)))
+        max_age = 0
+        if 'no-cache' not in cache_control:
+            match = MAX_AGE_PATTERN.search(cache_control)
+            if match:
+                max_age = int(match.group(1))
+        return {
+            'immutable': immutable,
+            'max_age': max_age,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified')
+        }
+
+    @staticmethod
+    def is_fresh(entry: Dict) -> bool:
+        """Запись можно отдать без запроса к серверу"""
+        return entry.get('immutable') or time.time() - entry.get('stored', 0) < entry.get('max_age', 0)
+
+    @staticmethod
+    def _validators(entry: Dict) -> Dict[str, str]:
+        """Заголовки условного запроса для перепроверки записи"""
+        validators = {}
+        if entry.get('etag'):
+            validators['if-none-match'] = entry['etag']
+        if entry.get('last_modified'):
+            validators['if-modified-since'] = entry['last_modified']
+        return validators
+
+    async def _handle_route(self, route: Route):
+        """Обработчик перехваченного запроса"""
+        request = route.request
+        url = request.url
+        try:
+            if self.is_blocked(url):
+                self.stats['blocked'] += 1
+                await route.abort()
+                return
+
+            if not self.is_cacheable(url, request.method):
+                await route.continue_()
+                return
+
+            loop = asyncio.get_running_loop()
+            entry = self.index.get(url)
+            validators = {}
+            if entry:
+                body = await loop.run_in_executor(None, self._read_blob, entry['sha256'])
+                if body is not None:
+                    if self.is_fresh(entry):
+                        self.stats['hits'] += 1
+                        self.stats['bytes_saved'] += len(body)
+                        await route.fulfill(status=200, headers=entry['headers'], body=body)
+                        return
+                    validators = self._validators(entry)
+
+            if validators:
+                # Устаревшая запись: условный запрос, при 304 отдается содержимое из кэша
+                response = await route.fetch(headers={**request.headers, **validators})
+                if response.status == 304:
+                    self.stats['revalidated'] += 1
+                    self.stats['bytes_saved'] += len(body)
+                    self._touch(url, response.headers)
+                    await route.fulfill(status=200, headers=entry['headers'], body=body)
+                    return
+            else:
+                response = await route.fetch()
+
+            self.stats['misses'] += 1
+            body = await response.body()
+            self.stats['bytes_fetched'] += len(body)
+            freshness = self.freshness(url, response.headers)
+            if (response.status == 200
+                    and 'no-store' not in response.headers.get('cache-control', '')
+                    and (freshness['immutable'] or freshness['max_age']
+                         or freshness['etag'] or freshness['last_modified'])):
+                headers = {name: value for name, value in response.headers.items()
+                           if name.lower() not in SKIPPED_HEADERS}
+                await loop.run_in_executor(None, self._store, url, body, headers, freshness)
+            await route.fulfill(response=response, body=body)
+
+        except Exception as e:
+            logger.error(f"Ошибка обработки запроса {url}: {e}")
+            try:
+                await route.continue_()
+            except Exception:
+                # Запрос уже обработан или страница закрыта
+                pass
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            return self._blob_path(digest).read_bytes()
+        except OSError:
+            return None
+
+    def _touch(self, url: str, headers: Dict[str, str]):
+        """Продление записи после ответа 304"""
+        with self._lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return
+            entry['stored'] = time.time()
+            entry['max_age'] = self.freshness(url, headers)['max_age'] or entry.get('max_age', 0)
+            self._dirty += 1
+
+    def _store(self, url: str, body: bytes, headers: Dict[str, str], freshness: Dict):
+        """Сохранение содержимого по хэшу и обновление индекса (запись на диск пакетами)"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            try:
+                if not path.exists():
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    temp_path = path.with_suffix('.tmp')
+                    temp_path.write_bytes(body)
+                    os.replace(temp_path, path)
+                self.index[url] = {'sha256': digest, 'headers': headers, 'size': len(body),
+                                   'stored': time.time(), **freshness}
+                self._dirty += 1
+                self.stats['stored'] += 1
+                if self._dirty >= INDEX_FLUSH_BATCH:
+                    self._save_index()
+            except OSError as e:
+                logger.error(f"Ошибка сохранения ресурса в кэш: {e}")
+
+    def begin_navigation(self) -> Dict[str, float]:
+        """Снимок статистики перед навигацией"""
+        snapshot = dict(self.stats)
+        snapshot['started'] = time.perf_counter()
+        return snapshot
+
+    def end_navigation(self, snapshot: Dict[str, float], success: bool = True):
+        """Запись индекса, вывод времени загрузки и экономии трафика за навигацию"""
+        self.flush()
+        elapsed = time.perf_counter() - snapshot['started']
+        diff = {key: self.stats[key] - snapshot[key] for key in self.stats}
+        outcome = "успешна" if success else "не удалась"
+        logger.info(
+            f"Загрузка WebApp {outcome} за {elapsed:.1f} сек: из кэша {diff['hits']}, перепроверено {diff['revalidated']} "
+            f"({diff['bytes_saved'] / 1024 / 1024:.1f} МБ), загружено {diff['misses']} "
+            f"({diff['bytes_fetched'] / 1024 / 1024:.1f} МБ), заблокировано {diff['blocked']}"
+        )
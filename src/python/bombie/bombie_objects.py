@@ -1,6 +1,7 @@
 # bombie_objects.py
+import os
+import base64
 import numpy as np
-import easyocr
 import random 
 import io 
 from PIL import Image
@@ -10,15 +11,141 @@ from typing import Dict, Tuple, Optional
 from .cordination_module import GameObjects, ViewportConfig
 from .data_class import BoxCoordinates, BoxObject, GlobalBoxStorage, box_storage
 from .ocr_manager import OCRManager
+from .screen_classifier import ScreenClassifier, ScreenId, ScreenPrediction
+from .frame_ring import FrameDescriptor, get_frame_ring
+from .screencast import ScreencastStream, ENABLE_SCREENCAST
+
+# Расстояние Хэмминга между хешами кадров, начиная с которого экран считается изменившимся
+CHANGE_DISTANCE = 6
+
+# Способ захвата кадра: screenshot - page.screenshot через компоновщик,
+# canvas - чтение пикселей #GameCanvas внутри страницы (только запрошенная область)
+SCREEN_CAPTURE_BACKEND = os.getenv('SCREEN_CAPTURE_BACKEND', 'screenshot').lower()
+CAPTURE_BACKENDS = ('screenshot', 'canvas')
+
+# Чтение области canvas в CSS-пикселях: область масштабируется до размера в CSS-пикселях,
+# поэтому результат совпадает по размеру с page.screenshot(scale='css')
+CANVAS_CAPTURE_SCRIPT = """
+({x, y, width, height}) => {
+    const canvas = document.querySelector('#GameCanvas');
+    if (!canvas) return null;
+    const rect = canvas.getBoundingClientRect();
+    const scaleX = canvas.width / rect.width;
+    const scaleY = canvas.height / rect.height;
+    const w = Math.max(1, Math.round(width));
+    const h = Math.max(1, Math.round(height));
+
+    let buffer = window.__bombieCaptureBuffer;
+    if (!buffer || buffer.width !== w || buffer.height !== h) {
+        buffer = window.__bombieCaptureBuffer = new OffscreenCanvas(w, h);
+    }
+    const context = buffer.getContext('2d', {willReadFrequently: true});
+    context.clearRect(0, 0, w, h);
+    context.drawImage(canvas,
+        (x - rect.left) * scaleX, (y - rect.top) * scaleY, width * scaleX, height * scaleY,
+        0, 0, w, h);
+    const data = context.getImageData(0, 0, w, h).data;
+
+    let binary = '';
+    const chunk = 0x8000;
+    for (let i = 0; i < data.length; i += chunk) {
+        binary += String.fromCharCode.apply(null, data.subarray(i, i + chunk));
+    }
+    return {width: w, height: h, data: btoa(binary)};
+}
+"""
+
+# Без preserveDrawingBuffer содержимое WebGL canvas после вывода кадра недоступно для drawImage
+PRESERVE_DRAWING_BUFFER_SCRIPT = """
+(() => {
+    const nativeGetContext = HTMLCanvasElement.prototype.getContext;
+    HTMLCanvasElement.prototype.getContext = function(type, attributes) {
+        if (type === 'webgl' || type === 'webgl2' || type === 'experimental-webgl') {
+            attributes = Object.assign({}, attributes, {preserveDrawingBuffer: true});
+        }
+        return nativeGetContext.call(this, type, attributes);
+    };
+})();
+"""
 
 class ScreenManager:
-    def __init__(self, page, game_objects=None):
+    def __init__(self, page, game_objects=None, capture_backend: Optional[str] = None):
         self.page = page
-        self.reader = OCRManager().get_reader
+        self.capture_backend = (capture_backend or SCREEN_CAPTURE_BACKEND).lower()
+        if self.capture_backend not in CAPTURE_BACKENDS:
+            logger.warning(f"Неизвестный способ захвата кадра: {self.capture_backend}, используется screenshot")
+            self.capture_backend = 'screenshot'
         self.game_objects = game_objects if game_objects else GameObjects()
         self.viewport = self.game_objects.viewport
+        self.classifier = ScreenClassifier()
+        # Общий буфер кадров для рабочих процессов OCR/CV (если включен)
+        self.frame_ring = get_frame_ring()
+        self.last_frame: Optional[FrameDescriptor] = None
+        # Непрерывный поток кадров (общий для всех ScreenManager страницы)
+        self.stream: Optional[ScreencastStream] = (
+            ScreencastStream.for_page(page, self.viewport.width, self.viewport.height)
+            if ENABLE_SCREENCAST else None
+        )
+
+    @property
+    def reader(self):
+        """OCR Reader загружается только при первом полном распознавании"""
+        return OCRManager().get_reader
+
+    @property
+    def frame_age(self) -> float:
+        """Возраст последнего кадра трансляции в секундах (0 - кадры снимаются по запросу)"""
+        return self.stream.frame_age if self.stream else 0.0
+
+    async def _stream_frame(self, area: Optional[BoxCoordinates]) -> Optional[np.ndarray]:
+        """Последний кадр трансляции без задержки захвата"""
+        if not await self.stream.ensure_started():
+            return None
+        latest = self.stream.latest()
+        if latest is None:
+            return None
+        image, age = latest
+        if area:
+            x1 = int(max(0, min(area.top_left_x, area.bottom_left_x)))
+            y1 = int(max(0, min(area.top_left_y, area.top_right_y)))
+            x2 = int(max(0, max(area.top_right_x, area.bottom_right_x)))
+            y2 = int(max(0, max(area.bottom_left_y, area.bottom_right_y)))
+            return image[y1:y2, x1:x2]
+        return image
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """
+        Ожидание изменения экрана не дольше timeout
+        С трансляцией возвращается сразу после нового кадра, без нее - ждет timeout
+        """
+        if not self.stream or not await self.stream.ensure_started() or self.stream.latest() is None:
+            await asyncio.sleep(timeout)
+            return False
+
+        # Игра перерисовывает canvas постоянно, поэтому изменение определяется по хешу кадра
+        deadline = asyncio.get_running_loop().time() + timeout
+        reference = self.classifier.frame_hash(self.stream.latest(max_age=0)[0])
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0 or not await self.stream.wait_for_frame(self.stream.sequence, remaining):
+                return False
+            frame, _ = self.stream.latest(max_age=0)
+            if self.classifier.hash_distance(reference, self.classifier.frame_hash(frame)) > CHANGE_DISTANCE:
+                return True
 
     async def take_screenshot(self, area: Optional[BoxCoordinates] = None) -> Optional[np.ndarray]:
+        # last_frame описывает только кадр этого снимка (кадры трансляции в буфер не пишутся)
+        self.last_frame = None
+        if self.stream:
+            image = await self._stream_frame(area)
+            if image is not None:
+                return image
+            logger.debug("Кадр трансляции недоступен, используется снимок по запросу")
+        if self.capture_backend == 'canvas':
+            image = await self.capture_canvas(area)
+            if image is not None:
+                return image
+            logger.debug("Захват canvas не удался, используется page.screenshot")
         try:
             viewport_height = self.viewport.height
             viewport_width = self.viewport.width
@@ -36,6 +163,7 @@ class ScreenManager:
             # (сохраняем текущий пайплайн обработки изображения)
             image = Image.open(io.BytesIO(screenshot_bytes))
             screenshot_array = np.array(image)
+            self.publish_frame(screenshot_array)
             
             # Если указана область, обрезаем изображение
             if area:
@@ -54,6 +182,56 @@ class ScreenManager:
             logger.error(f"Ошибка создания скриншота: {e}")
             return None
 
+    async def capture_canvas(self, area: Optional[BoxCoordinates] = None) -> Optional[np.ndarray]:
+        """
+        Чтение пикселей #GameCanvas внутри страницы без компоновщика и кодирования PNG
+        Передается только запрошенная область (RGBA), координаты в CSS-пикселях
+        """
+        try:
+            if area:
+                x1 = max(0, min(area.top_left_x, area.bottom_left_x))
+                y1 = max(0, min(area.top_left_y, area.top_right_y))
+                x2 = max(0, max(area.top_right_x, area.bottom_right_x))
+                y2 = max(0, max(area.bottom_left_y, area.bottom_right_y))
+            else:
+                x1, y1, x2, y2 = 0, 0, self.viewport.width, self.viewport.height
+            region = {'x': int(x1), 'y': int(y1), 'width': int(x2) - int(x1), 'height': int(y2) - int(y1)}
+            if region['width'] <= 0 or region['height'] <= 0:
+                return None
+
+            result = await self.page.evaluate(CANVAS_CAPTURE_SCRIPT, region)
+            if not result:
+                return None
+            pixels = np.frombuffer(base64.b64decode(result['data']), dtype=np.uint8)
+            image = pixels.reshape(result['height'], result['width'], 4)
+            if area is None:
+                self.publish_frame(image)
+            return image
+
+        except Exception as e:
+            logger.debug(f"Ошибка захвата canvas: {e}")
+            return None
+
+    def publish_frame(self, image: np.ndarray) -> Optional[FrameDescriptor]:
+        """
+        Запись полного кадра в общий буфер, описание кадра сохраняется в last_frame
+        Процессы OCR читают кадр по описанию и сами вырезают область (OCRService.get_numbers_from_frame)
+        """
+        if self.frame_ring is None:
+            return None
+        try:
+            self.last_frame = self.frame_ring.write(image)
+            return self.last_frame
+        except Exception as e:
+            logger.error(f"Ошибка записи кадра в общий буфер: {e}")
+            return None
+
+    async def classify_screen(self, image: Optional[np.ndarray] = None) -> ScreenPrediction:
+        """Определение текущего экрана игры без OCR"""
+        if image is None:
+            image = await self.take_screenshot()
+        return self.classifier.classify(image)
+
     async def get_text_from_area(self, image: np.ndarray, area: BoxCoordinates) -> str:
         try:
             # Определяем границы области для OCR
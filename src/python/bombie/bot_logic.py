@@ -8,6 +8,7 @@ from utils import HumanBehavior
 from .chest_action import ChestActions
 from .task_action import TaskActions
 from .module_manager import ModuleController, ModuleState
+from .readiness import GameReadinessDetector
 from datetime import datetime, timedelta
 
 class WebAppLogic:
@@ -115,8 +116,11 @@ class WebAppLogic:
             # Здесь можно добавить дополнительную 
             # логику контроля запуска и контроля модулей
             
-            # Ожидаем загрузку игрового процесса
-            await asyncio.sleep(10.5)
+            # Ожидаем готовность игры: canvas и любой экран, кроме загрузки (окна закрывает control_processes)
+            readiness = await GameReadinessDetector(self.page).wait_until_ready()
+            if not readiness.ready:
+                logger.error(f"Игра не загрузилась: {readiness.reason} (проверки: {readiness.checks})")
+                return False
 
             # Запускаем контроль процессов вместо прямого запуска модулей
             if not await self.control_processes():
@@ -0,0 +1,84 @@
+# capture_benchmark.py
+"""
+Сравнение способов захвата кадра: page.screenshot и чтение пикселей canvas
+
+Запуск из src/python:
+    python -m bombie.capture_benchmark --url "<ссылка на WebApp>" --roi 150,420,260,460
+
+Замеряется время захвата полного кадра и небольшой области обоими способами
+и средняя разница пикселей области между ними.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import numpy as np
+from playwright.async_api import async_playwright
+
+from bombie.bombie_objects import ScreenManager, PRESERVE_DRAWING_BUFFER_SCRIPT
+from bombie.data_class import BoxCoordinates
+
+async def _timed(capture, area, repeat: int):
+    """Время захватов в мс и последний кадр"""
+    times = []
+    image = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        image = await capture(area)
+        times.append((time.perf_counter() - started) * 1000)
+    return times, image
+
+def _box(x1: int, y1: int, x2: int, y2: int) -> BoxCoordinates:
+    return BoxCoordinates(
+        top_left_x=x1, top_left_y=y1,
+        top_right_x=x2, top_right_y=y1,
+        bottom_right_x=x2, bottom_right_y=y2,
+        bottom_left_x=x1, bottom_left_y=y2
+    )
+
+async def run(args) -> int:
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        context = await browser.new_context(viewport={'width': 412, 'height': 815},
+                                            device_scale_factor=args.scale)
+        await context.add_init_script(PRESERVE_DRAWING_BUFFER_SCRIPT)
+        page = await context.new_page()
+        await page.goto(args.url, wait_until='load')
+        await page.wait_for_selector('#GameCanvas', state='attached')
+        await asyncio.sleep(args.settle)
+
+        screenshot = ScreenManager(page, capture_backend='screenshot')
+        canvas = ScreenManager(page, capture_backend='canvas')
+        roi = _box(*(int(value) for value in args.roi.split(',')))
+
+        print(f"Масштаб устройства: {args.scale}, повторов: {args.repeat}")
+        for label, area in (("Полный кадр", None), ("Область", roi)):
+            shot_ms, shot_image = await _timed(screenshot.take_screenshot, area, args.repeat)
+            canvas_ms, canvas_image = await _timed(canvas.capture_canvas, area, args.repeat)
+            if canvas_image is None:
+                print(f"{label}: захват canvas недоступен")
+                continue
+            print(f"{label}:")
+            print(f"  page.screenshot: {statistics.median(shot_ms):.1f} мс")
+            print(f"  canvas:          {statistics.median(canvas_ms):.1f} мс "
+                  f"(x{statistics.median(shot_ms) / statistics.median(canvas_ms):.1f})")
+            if shot_image is not None and shot_image.shape[:2] == canvas_image.shape[:2]:
+                diff = np.abs(shot_image[:, :, :3].astype(np.int16) - canvas_image[:, :, :3].astype(np.int16))
+                print(f"  разница пикселей: mean {diff.mean():.2f}, max {diff.max()}")
+
+        await browser.close()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="page.screenshot и чтение пикселей canvas")
+    parser.add_argument('--url', required=True, help="Страница с #GameCanvas")
+    parser.add_argument('--roi', default='150,420,260,460', help="Область x1,y1,x2,y2 в CSS-пикселях")
+    parser.add_argument('--scale', type=float, default=3.0, help="Масштаб устройства")
+    parser.add_argument('--repeat', type=int, default=20, help="Количество повторов замера")
+    parser.add_argument('--settle', type=float, default=10.0, help="Ожидание загрузки игры (сек)")
+    return asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,9 @@ import sys
 import asyncio
 import random
 import traceback
+import numpy as np
 from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
 from threading import Lock
 
@@ -15,7 +17,12 @@ from utils import HumanBehavior
 from typing import Tuple, Optional
 from .cv_manager import CVManager
 from .ocr_manager import OCRCoordinator
+from .digit_reader import DigitReader
+from .ocr_service import ENABLE_OCR_POOL, OCRService
+from .text_matcher import KeywordMatcher
+from .flow_machine import FlowStateMachine, RetryPolicy, RETRY
 from .bombie_objects import ScreenManager
+from .screen_classifier import ScreenId
 from .cordination_module import ViewportConfig, box_storage, BoxCoordinates, GameObjects
 
 class SingletonMeta(type):
@@ -46,6 +53,19 @@ class ButtonActive(metaclass=SingletonMeta):
         """Установка состояния автопродажи"""
         self.autosell_enabled = value
 
+class ChestFlowState(Enum):
+    """Состояния сценария обработки сундука"""
+    CHECK_MENU = "check_menu"
+    RECOVER_MENU = "recover_menu"
+    CHECK_CHESTS = "check_chests"
+    OPEN_CHEST = "open_chest"
+    AUTOSELL = "autosell"
+    SELL_OR_EQUIP = "sell_or_equip"
+    BACK_OUT = "back_out"
+    CONTINUE = "continue"
+    DONE = "done"
+    ERROR = "error"
+
 class ChestActions:
     def __init__(self, page):
         self.page = page
@@ -53,6 +73,7 @@ class ChestActions:
         self.screen = ScreenManager(page, self.objects)
         self.cv_manager = CVManager()
         self.coordinator = OCRCoordinator()
+        self.digit_reader = DigitReader()
         self.button_active = ButtonActive()
         # Проверяем инициализацию всех компонентов
         if not all([self.screen, self.objects, self.cv_manager, self.coordinator]):
@@ -69,6 +90,13 @@ class ChestActions:
                 'en': ['sell', 'equip', 'autosell']
             }
         }
+        # Предкомпилированные наборы ключевых слов
+        self.menu_matcher = KeywordMatcher.for_keywords(
+            self.text_patterns['menu']['ru'] + self.text_patterns['menu']['en']
+        )
+        self.chest_matcher = KeywordMatcher.for_keywords(
+            self.text_patterns['chest']['ru'] + self.text_patterns['chest']['en']
+        )
         logger.debug(f"Загружены шаблоны текста: {self.text_patterns}")
 
     async def get_random_safe_click(self) -> Tuple[float, float]:
@@ -97,21 +125,30 @@ class ChestActions:
         
         try:
             image = await self.screen.take_screenshot()
-            zones = self.objects.zone_manager.zones
-                
-            # Проверяем нижнюю зону
-            menu_texts = self.text_patterns['menu']['ru'] + self.text_patterns['menu']['en']
-            found, confidence = self.coordinator.check_text_in_area(
-                image, 
-                menu_texts,
-                zones['bottom'][0]
-            )
+
+            # Быстрое определение экрана без OCR
+            prediction = await self.screen.classify_screen(image)
+            if prediction.screen == ScreenId.MAIN_MENU:
+                found, confidence = True, prediction.confidence
+            elif prediction.is_confident:
+                logger.info(f"Текущий экран: {prediction.screen.value}, не главное меню")
+                return False
+            else:
+                # Экран не распознан классификатором уверенно, проверяем нижнюю зону через OCR
+                zones = self.objects.zone_manager.zones
+                found, confidence = self.coordinator.check_text_in_area(
+                    image, 
+                    self.menu_matcher,
+                    zones['bottom'][0]
+                )
+                if found:
+                    self.screen.classifier.learn(image, ScreenId.MAIN_MENU)
             
             if found:
                 logger.info(f"Найдены ключевые слова меню с уверенностью {confidence:.2f}")
                 # Проверяем состояние автоскилла если находимся в меню
                 if not self.button_active.auto_skill_enabled:
-                    await self.auto_skill_click()
+                    await self.auto_skill_click(image)
                 return True
                 
             logger.info("В нижней зоне не найдены требуемые ключевые слова")
@@ -137,12 +174,29 @@ class ChestActions:
                 logger.error("Не удалось получить скриншот области сундуков")
                 return False
 
+            # Сначала читаем число по шаблонам цифр, OCR только при неоднозначном результате
+            reading = self.digit_reader.read(screenshot)
+            if not reading.ambiguous and reading.value is not None:
+                logger.info(f"Найдено сундуков: {reading.value} (шаблоны, {reading.elapsed_ms:.2f} мс)")
+                return reading.value > 0
+
             # Распознаем текст
-            number_image = self.coordinator.preprocess_image(screenshot)
-            texts = self.coordinator.get_numbers_from_image(number_image)
+            texts = None
+            if ENABLE_OCR_POOL and self.screen.last_frame is not None:
+                # Процесс OCR читает полный кадр из общего буфера и сам вырезает область
+                texts = await OCRService().get_numbers_from_frame(self.screen.last_frame, chest_area)
+            if texts is None:
+                number_image = self.coordinator.preprocess_image(screenshot)
+                if ENABLE_OCR_POOL:
+                    texts = await OCRService().get_numbers_from_image(number_image)
+                else:
+                    texts = self.coordinator.get_numbers_from_image(number_image)
             if not texts:
                 logger.warning("Текст не распознан в области сундуков")
                 return False
+            # ['1'] - значение OCR по умолчанию, его нельзя использовать для обучения шаблонов
+            if texts != ["1"]:
+                self.digit_reader.learn(reading, texts[0])
 
             # Ищем числа в тексте
             numbers = [int(s) for s in texts[0].split() if s.isdigit()]
@@ -159,20 +213,22 @@ class ChestActions:
             return False
 
     # Проверка и клик по кнопке 'Автоскилл'
-    async def auto_skill_click(self):
-        """Проверяем и активируем 'Автоскилл' если не включен"""
+    async def auto_skill_click(self, image: Optional[np.ndarray] = None):
+        """Проверяем и активируем 'Автоскилл' если не включен (image - уже снятый кадр)"""
         try:
             # Получаем область автоскилла
             auto_skill_area = self.objects.get_auto_skill_button_area()
             
-            # Делаем скриншот области
-            screenshot = await self.screen.take_screenshot(auto_skill_area)
-            if screenshot is None:
+            # Используем кадр проверки меню, если он передан
+            if image is None:
+                image = await self.screen.take_screenshot()
+            if image is None:
                 logger.error("Не удалось получить скриншот области автоскилла")
                 return False
                 
             # Проверяем состояние кнопки
-            is_enabled = self.cv_manager.find_auto_skill_button(screenshot)
+            decisions = self.cv_manager.match_many(image, [(auto_skill_area, 'auto_skill')])
+            is_enabled = 'auto_skill' in decisions and decisions['auto_skill'].result
             
             if not is_enabled:
                 # Получаем координаты для клика
@@ -188,8 +244,9 @@ class ChestActions:
                 
                 # Проверяем результат после клика
                 await asyncio.sleep(1)
-                new_screenshot = await self.screen.take_screenshot(auto_skill_area)
-                is_enabled = self.cv_manager.find_auto_skill_button(new_screenshot)
+                new_image = await self.screen.take_screenshot()
+                decisions = self.cv_manager.match_many(new_image, [(auto_skill_area, 'auto_skill')])
+                is_enabled = 'auto_skill' in decisions and decisions['auto_skill'].result
                 
             # Обновляем состояние в структуре
             self.button_active.set_auto_skill(is_enabled)
@@ -222,9 +279,19 @@ class ChestActions:
         """Проверка валидности открытого сундука"""
         try:
             image = await self.screen.take_screenshot()
+
+            # Быстрое определение экрана без OCR
+            prediction = await self.screen.classify_screen(image)
+            if prediction.screen == ScreenId.CHEST_OPEN:
+                return True
+            if prediction.is_confident:
+                return False
+
             text = await self.screen.get_text_from_area(image, self.objects.get_default_chest_area())
-            return any(word in text.lower() for word in 
-                      self.text_patterns['chest']['ru'] + self.text_patterns['chest']['en'])
+            is_valid = self.chest_matcher.search(text) is not None
+            if is_valid:
+                self.screen.classifier.learn(image, ScreenId.CHEST_OPEN)
+            return is_valid
         except Exception as e:
             logger.error(f"Ошибка проверки сундука: {e}")
             return False
@@ -250,14 +317,9 @@ class ChestActions:
             autosell_area = self.objects.get_default_autosell_area()
             expanded_area = self.objects.expand_area(autosell_area, 0.5)
             
-            # Вырезаем область изображения для проверки
-            cropped_image = image[
-                int(expanded_area.top_left_y):int(expanded_area.bottom_right_y),
-                int(expanded_area.top_left_x):int(expanded_area.bottom_right_x)
-            ]
-            
             # Проверяем состояние чекбокса через CV
-            is_checked = self.cv_manager.find_autosell_checkbox(cropped_image)
+            decisions = self.cv_manager.match_many(image, [(expanded_area, 'autosell')])
+            is_checked = 'autosell' in decisions and decisions['autosell'].result
             
             if is_checked:
                 logger.info("Галочка автопродажи была установлена")
@@ -271,11 +333,8 @@ class ChestActions:
             
             # Проверяем результат
             new_image = await self.screen.take_screenshot()
-            cropped_new_image = new_image[
-                int(expanded_area.top_left_y):int(expanded_area.bottom_right_y),
-                int(expanded_area.top_left_x):int(expanded_area.bottom_right_x)
-            ]
-            is_checked = self.cv_manager.find_autosell_checkbox(cropped_new_image)
+            decisions = self.cv_manager.match_many(new_image, [(expanded_area, 'autosell')])
+            is_checked = 'autosell' in decisions and decisions['autosell'].result
             self.button_active.set_autosell(is_checked)
             
             logger.info(f"Состояние автопродажи обновлено в структуре: {is_checked}")
@@ -395,88 +454,127 @@ class ChestActions:
         return await self.logic_sell_or_equip()
 
     # Основная функция обработки сундука
-    async def process_chest(self, attempt: int = 0) -> str:
+    async def process_chest(self) -> str:
         """Основная функция обработки сундука
         Returns:
             'continue' - если сундук обработан успешно и нужно продолжить
             'done' - если сундуков нет
             'error' - если произошла ошибка
         """
-        logger.info(f"Начало обработки сундука (попытка {attempt}/3)")
-        
-        if attempt >= 3:
-            logger.warning("Превышено максимальное количество попыток, нажимаем кнопку назад")
-            # Нажимаем кнопку назад
-            back_button = self.objects.get_default_back_button()
-            back_coords = self.objects.get_random_point_in_area(back_button)
-            await HumanBehavior.random_delay()
-            await self.page.mouse.click(back_coords[0], back_coords[1])
-            await asyncio.sleep(1)
-            return 'error'
-        
-        try:
-            # Проверка главного меню
-            logger.debug("Проверка нахождения в главном меню")
-            if not await self.main_menu():
-                logger.warning("Не в главном меню, выполняем safe click")
-                # Получаем область безопасного клика
-                safe_area = self.objects.viewport.cancel_click_area
-                if not safe_area:
-                    logger.error("Не удалось получить области безопасного клика")
-                    return 'error'
-                    
-                # Выбираем случайную область для нажатия на безопасную область для выхода в главное меню
-                safe_coords = self.objects.get_random_point_in_area(safe_area)
-                if not safe_coords:
-                    logger.error("Не удалось получить координаты для клика")
-                    return 'error'
-                    
-                logger.debug(f"Выбраны координаты для safe click: {safe_coords}")
-                
-                await HumanBehavior.random_delay()
-                await self.page.mouse.click(safe_coords[0], safe_coords[1])
-                return await self.process_chest(attempt + 1)
-                
-            # Проверка наличия сундуков
-            if not await self.check_chest_numbers():
-                logger.info("Доступных сундуков нет, переходим в режим ожидания")
-                return 'done'
+        logger.info("Начало обработки сундука")
 
-            # Пытаемся залутать плюшки в процессе открытия сундука
-            await self.page.mouse.click(73, 703)
-            await HumanBehavior.random_delay()
-            await self.page.mouse.click(73, 703)
-            await HumanBehavior.random_delay()
+        machine = FlowStateMachine(
+            name="chest",
+            initial=ChestFlowState.CHECK_MENU,
+            handlers={
+                ChestFlowState.CHECK_MENU: self._state_check_menu,
+                ChestFlowState.RECOVER_MENU: self._state_recover_menu,
+                ChestFlowState.CHECK_CHESTS: self._state_check_chests,
+                ChestFlowState.OPEN_CHEST: self._state_open_chest,
+                ChestFlowState.AUTOSELL: self._state_autosell,
+                ChestFlowState.SELL_OR_EQUIP: self._state_sell_or_equip,
+                ChestFlowState.BACK_OUT: self._state_back_out,
+            },
+            results={
+                ChestFlowState.CONTINUE: 'continue',
+                ChestFlowState.DONE: 'done',
+                ChestFlowState.ERROR: 'error',
+            },
+            retry_state=ChestFlowState.CHECK_MENU,
+            exhausted_state=ChestFlowState.BACK_OUT,
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=4.0),
+            timeouts={
+                ChestFlowState.CHECK_MENU: 30.0,
+                ChestFlowState.RECOVER_MENU: 10.0,
+                ChestFlowState.CHECK_CHESTS: 30.0,
+                ChestFlowState.OPEN_CHEST: 20.0,
+                ChestFlowState.AUTOSELL: 30.0,
+                ChestFlowState.SELL_OR_EQUIP: 45.0,
+                ChestFlowState.BACK_OUT: 10.0,
+            }
+        )
+        return await machine.run()
 
-            # Клик по сундуку
-            logger.debug("Получение области сундука")
-            chest_area = self.objects.get_default_chest_area()
-            if not isinstance(chest_area, BoxCoordinates):
-                logger.error(f"Некорректный тип chest_area: {type(chest_area)}")
-                return 'error'
-                
-            chest_coords = self.objects.get_random_point_in_area(chest_area)
-            logger.info(f"Выбраны координаты для клика по сундуку: {chest_coords}")
+    # Состояние: проверка главного меню
+    async def _state_check_menu(self):
+        logger.debug("Проверка нахождения в главном меню")
+        if await self.main_menu():
+            return ChestFlowState.CHECK_CHESTS
+        logger.warning("Не в главном меню, выполняем safe click")
+        return ChestFlowState.RECOVER_MENU
+
+    # Состояние: safe click для выхода в главное меню
+    async def _state_recover_menu(self):
+        # Получаем область безопасного клика
+        safe_area = self.objects.viewport.cancel_click_area
+        if not safe_area:
+            logger.error("Не удалось получить области безопасного клика")
+            return ChestFlowState.ERROR
             
-            await HumanBehavior.random_delay()
-            # before_image = await self.screen.take_screenshot()
-            await self.page.mouse.click(chest_coords[0], chest_coords[1])
-            await HumanBehavior.random_delay()
-            await asyncio.sleep(1)
+        # Выбираем случайную область для нажатия на безопасную область для выхода в главное меню
+        safe_coords = self.objects.get_random_point_in_area(safe_area)
+        if not safe_coords:
+            logger.error("Не удалось получить координаты для клика")
+            return ChestFlowState.ERROR
+            
+        logger.debug(f"Выбраны координаты для safe click: {safe_coords}")
+        
+        await HumanBehavior.random_delay()
+        await self.page.mouse.click(safe_coords[0], safe_coords[1])
+        return RETRY
 
-            # Проверка автопродажи
-            if not await self.chest_is_open_action_autosell():
-                logger.warning("Не удалось настроить автопродажу")
-                return await self.process_chest(attempt + 1)
-                
-            # Обработка предметов
-            if not await self.logic_sell_or_equip():
-                logger.warning("Не удалось обработать предметы")
-                return await self.process_chest(attempt + 1)
-                
-            logger.info("Успешная обработка сундука, продолжаем обработку")
-            return 'continue'
+    # Состояние: проверка наличия сундуков
+    async def _state_check_chests(self):
+        if not await self.check_chest_numbers():
+            logger.info("Доступных сундуков нет, переходим в режим ожидания")
+            return ChestFlowState.DONE
+        return ChestFlowState.OPEN_CHEST
+
+    # Состояние: открытие сундука
+    async def _state_open_chest(self):
+        # Пытаемся залутать плюшки в процессе открытия сундука
+        await self.page.mouse.click(73, 703)
+        await HumanBehavior.random_delay()
+        await self.page.mouse.click(73, 703)
+        await HumanBehavior.random_delay()
+
+        # Клик по сундуку
+        logger.debug("Получение области сундука")
+        chest_area = self.objects.get_default_chest_area()
+        if not isinstance(chest_area, BoxCoordinates):
+            logger.error(f"Некорректный тип chest_area: {type(chest_area)}")
+            return ChestFlowState.ERROR
             
-        except Exception as e:
-            logger.error(f"Критическая ошибка обаботки сундка: {e}")
-            return 'error'
\ No newline at end of file
+        chest_coords = self.objects.get_random_point_in_area(chest_area)
+        logger.info(f"Выбраны координаты для клика по сундуку: {chest_coords}")
+        
+        await HumanBehavior.random_delay()
+        await self.page.mouse.click(chest_coords[0], chest_coords[1])
+        await HumanBehavior.random_delay()
+        await asyncio.sleep(1)
+        return ChestFlowState.AUTOSELL
+
+    # Состояние: проверка автопродажи
+    async def _state_autosell(self):
+        if not await self.chest_is_open_action_autosell():
+            logger.warning("Не удалось настроить автопродажу")
+            return RETRY
+        return ChestFlowState.SELL_OR_EQUIP
+
+    # Состояние: обработка предметов
+    async def _state_sell_or_equip(self):
+        if not await self.logic_sell_or_equip():
+            logger.warning("Не удалось обработать предметы")
+            return RETRY
+        logger.info("Успешная обработка сундука, продолжаем обработку")
+        return ChestFlowState.CONTINUE
+
+    # Состояние: выход назад после исчерпания попыток
+    async def _state_back_out(self):
+        logger.warning("Превышено максимальное количество попыток, нажимаем кнопку назад")
+        back_button = self.objects.get_default_back_button()
+        back_coords = self.objects.get_random_point_in_area(back_button)
+        await HumanBehavior.random_delay()
+        await self.page.mouse.click(back_coords[0], back_coords[1])
+        await asyncio.sleep(1)
+        return ChestFlowState.ERROR
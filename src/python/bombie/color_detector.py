@@ -0,0 +1,136 @@
+# color_detector.py
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Tuple
+from loguru import logger
+
+# Диапазон цвета: (пространство, нижняя граница, верхняя граница)
+# 'hsv' - границы (H, S, V) в шкале OpenCV (H: 0-180), 'gray' - границы яркости (0-255)
+ColorRange = Tuple[str, Tuple[int, ...], Tuple[int, ...]]
+
+@dataclass
+class ColorProfile:
+    """Набор цветовых классов для одной области"""
+    name: str
+    # Класс цвета -> список диапазонов (пиксель относится к классу, если попадает в любой)
+    classes: Dict[str, List[ColorRange]]
+    # Порядок каналов входного изображения ('rgb' для скриншотов, 'bgr' для cv2.imread)
+    channel_order: str = 'rgb'
+
+# Профили областей
+COLOR_PROFILES: Dict[str, ColorProfile] = {
+    # Стрелка изменения силы предмета: зеленая - увеличение, красная - уменьшение
+    'power_arrows': ColorProfile('power_arrows', {
+        'green': [('hsv', (40, 50, 50), (80, 255, 255))],
+        'red': [('hsv', (0, 50, 50), (10, 255, 255)), ('hsv', (170, 50, 50), (180, 255, 255))],
+    }),
+    # Красная точка уведомления
+    'red_dot': ColorProfile('red_dot', {
+        'red': [('hsv', (0, 100, 100), (10, 255, 255)), ('hsv', (160, 100, 100), (180, 255, 255))],
+    }),
+    # Свечение активной кнопки
+    'glow': ColorProfile('glow', {
+        'bright': [('gray', (181,), (255,))],
+    }),
+}
+
+class ColorRatioDetector:
+    """
+    Подсчет пикселей цветовых классов за один проход
+    - Для каждой ячейки квантования (32 уровня на канал) класс вычисляется заранее
+    - Пиксели изображения переводятся в индекс таблицы и считаются через bincount
+    - Ячейки, через которые проходит граница диапазона (например, порог яркости 181),
+      помечаются как граничные: их пиксели классифицируются точно, результат совпадает
+      с попиксельной проверкой
+    """
+
+    # Количество уровней квантования на канал (32 -> шаг 8)
+    LEVELS = 32
+    _SHIFT = 3
+    # Номер класса граничной ячейки в таблице
+    BOUNDARY = 255
+
+    _cache: Dict[str, 'ColorRatioDetector'] = {}
+    _cache_lock = Lock()
+
+    def __init__(self, profile: ColorProfile):
+        self.profile = profile
+        # Индекс 0 - пиксели вне всех классов
+        self.class_names = ['other'] + list(profile.classes)
+        self.lut = self._build_lut(profile)
+        logger.debug(f"Построена таблица цветов {profile.name}: {self.class_names[1:]}")
+
+    @classmethod
+    def for_profile(cls, name: str) -> 'ColorRatioDetector':
+        """Получение детектора профиля из кэша"""
+        detector = cls._cache.get(name)
+        if detector is None:
+            with cls._cache_lock:
+                detector = cls._cache.get(name)
+                if detector is None:
+                    detector = cls(COLOR_PROFILES[name])
+                    cls._cache[name] = detector
+        return detector
+
+    @staticmethod
+    def _classify(profile: ColorProfile, colors: np.ndarray) -> np.ndarray:
+        """Точный номер класса для каждого цвета (массив N x 3, uint8)"""
+        colors = np.ascontiguousarray(colors, dtype=np.uint8).reshape(-1, 1, 3)
+        if profile.channel_order == 'rgb':
+            hsv = cv2.cvtColor(colors, cv2.COLOR_RGB2HSV).reshape(-1, 3)
+            gray = cv2.cvtColor(colors, cv2.COLOR_RGB2GRAY).reshape(-1, 1)
+        else:
+            hsv = cv2.cvtColor(colors, cv2.COLOR_BGR2HSV).reshape(-1, 3)
+            gray = cv2.cvtColor(colors, cv2.COLOR_BGR2GRAY).reshape(-1, 1)
+
+        classes = np.zeros(len(colors), dtype=np.uint8)
+        # Обход в обратном порядке: при пересечении диапазонов побеждает первый класс
+        for index in range(len(profile.classes), 0, -1):
+            ranges = profile.classes[list(profile.classes)[index - 1]]
+            mask = np.zeros(len(colors), dtype=bool)
+            for space, lower, upper in ranges:
+                values = hsv if space == 'hsv' else gray
+                mask |= np.all((values >= lower) & (values <= upper), axis=1)
+            classes[mask] = index
+        return classes
+
+    @classmethod
+    def _build_lut(cls, profile: ColorProfile) -> np.ndarray:
+        """
+        Таблица: индекс ячейки квантования -> номер класса
+        Классифицируются все цвета ячейки: если они относятся к разным классам, ячейка граничная
+        """
+        step = 256 // cls.LEVELS
+        values = np.arange(256, dtype=np.uint8)
+        lut = np.empty((cls.LEVELS, cls.LEVELS, cls.LEVELS), dtype=np.uint8)
+        # Построение по слоям первого канала, чтобы не держать в памяти все 16.7 млн цветов
+        for level in range(cls.LEVELS):
+            c0, c1, c2 = np.meshgrid(values[level * step:(level + 1) * step], values, values, indexing='ij')
+            colors = np.stack([c0.ravel(), c1.ravel(), c2.ravel()], axis=1)
+            classes = cls._classify(profile, colors).reshape(step, cls.LEVELS, step, cls.LEVELS, step)
+            lowest = classes.min(axis=(0, 2, 4))
+            highest = classes.max(axis=(0, 2, 4))
+            lut[level] = np.where(lowest == highest, lowest, cls.BOUNDARY)
+        return lut.ravel()
+
+    # Основная функция подсчета пикселей
+    def count(self, image: np.ndarray) -> Dict[str, int]:
+        """Количество пикселей каждого класса"""
+        pixels = image[:, :, :3] if image.ndim == 3 else np.repeat(image[:, :, None], 3, axis=2)
+        quantized = (pixels >> self._SHIFT).astype(np.uint16)
+        index = (quantized[:, :, 0] << 10) | (quantized[:, :, 1] << 5) | quantized[:, :, 2]
+        classes = self.lut[index]
+        # Пиксели граничных ячеек классифицируются точно
+        boundary = classes == self.BOUNDARY
+        if boundary.any():
+            classes[boundary] = self._classify(self.profile, pixels[boundary])
+        counts = np.bincount(classes.ravel(), minlength=len(self.class_names))
+        return {name: int(counts[i]) for i, name in enumerate(self.class_names)}
+
+    def ratios(self, image: np.ndarray) -> Dict[str, float]:
+        """Доля пикселей каждого класса от площади области"""
+        counts = self.count(image)
+        total = max(1, image.shape[0] * image.shape[1])
+        return {name: value / total for name, value in counts.items()}
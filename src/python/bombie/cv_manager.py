@@ -1,13 +1,43 @@
 # cv_manager.py
+import os
+import time
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from loguru import logger
-from typing import Optional, Tuple, List
+from typing import Callable, Dict, Optional, Sequence, Tuple, List
 from pathlib import Path
+from .color_detector import ColorRatioDetector
+from .resource_config import ThreadBudget
+
+# Количество потоков для параллельного сравнения шаблонов в match_many
+CV_MATCH_WORKERS = int(os.getenv('CV_MATCH_WORKERS', '4'))
+# Пирамидальный поиск для больших областей (грубый проход на уменьшенном изображении)
+ENABLE_PYRAMID_MATCH = os.getenv('ENABLE_PYRAMID_MATCH', 'true').lower() == 'true'
+
+@dataclass
+class MatchDecision:
+    """Результат сравнения области с парой шаблонов (true/false)"""
+    name: str
+    result: bool
+    true_score: float
+    false_score: float
+    elapsed_ms: float
 
 class CVManager:
     _instance = None
     _initialized = False
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    # Масштаб грубого прохода пирамидального поиска
+    PYRAMID_SCALE = 0.25
+    # Количество кандидатов, уточняемых в полном разрешении
+    PYRAMID_TOP_K = 3
+    # Минимальная площадь области (пикселей), начиная с которой используется пирамида
+    PYRAMID_MIN_AREA = 200 * 200
+    # Минимальная сторона шаблона в грубом проходе
+    PYRAMID_MIN_TEMPLATE = 8
     
     def __new__(cls):
         if cls._instance is None:
@@ -23,11 +53,13 @@ class CVManager:
     def cleanup(self):
         """Очистка ресурсов"""
         self._templates.clear()
+        self._gray_templates.clear()
         cv2.destroyAllWindows()
         
     def __init__(self):
         if not CVManager._initialized:
             self._templates = {}
+            self._gray_templates: Dict[int, np.ndarray] = {}
             # Ищем templates директорию, начиная с текущей директории и поднимаясь вверх
             current_dir = Path(__file__).parent
             self.templates_dir = None
@@ -45,6 +77,7 @@ class CVManager:
                 raise RuntimeError("Не удалось найти директорию templates")
                 
             logger.debug(f"Найдена директория templates: {self.templates_dir}")
+            ThreadBudget().apply_cv()
             self.load_checkbox_templates()
             CVManager._initialized = True
 
@@ -107,6 +140,20 @@ class CVManager:
             if failed:
                 raise RuntimeError(f"Не удалось загрузить шаблоны: {', '.join(failed)}")
                 
+            # Пары шаблонов для пакетной проверки в match_many
+            self.template_pairs = {
+                'autosell': (self.true_autosell_template, self.false_autosell_template),
+                'power_chest': (self.true_power_template, self.false_power_template),
+                'auto_skill': (self.true_auto_skill_template, self.false_auto_skill_template),
+                'daily_task_rewards': (self.true_daily_task_rewards_template,
+                                       self.false_daily_task_rewards_template),
+            }
+            # Решения пар, которые не сводятся к true_score > false_score
+            # (область в цвете, true_score, false_score) -> результат
+            self.pair_rules: Dict[str, Callable[[np.ndarray, float, float], bool]] = {
+                'auto_skill': self.auto_skill_rule,
+            }
+
             logger.info("Все шаблоны успешно загружены")
             logger.debug(f"Директория шаблонов: {self.templates_dir}")
             
@@ -150,6 +197,159 @@ class CVManager:
         logger.debug(f"Шаблоны не масштабируются: img_h={img_h}, img_w={img_w}, templ_h={templ_h}, templ_w={templ_w}")
         return template1, template2
 
+    @staticmethod
+    def frame_to_gray(frame: np.ndarray) -> np.ndarray:
+        """Перевод скриншота (RGB/RGBA) в оттенки серого"""
+        if frame.ndim == 2:
+            return frame
+        if frame.shape[2] == 4:
+            return cv2.cvtColor(frame, cv2.COLOR_RGBA2GRAY)
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+
+    def gray_template(self, template: np.ndarray) -> np.ndarray:
+        """Шаблон (BGR) в оттенках серого, преобразуется один раз"""
+        key = id(template)
+        gray = self._gray_templates.get(key)
+        if gray is None:
+            gray = template if template.ndim == 2 else cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+            self._gray_templates[key] = gray
+        return gray
+
+    @staticmethod
+    def crop_roi(image: np.ndarray, roi) -> np.ndarray:
+        """
+        Вырезание области из кадра
+        roi: None (весь кадр), (x1, y1, x2, y2) или объект с координатами углов (BoxCoordinates)
+        """
+        if roi is None:
+            return image
+        if hasattr(roi, 'top_left_x'):
+            roi = (roi.top_left_x, roi.top_left_y, roi.bottom_right_x, roi.bottom_right_y)
+        height, width = image.shape[:2]
+        x1, y1, x2, y2 = (int(value) for value in roi)
+        return image[max(0, y1):min(height, y2), max(0, x1):min(width, x2)]
+
+    @staticmethod
+    def match_exhaustive(image: np.ndarray, template: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        """Полный поиск шаблона: лучшее значение TM_CCOEFF_NORMED и его позиция (x, y)"""
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return float(max_val), max_loc
+
+    def match_pyramid(self, image: np.ndarray, template: np.ndarray,
+                      scale: float = PYRAMID_SCALE, top_k: int = PYRAMID_TOP_K) -> Tuple[float, Tuple[int, int]]:
+        """
+        Поиск шаблона от грубого к точному
+        - Сравнение на изображении, уменьшенном в 1/scale раз
+        - Уточнение top_k лучших кандидатов в полном разрешении в небольшом окне
+        """
+        templ_h, templ_w = template.shape[:2]
+        small_template = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        small_image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if (min(small_template.shape[:2]) < self.PYRAMID_MIN_TEMPLATE
+                or small_image.shape[0] < small_template.shape[0]
+                or small_image.shape[1] < small_template.shape[1]):
+            return self.match_exhaustive(image, template)
+
+        coarse = cv2.matchTemplate(small_image, small_template, cv2.TM_CCOEFF_NORMED)
+        # Запас окна уточнения покрывает ошибку округления грубого прохода
+        pad = int(np.ceil(1 / scale)) + 2
+        suppress_h = max(1, small_template.shape[0] // 2)
+        suppress_w = max(1, small_template.shape[1] // 2)
+        height, width = image.shape[:2]
+
+        best_val, best_loc = -1.0, (0, 0)
+        for _ in range(top_k):
+            _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(coarse)
+            if coarse_val <= -1.0:
+                break
+            # Подавление соседей, чтобы следующий кандидат был в другом месте
+            coarse[max(0, cy - suppress_h):cy + suppress_h + 1, max(0, cx - suppress_w):cx + suppress_w + 1] = -1.0
+
+            x = int(round(cx / scale))
+            y = int(round(cy / scale))
+            x1, y1 = max(0, x - pad), max(0, y - pad)
+            x2, y2 = min(width, x + templ_w + pad), min(height, y + templ_h + pad)
+            window = image[y1:y2, x1:x2]
+            if window.shape[0] < templ_h or window.shape[1] < templ_w:
+                continue
+            value, (wx, wy) = self.match_exhaustive(window, template)
+            if value > best_val:
+                best_val, best_loc = value, (x1 + wx, y1 + wy)
+
+        return best_val, best_loc
+
+    # Функция сравнения с автоматическим выбором режима поиска
+    def match_template(self, image: np.ndarray, template: np.ndarray,
+                       pyramid: Optional[bool] = None) -> Tuple[float, Tuple[int, int]]:
+        """
+        Поиск шаблона в изображении
+        pyramid=None - пирамида используется для больших областей (PYRAMID_MIN_AREA)
+        """
+        if pyramid is None:
+            pyramid = ENABLE_PYRAMID_MATCH and image.shape[0] * image.shape[1] >= self.PYRAMID_MIN_AREA
+        if pyramid:
+            return self.match_pyramid(image, template)
+        return self.match_exhaustive(image, template)
+
+    def _match_pair(self, name: str, gray: np.ndarray, pair: str, region: np.ndarray) -> MatchDecision:
+        """Сравнение серой области с парой шаблонов"""
+        started = time.perf_counter()
+        true_template, false_template = self.template_pairs[pair]
+        true_template, false_template = self.scale_template_if_needed(
+            gray, self.gray_template(true_template), self.gray_template(false_template)
+        )
+        true_score, _ = self.match_template(gray, true_template)
+        false_score, _ = self.match_template(gray, false_template)
+        rule = self.pair_rules.get(pair)
+        result = rule(region, true_score, false_score) if rule else true_score > false_score
+        return MatchDecision(name, result, true_score, false_score,
+                             (time.perf_counter() - started) * 1000)
+
+    # Функция пакетной проверки нескольких областей одного кадра
+    def match_many(self, frame: np.ndarray, checks: Sequence[Tuple[object, str]],
+                   parallel: bool = False) -> Dict[str, MatchDecision]:
+        """
+        Проверка всех ожидающих областей одного кадра за один вызов
+        
+        Args:
+            frame: Полный скриншот (RGB/RGBA)
+            checks: Список (roi, имя пары шаблонов из template_pairs)
+            parallel: Выполнять сравнения в пуле потоков (OpenCV освобождает GIL)
+            
+        Returns:
+            Dict[str, MatchDecision]: решение по каждой паре; при повторе пары ключ 'имя#индекс'
+        """
+        decisions: Dict[str, MatchDecision] = {}
+        try:
+            # Кадр переводится в оттенки серого один раз для всех областей
+            frame_gray = self.frame_to_gray(frame)
+
+            jobs = []
+            for index, (roi, pair) in enumerate(checks):
+                name = pair if not any(job[0] == pair for job in jobs) else f"{pair}#{index}"
+                jobs.append((name, self.crop_roi(frame_gray, roi), pair, self.crop_roi(frame, roi)))
+
+            with ThreadBudget().track('cv'):
+                if parallel and len(jobs) > 1:
+                    if CVManager._executor is None:
+                        CVManager._executor = ThreadPoolExecutor(max_workers=CV_MATCH_WORKERS,
+                                                                 thread_name_prefix="cv_match")
+                    results = list(CVManager._executor.map(lambda job: self._match_pair(*job), jobs))
+                else:
+                    results = [self._match_pair(*job) for job in jobs]
+
+            for decision in results:
+                decisions[decision.name] = decision
+                logger.debug(f"Совпадение {decision.name}: true={decision.true_score:.3f}, "
+                             f"false={decision.false_score:.3f}, результат={decision.result} "
+                             f"({decision.elapsed_ms:.2f} мс)")
+            return decisions
+
+        except Exception as e:
+            logger.error(f"Ошибка пакетной проверки шаблонов: {e}")
+            return decisions
+
     # Основная функция для определения состояния чекбокса автопродажи
     def find_autosell_checkbox(self, image: np.ndarray) -> bool:
         """Определение состояния чекбокса автопродажи"""
@@ -180,30 +380,10 @@ class CVManager:
         """Определение состояния индикатора силы с учетом цветовых характеристик"""
 
         try:
-            # Конвертируем в HSV для лучшего определения цветов
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Определяем диапазоны для зеленого цвета (положительное изменение)
-            lower_green = np.array([40, 50, 50])
-            upper_green = np.array([80, 255, 255])
-            
-            # Определяем диапазон для красного цвета (отрицательное изменение)
-            lower_red1 = np.array([0, 50, 50])
-            upper_red1 = np.array([10, 255, 255])
-            lower_red2 = np.array([170, 50, 50])
-            upper_red2 = np.array([180, 255, 255])
-            
-            # Создаем маски
-            mask_green = cv2.inRange(hsv, lower_green, upper_green)
-            mask_red1 = cv2.inRange(hsv, lower_red1, upper_red1)
-            mask_red2 = cv2.inRange(hsv, lower_red2, upper_red2)
-            
-            # Объединяем маски для красного цвета
-            mask_red = cv2.bitwise_or(mask_red1, mask_red2)
-            
-            # Подсчитываем пиксели
-            green_pixels = cv2.countNonZero(mask_green)
-            red_pixels = cv2.countNonZero(mask_red)
+            # Подсчет зеленых и красных пикселей за один проход по таблице цветов
+            counts = ColorRatioDetector.for_profile('power_arrows').count(image)
+            green_pixels = counts['green']
+            red_pixels = counts['red']
             
             total_pixels = green_pixels + red_pixels
             if total_pixels > 0:
@@ -242,22 +422,7 @@ class CVManager:
             
             logger.debug(f"Совпадение автоскилла: true={true_val:.3f}, false={false_val:.3f}")
             
-            # Если false_val больше, значит кнопка неактивна (false)
-            is_enabled = false_val >= true_val
-            
-            # Дополнительная проверка свечения для неактивной кнопки
-            if is_enabled:
-                # Конвертируем в grayscale для проверки яркости
-                if len(image.shape) == 3:
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                else:
-                    gray = image
-                    
-                _, bright_mask = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY)
-                bright_pixels = cv2.countNonZero(bright_mask)
-                has_glow = bright_pixels > (gray.size * 0.1)
-                logger.debug(f"Проверка свечения: has_glow={has_glow}, bright_pixels={bright_pixels}")
-                is_enabled = has_glow
+            is_enabled = self.auto_skill_rule(image, true_val, false_val)
             
             logger.info(f"Состояние кнопки 'Автоскилл': {is_enabled}")
             return is_enabled
@@ -266,6 +431,20 @@ class CVManager:
             logger.error(f"Ошибка при определении состояния автоскилла: {e}")
             return False
 
+    # Решение по кнопке 'Автоскилл' (общее для find_auto_skill_button и match_many)
+    def auto_skill_rule(self, image: np.ndarray, true_val: float, false_val: float) -> bool:
+        """Кнопка активна, если она ближе к шаблону false и светится"""
+        # Если false_val больше, значит кнопка неактивна (false)
+        if false_val < true_val:
+            return False
+
+        # Дополнительная проверка свечения для неактивной кнопки
+        # Доля ярких пикселей по таблице цветов
+        bright_pixels = ColorRatioDetector.for_profile('glow').count(image)['bright']
+        has_glow = bright_pixels > (image.shape[0] * image.shape[1] * 0.1)
+        logger.debug(f"Проверка свечения: has_glow={has_glow}, bright_pixels={bright_pixels}")
+        return has_glow
+
     # Основная функция для определения состояния наград в Daily Task
     def find_daily_task_rewards(self, image: np.ndarray) -> bool:
         """Определение состояния наград в Daily Task"""
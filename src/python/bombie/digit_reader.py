@@ -0,0 +1,266 @@
+# digit_reader.py
+import os
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from dotenv import load_dotenv
+from .cv_manager import CVManager
+
+load_dotenv()
+
+# Пополнение шаблонов цифр глифами, подтвержденными через OCR
+# Шаблоны цифр не поставляются: без обучения чтение всегда уходит в OCR
+ENABLE_DIGIT_LEARNING = os.getenv('ENABLE_DIGIT_LEARNING', 'true').lower() == 'true'
+# Каталог глифов, записанных при обучении (вне templates, как и кадры экранов)
+DIGIT_CACHE_DIR = os.getenv('DIGIT_CACHE_DIR', './cache/digits')
+# Количество совпадающих чтений OCR, после которого глиф сохраняется как шаблон
+DIGIT_LEARN_CONFIRMATIONS = max(1, int(os.getenv('DIGIT_LEARN_CONFIRMATIONS', '3')))
+
+@dataclass
+class DigitReading:
+    """Результат чтения числа по шаблонам глифов"""
+    text: str
+    confidence: float
+    ambiguous: bool
+    elapsed_ms: float
+    glyphs: List[np.ndarray] = field(default_factory=list, repr=False)
+
+    @property
+    def value(self) -> Optional[int]:
+        return int(self.text) if self.text.isdigit() else None
+
+class DigitReader:
+    """
+    Чтение небольших целых чисел (счетчик сундуков) без OCR
+    - Область бинаризуется и разбивается на связные компоненты (глифы)
+    - Каждый глиф сравнивается с шаблонами цифр templates/digits/<цифра>*.png и DIGIT_CACHE_DIR
+    - Неоднозначное сравнение помечается, чтобы вызывающий код использовал OCR
+    - Пока шаблонов нет для всех цифр 0-9, чтение всегда неоднозначно
+    """
+    _instance = None
+    _lock = Lock()
+
+    # Размер нормализованного глифа (ширина, высота)
+    GLYPH_SIZE = (16, 24)
+    # Минимальная корреляция с лучшим шаблоном
+    MIN_SCORE = 0.75
+    # Минимальный отрыв лучшей цифры от второй
+    MIN_MARGIN = 0.08
+    # Минимальная высота глифа относительно высоты области
+    MIN_GLYPH_HEIGHT = 0.35
+    # Максимальное количество шаблонов одной цифры при обучении
+    MAX_SAMPLES_PER_DIGIT = 10
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
+        return cls._instance
+
+    def _initialize(self):
+        """Загрузка шаблонов цифр"""
+        self.digits_dir: Path = CVManager().templates_dir / "digits"
+        self.cache_dir = Path(DIGIT_CACHE_DIR)
+        # Кандидаты в шаблоны: цифра -> (глиф, количество совпавших чтений OCR)
+        self._candidates: Dict[str, Tuple[np.ndarray, int]] = {}
+        self._vectors = np.empty((0, self.GLYPH_SIZE[0] * self.GLYPH_SIZE[1]), dtype=np.float32)
+        self._labels: List[str] = []
+        self.load_templates()
+
+    def load_templates(self):
+        """Загрузка шаблонов: первый символ имени файла - цифра"""
+        vectors = []
+        labels = []
+        paths = []
+        for root in (self.digits_dir, self.cache_dir):
+            if root.is_dir():
+                paths.extend(sorted(root.iterdir()))
+        for path in paths:
+            if path.suffix.lower() not in ('.png', '.jpg', '.jpeg') or not path.name[0].isdigit():
+                continue
+            template = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                logger.warning(f"Не удалось загрузить шаблон цифры: {path}")
+                continue
+            _, template = cv2.threshold(template, 127, 255, cv2.THRESH_BINARY)
+            vectors.append(self._glyph_vector(template))
+            labels.append(path.name[0])
+
+        if vectors:
+            self._vectors = np.stack(vectors)
+        self._labels = labels
+        logger.info(f"Загружено шаблонов цифр: {len(labels)} ({''.join(sorted(set(labels))) or 'нет'})")
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._labels
+
+    @property
+    def is_complete(self) -> bool:
+        """Шаблоны есть для всех цифр 0-9: иначе глиф отсутствующей цифры совпадет с похожей"""
+        return set(self._labels) >= set('0123456789')
+
+    @classmethod
+    def _glyph_vector(cls, glyph: np.ndarray) -> np.ndarray:
+        """Нормализованный вектор глифа (нулевое среднее, единичная норма)"""
+        resized = cv2.resize(glyph, cls.GLYPH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        resized -= resized.mean()
+        norm = np.linalg.norm(resized)
+        return resized / norm if norm > 0 else resized
+
+    @classmethod
+    def binarize(cls, image: np.ndarray) -> np.ndarray:
+        """Бинаризация области: цифры - белые, фон - черный"""
+        gray = image
+        if image.ndim == 3:
+            # Скриншоты приходят в RGB(A), среднее по каналам не зависит от порядка
+            gray = image[:, :, :3].mean(axis=2).astype(np.uint8)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        # Фон определяется по рамке области: если она в основном белая, инвертируем
+        border = np.concatenate([binary[0], binary[-1], binary[:, 0], binary[:, -1]])
+        if border.mean() > 127:
+            binary = cv2.bitwise_not(binary)
+        return binary
+
+    @classmethod
+    def segment(cls, binary: np.ndarray) -> List[np.ndarray]:
+        """Разбиение бинарной области на глифы слева направо"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        height = binary.shape[0]
+
+        boxes = []
+        for index in range(1, count):
+            x, y, w, h, area = stats[index]
+            if h < height * cls.MIN_GLYPH_HEIGHT or area < 4:
+                continue
+            boxes.append([x, y, x + w, y + h])
+        boxes.sort(key=lambda box: box[0])
+
+        # Объединяем компоненты, перекрывающиеся по горизонтали (разорванные глифы)
+        merged: List[List[int]] = []
+        for box in boxes:
+            if merged and box[0] < merged[-1][2]:
+                last = merged[-1]
+                merged[-1] = [min(last[0], box[0]), min(last[1], box[1]),
+                              max(last[2], box[2]), max(last[3], box[3])]
+            else:
+                merged.append(box)
+
+        return [binary[y1:y2, x1:x2] for x1, y1, x2, y2 in merged]
+
+    def classify_glyph(self, glyph: np.ndarray) -> Tuple[str, float, float]:
+        """Лучшая цифра для глифа, корреляция и отрыв от второй цифры"""
+        scores = self._vectors @ self._glyph_vector(glyph)
+        best_per_digit: Dict[str, float] = {}
+        for label, score in zip(self._labels, scores):
+            if score > best_per_digit.get(label, -1.0):
+                best_per_digit[label] = float(score)
+
+        ranked = sorted(best_per_digit.items(), key=lambda item: item[1], reverse=True)
+        digit, score = ranked[0]
+        # С одной известной цифрой отрыв не определен: глиф считается неоднозначным
+        margin = score - ranked[1][1] if len(ranked) > 1 else 0.0
+        return digit, score, margin
+
+    # Основная функция чтения числа
+    def read(self, image: np.ndarray) -> DigitReading:
+        """Чтение числа из области счетчика"""
+        started = time.perf_counter()
+        try:
+            if image is None or image.size == 0:
+                return DigitReading("", 0.0, True, (time.perf_counter() - started) * 1000)
+
+            # Без полного набора шаблонов и без обучения глифы не нужны: сразу OCR
+            if not self.is_complete and not ENABLE_DIGIT_LEARNING:
+                return DigitReading("", 0.0, True, (time.perf_counter() - started) * 1000)
+
+            glyphs = self.segment(self.binarize(image))
+            # Глифы возвращаются и при неполном наборе шаблонов, чтобы OCR мог их дообучить
+            if not glyphs or not self.is_complete:
+                return DigitReading("", 0.0, True, (time.perf_counter() - started) * 1000, glyphs)
+
+            text = []
+            confidence = 1.0
+            ambiguous = False
+            for glyph in glyphs:
+                digit, score, margin = self.classify_glyph(glyph)
+                text.append(digit)
+                confidence = min(confidence, score)
+                if score < self.MIN_SCORE or margin < self.MIN_MARGIN:
+                    ambiguous = True
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            reading = DigitReading(''.join(text), confidence, ambiguous, elapsed_ms, glyphs)
+            logger.debug(f"Чтение цифр по шаблонам: '{reading.text}' (confidence={confidence:.2f}, "
+                         f"ambiguous={ambiguous}, {elapsed_ms:.2f} мс)")
+            return reading
+
+        except Exception as e:
+            logger.error(f"Ошибка чтения цифр по шаблонам: {e}")
+            return DigitReading("", 0.0, True, (time.perf_counter() - started) * 1000)
+
+    def _confirm(self, digit: str, glyph: np.ndarray) -> bool:
+        """
+        Учет чтения OCR для кандидата цифры
+        Глиф сохраняется, когда DIGIT_LEARN_CONFIRMATIONS чтений подряд дали ту же цифру
+        для похожего глифа; непохожий глиф начинает подсчет заново
+        """
+        # Шаблоны уверенно видят другую цифру: чтение OCR не подтверждает глиф
+        if not self.is_empty:
+            known, score, margin = self.classify_glyph(glyph)
+            if known != digit and score >= self.MIN_SCORE and margin >= self.MIN_MARGIN:
+                logger.debug(f"Глиф не сохранен: OCR прочитал {digit}, шаблоны - {known}")
+                return False
+
+        candidate = self._candidates.get(digit)
+        if candidate is not None:
+            score = float(self._glyph_vector(candidate[0]) @ self._glyph_vector(glyph))
+            if score >= self.MIN_SCORE:
+                count = candidate[1] + 1
+                if count >= DIGIT_LEARN_CONFIRMATIONS:
+                    del self._candidates[digit]
+                    return True
+                self._candidates[digit] = (candidate[0], count)
+                return False
+        if DIGIT_LEARN_CONFIRMATIONS <= 1:
+            return True
+        self._candidates[digit] = (glyph, 1)
+        return False
+
+    # Функция обучения шаблонов по результату OCR
+    def learn(self, reading: DigitReading, text: str) -> bool:
+        """Сохранение глифов как шаблонов после нескольких совпадающих чтений OCR той же длины"""
+        if not ENABLE_DIGIT_LEARNING or not text.isdigit() or len(text) != len(reading.glyphs):
+            return False
+        try:
+            added = False
+            for digit, glyph in zip(text, reading.glyphs):
+                if self._labels.count(digit) >= self.MAX_SAMPLES_PER_DIGIT:
+                    continue
+                if not self._confirm(digit, glyph):
+                    continue
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                path = self.cache_dir / f"{digit}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.png"
+                if not cv2.imwrite(str(path), glyph):
+                    logger.error(f"Не удалось сохранить шаблон цифры: {path}")
+                    continue
+                with self._lock:
+                    self._vectors = np.vstack([self._vectors, self._glyph_vector(glyph)[None, :]])
+                    self._labels.append(digit)
+                added = True
+                logger.info(f"Шаблон цифры {digit} добавлен: {path}")
+            return added
+
+        except Exception as e:
+            logger.error(f"Ошибка сохранения шаблонов цифр: {e}")
+            return False
@@ -0,0 +1,188 @@
+# flow_machine.py
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+
+class _RetrySignal:
+    """Маркер повтора: обработчик состояния просит повторить попытку"""
+    def __repr__(self):
+        return "RETRY"
+
+# Обработчик состояния возвращает следующее состояние или RETRY
+RETRY = _RetrySignal()
+
+@dataclass
+class StateTransition:
+    """Информация о переходе между состояниями"""
+    flow: str
+    from_state: str
+    to_state: str
+    attempt: int
+    duration: float
+    reason: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+
+class TransitionMetrics:
+    """Сбор метрик переходов всех конечных автоматов"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.transitions = defaultdict(int)
+            cls._instance.state_time = defaultdict(float)
+            cls._instance.outcomes = defaultdict(int)
+        return cls._instance
+
+    # Функция регистрации перехода
+    def record(self, transition: StateTransition):
+        """Регистрация перехода"""
+        self.transitions[(transition.flow, transition.from_state, transition.to_state)] += 1
+        self.state_time[(transition.flow, transition.from_state)] += transition.duration
+        logger.debug(
+            f"[{transition.flow}] {transition.from_state} -> {transition.to_state} "
+            f"(попытка {transition.attempt}, {transition.duration:.2f} сек"
+            f"{', ' + transition.reason if transition.reason else ''})"
+        )
+
+    # Функция регистрации результата работы автомата
+    def record_outcome(self, flow: str, outcome: Any):
+        """Регистрация итогового результата автомата"""
+        self.outcomes[(flow, str(outcome))] += 1
+
+@dataclass
+class RetryPolicy:
+    """Политика повторов с экспоненциальной задержкой"""
+    # Общее количество попыток (первая попытка и повторы)
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 8.0
+    jitter: float = 0.3
+
+    def delay(self, attempt: int) -> float:
+        """Задержка перед попыткой с номером attempt (начиная с 1)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+class FlowStateMachine:
+    """
+    Конечный автомат для игровых сценариев
+    - Каждое состояние обрабатывается асинхронной функцией, возвращающей следующее состояние
+    - RETRY расходует бюджет повторов и возвращает автомат в retry_state с задержкой
+    - Таймаут или исключение в обработчике считаются запросом повтора
+    - После исчерпания бюджета автомат переходит в exhausted_state
+    """
+
+    def __init__(self,
+                 name: str,
+                 initial: Enum,
+                 handlers: Dict[Enum, Callable[[], Awaitable[Any]]],
+                 results: Dict[Enum, Any],
+                 retry_state: Enum,
+                 exhausted_state: Enum,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 timeouts: Optional[Dict[Enum, float]] = None,
+                 default_timeout: float = 60.0,
+                 max_steps: int = 100,
+                 fallback_result: Any = 'error'):
+        self.name = name
+        self.initial = initial
+        self.handlers = handlers
+        self.results = results
+        self.retry_state = retry_state
+        self.exhausted_state = exhausted_state
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_steps = max_steps
+        self.fallback_result = fallback_result
+        self.metrics = TransitionMetrics()
+        self.history: List[StateTransition] = []
+
+    def _emit(self, from_state: Enum, to_state: Enum, attempt: int, started: float, reason: Optional[str] = None):
+        """Формирование и регистрация перехода"""
+        transition = StateTransition(
+            flow=self.name,
+            from_state=from_state.value,
+            to_state=to_state.value,
+            attempt=attempt,
+            duration=time.monotonic() - started,
+            reason=reason
+        )
+        self.history.append(transition)
+        self.metrics.record(transition)
+
+    # Основная функция выполнения автомата
+    async def run(self) -> Any:
+        """Выполнение автомата до терминального состояния"""
+        state = self.initial
+        attempt = 0
+        exhausted = False
+
+        for _ in range(self.max_steps):
+            if state in self.results:
+                result = self.results[state]
+                self.metrics.record_outcome(self.name, result)
+                logger.info(f"[{self.name}] Завершение в состоянии {state.value}: {result}")
+                return result
+
+            handler = self.handlers[state]
+            timeout = self.timeouts.get(state, self.default_timeout)
+            started = time.monotonic()
+            reason = None
+
+            try:
+                next_state = await asyncio.wait_for(handler(), timeout=timeout)
+            except asyncio.TimeoutError:
+                reason = f"таймаут {timeout} сек"
+                logger.warning(f"[{self.name}] Таймаут состояния {state.value} ({timeout} сек)")
+                next_state = RETRY
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                reason = f"ошибка: {e}"
+                logger.error(f"[{self.name}] Ошибка в состоянии {state.value}: {e}")
+                next_state = RETRY
+
+            if next_state is RETRY:
+                # После исчерпания бюджета повторов обработчик финального состояния
+                # не должен снова запускать повторы
+                if exhausted:
+                    next_state = self.exhausted_state
+                    if next_state == state:
+                        logger.error(f"[{self.name}] Не удалось выполнить {state.value} после исчерпания "
+                                     f"повторов: {reason or 'обработчик запросил повтор'}")
+                        self.metrics.record_outcome(self.name, self.fallback_result)
+                        return self.fallback_result
+                    self._emit(state, next_state, attempt, started, reason)
+                    state = next_state
+                    continue
+
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts:
+                    logger.warning(f"[{self.name}] Превышено максимальное количество попыток ({attempt})")
+                    exhausted = True
+                    self._emit(state, self.exhausted_state, attempt, started, reason or "бюджет повторов исчерпан")
+                    state = self.exhausted_state
+                    continue
+
+                delay = self.retry_policy.delay(attempt)
+                logger.info(f"[{self.name}] Попытка {attempt + 1}/{self.retry_policy.max_attempts} "
+                            f"из {state.value} через {delay:.2f} сек")
+                self._emit(state, self.retry_state, attempt, started, reason or "повтор")
+                await asyncio.sleep(delay)
+                state = self.retry_state
+                continue
+
+            self._emit(state, next_state, attempt, started, reason)
+            state = next_state
+
+        logger.error(f"[{self.name}] Превышено максимальное количество шагов автомата ({self.max_steps})")
+        self.metrics.record_outcome(self.name, self.fallback_result)
+        return self.fallback_result
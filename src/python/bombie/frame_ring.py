@@ -0,0 +1,148 @@
+# frame_ring.py
+import atexit
+import os
+import time
+import numpy as np
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from threading import Lock
+from typing import Optional, Tuple
+from loguru import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Публикация скриншотов в общую память для процессов OCR/CV
+ENABLE_FRAME_RING = os.getenv('ENABLE_FRAME_RING', 'false').lower() == 'true'
+FRAME_RING_SLOTS = int(os.getenv('FRAME_RING_SLOTS', '8'))
+# Максимальный размер кадра (высота, ширина, каналы)
+FRAME_RING_MAX_SHAPE = (1000, 500, 4)
+
+@dataclass(frozen=True)
+class FrameDescriptor:
+    """Описание кадра в кольцевом буфере (передается через очередь вместо массива)"""
+    ring: str
+    slot: int
+    sequence: int
+    shape: Tuple[int, ...]
+    dtype: str
+    timestamp: float
+
+class SharedFrameRing:
+    """
+    Кольцевой буфер кадров в общей памяти
+    - Процесс бота записывает кадры в слоты по кругу
+    - Рабочие процессы подключаются по имени и читают кадр по слоту без копирования
+    - Номер последовательности слота позволяет обнаружить перезаписанный кадр
+    """
+
+    def __init__(self, name: Optional[str] = None, slots: int = FRAME_RING_SLOTS,
+                 max_shape: Tuple[int, ...] = FRAME_RING_MAX_SHAPE, create: bool = True):
+        self.slots = slots
+        self.max_shape = tuple(max_shape)
+        self.slot_bytes = int(np.prod(self.max_shape))
+        # Заголовок: номер последовательности каждого слота (int64)
+        header_bytes = 8 * slots
+        self._lock = Lock()
+        self._sequence = 0
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=header_bytes + self.slot_bytes * slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Подключенный процесс не владеет памятью: не даем resource_tracker удалить ее при выходе
+            try:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self.owner = create
+        self.name = self.shm.name
+
+        self._sequences = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf[:header_bytes])
+        self._data = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf[header_bytes:])
+        if create:
+            self._sequences[:] = -1
+            logger.info(f"Создан буфер кадров {self.name}: {slots} слотов по {self.slot_bytes // 1024} КБ")
+
+    @classmethod
+    def attach(cls, name: str, slots: int = FRAME_RING_SLOTS,
+               max_shape: Tuple[int, ...] = FRAME_RING_MAX_SHAPE) -> 'SharedFrameRing':
+        """Подключение к существующему буферу из рабочего процесса"""
+        return cls(name=name, slots=slots, max_shape=max_shape, create=False)
+
+    # Основная функция записи кадра
+    def write(self, frame: np.ndarray) -> FrameDescriptor:
+        """Копирование кадра в следующий слот"""
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Кадр {frame.shape} не помещается в слот {self.max_shape}")
+
+        with self._lock:
+            sequence = self._sequence
+            self._sequence += 1
+        slot = sequence % self.slots
+
+        # Слот помечается как записываемый, затем данные, затем номер последовательности
+        self._sequences[slot] = -1
+        self._data[slot, :frame.nbytes] = frame.reshape(-1).view(np.uint8)
+        self._sequences[slot] = sequence
+
+        return FrameDescriptor(self.name, slot, sequence, frame.shape, frame.dtype.str, time.time())
+
+    def is_valid(self, descriptor: FrameDescriptor) -> bool:
+        """Кадр все еще находится в слоте (не перезаписан)"""
+        return int(self._sequences[descriptor.slot]) == descriptor.sequence
+
+    # Основная функция чтения кадра
+    def read(self, descriptor: FrameDescriptor, copy: bool = False) -> Optional[np.ndarray]:
+        """
+        Получение кадра по описанию
+        copy=False возвращает представление общей памяти: после обработки следует
+        проверить is_valid, так как слот мог быть перезаписан
+        """
+        if not self.is_valid(descriptor):
+            logger.debug(f"Кадр {descriptor.sequence} в слоте {descriptor.slot} уже перезаписан")
+            return None
+
+        dtype = np.dtype(descriptor.dtype)
+        size = int(np.prod(descriptor.shape)) * dtype.itemsize
+        frame = self._data[descriptor.slot, :size].view(dtype).reshape(descriptor.shape)
+        if copy:
+            frame = frame.copy()
+            if not self.is_valid(descriptor):
+                return None
+        return frame
+
+    def close(self):
+        """Отключение от общей памяти (владелец также удаляет ее)"""
+        try:
+            # Представления numpy должны быть освобождены до закрытия буфера
+            del self._sequences
+            del self._data
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+                logger.info(f"Буфер кадров {self.name} удален")
+        except Exception as e:
+            logger.error(f"Ошибка закрытия буфера кадров: {e}")
+
+_frame_ring: Optional[SharedFrameRing] = None
+_frame_ring_lock = Lock()
+
+def get_frame_ring() -> Optional[SharedFrameRing]:
+    """Общий буфер кадров процесса бота (None, если выключен в ENABLE_FRAME_RING)"""
+    global _frame_ring
+    if not ENABLE_FRAME_RING:
+        return None
+    if _frame_ring is None:
+        with _frame_ring_lock:
+            if _frame_ring is None:
+                try:
+                    _frame_ring = SharedFrameRing()
+                    # Общая память не освобождается автоматически при завершении процесса
+                    atexit.register(_frame_ring.close)
+                except Exception as e:
+                    logger.error(f"Ошибка создания буфера кадров: {e}")
+                    return None
+    return _frame_ring
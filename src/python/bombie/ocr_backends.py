@@ -0,0 +1,152 @@
+# ocr_backends.py
+import os
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Путь к специализированной модели распознавания (ONNX, int8) и ее алфавит
+# Модель не входит в поставку: без файла бэкенд dnn недоступен и заменяется на easyocr
+OCR_DIGIT_MODEL = os.getenv('OCR_DIGIT_MODEL', './models/digits_crnn_int8.onnx')
+OCR_DIGIT_CHARSET = os.getenv('OCR_DIGIT_CHARSET', '0123456789.')
+
+# Результат в формате easyocr.readtext: (bbox, text, confidence)
+ReadResult = Tuple[List[List[float]], str, float]
+
+class OCRBackend(ABC):
+    """Базовый интерфейс бэкенда распознавания"""
+    name = "base"
+
+    @classmethod
+    def available(cls) -> bool:
+        """Проверка доступности бэкенда в текущем окружении"""
+        return True
+
+    @abstractmethod
+    def readtext(self, image: np.ndarray, allowlist: Optional[str] = None, **kwargs) -> List[ReadResult]:
+        """Распознавание текста в формате easyocr.readtext"""
+
+class EasyOCRBackend(OCRBackend):
+    """Бэкенд на основе общего easyocr.Reader (детектор + распознаватель)"""
+    name = "easyocr"
+
+    def readtext(self, image: np.ndarray, allowlist: Optional[str] = None, **kwargs) -> List[ReadResult]:
+        from .ocr_manager import OCRManager
+
+        reader = OCRManager().get_reader
+        if allowlist is not None:
+            kwargs['allowlist'] = allowlist
+        return reader.readtext(image, **kwargs)
+
+class DnnTextBackend(OCRBackend):
+    """
+    Легкий бэкенд на OpenCV DNN для коротких надписей (счетчики, метки)
+    - Загружает квантованную CRNN модель в формате ONNX без torch
+    - Распознает одну строку текста во всей области (без детектора)
+    - Декодирует выход CTC жадным методом
+    - Модель (OCR_DIGIT_MODEL) обучается и экспортируется отдельно, в репозитории ее нет
+    """
+    name = "dnn"
+
+    # Размер входа модели (высота, ширина)
+    INPUT_SIZE = (32, 128)
+
+    def __init__(self, model_path: str = OCR_DIGIT_MODEL, charset: str = OCR_DIGIT_CHARSET):
+        self.model_path = Path(model_path)
+        self.charset = charset
+        if not self.model_path.exists():
+            raise FileNotFoundError(f"Модель распознавания не найдена: {self.model_path}")
+        self.net = cv2.dnn.readNetFromONNX(str(self.model_path))
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        logger.info(f"Загружена DNN модель распознавания: {self.model_path}")
+
+    @classmethod
+    def available(cls) -> bool:
+        return Path(OCR_DIGIT_MODEL).exists()
+
+    def _prepare(self, image: np.ndarray) -> np.ndarray:
+        """Подготовка входного тензора модели"""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2GRAY)
+        height, width = self.INPUT_SIZE
+        return cv2.dnn.blobFromImage(image, scalefactor=1 / 127.5, size=(width, height), mean=127.5)
+
+    def _decode(self, output: np.ndarray) -> Tuple[str, float]:
+        """Жадное CTC декодирование: индекс 0 - пустой символ"""
+        # Выход CRNN имеет форму (T, 1, C) или (1, T, C), приводим к (T, C)
+        scores = output.reshape(-1, output.shape[-1])
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+
+        chars = []
+        confidences = []
+        previous = 0
+        for step, index in enumerate(best):
+            if index != 0 and index != previous and index - 1 < len(self.charset):
+                chars.append(self.charset[index - 1])
+                confidences.append(probs[step, index])
+            previous = index
+        confidence = float(np.prod(confidences)) if confidences else 0.0
+        return ''.join(chars), confidence
+
+    def readtext(self, image: np.ndarray, allowlist: Optional[str] = None, **kwargs) -> List[ReadResult]:
+        height, width = image.shape[:2]
+        self.net.setInput(self._prepare(image))
+        text, confidence = self._decode(self.net.forward())
+        if allowlist is not None:
+            text = ''.join(c for c in text if c in allowlist)
+        if not text:
+            return []
+        bbox = [[0, 0], [width, 0], [width, height], [0, height]]
+        return [(bbox, text, confidence)]
+
+# Реестр доступных бэкендов
+BACKENDS = {
+    EasyOCRBackend.name: EasyOCRBackend,
+    DnnTextBackend.name: DnnTextBackend,
+}
+
+_instances: Dict[str, OCRBackend] = {}
+_instances_lock = Lock()
+
+def get_backend(name: str = EasyOCRBackend.name) -> OCRBackend:
+    """
+    Получение экземпляра бэкенда по имени
+    Если бэкенд недоступен, используется easyocr (замена запоминается под запрошенным именем)
+    """
+    backend = _instances.get(name)
+    if backend is not None:
+        return backend
+
+    with _instances_lock:
+        if name in _instances:
+            return _instances[name]
+        backend_cls = BACKENDS.get(name)
+        if backend_cls is None:
+            logger.warning(f"Неизвестный бэкенд OCR '{name}', используется easyocr")
+        elif not backend_cls.available():
+            logger.warning(f"Бэкенд OCR '{name}' недоступен, используется easyocr")
+        else:
+            try:
+                _instances[name] = backend_cls()
+                return _instances[name]
+            except Exception as e:
+                logger.error(f"Ошибка инициализации бэкенда OCR '{name}': {e}")
+
+        # Замена запоминается, чтобы проверка и предупреждение не повторялись при каждом вызове
+        _instances[name] = _get_backend_unlocked(EasyOCRBackend.name)
+        return _instances[name]
+
+def _get_backend_unlocked(name: str) -> OCRBackend:
+    """Получение экземпляра бэкенда без блокировки (вызывается под _instances_lock)"""
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
@@ -0,0 +1,118 @@
+# ocr_benchmark.py
+"""
+Сравнение бэкендов OCR на записанных кадрах
+
+Запуск из src/python:
+    python -m bombie.ocr_benchmark --frames ./frames --backend easyocr dnn
+
+Каждый бэкенд запускается в отдельном процессе, чтобы память одной модели
+не влияла на замер другой. Если рядом с кадрами лежит labels.json
+({"имя_файла": "ожидаемый текст"}), дополнительно считается точность.
+"""
+import argparse
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FRAME_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+def _max_rss_mb() -> Optional[float]:
+    """Пиковое потребление памяти текущего процесса в МБ"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает КБ, macOS - байты
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def _run_backend(backend_name: str, frame_paths: List[str], labels: Dict[str, str], queue) -> None:
+    """Замер одного бэкенда (выполняется в дочернем процессе)"""
+    import cv2
+    from bombie.ocr_backends import get_backend
+    from bombie.ocr_manager import OCRCoordinator
+
+    rss_start = _max_rss_mb()
+    started = time.perf_counter()
+    backend = get_backend(backend_name)
+    # Первый вызов прогревает модель (для easyocr загрузка происходит здесь)
+    first = cv2.imread(frame_paths[0], cv2.IMREAD_COLOR)
+    backend.readtext(first, allowlist='0123456789.')
+    load_time = time.perf_counter() - started
+    rss_loaded = _max_rss_mb()
+
+    latencies = []
+    correct = 0
+    for path in frame_paths:
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        call_started = time.perf_counter()
+        texts = OCRCoordinator.get_numbers_from_image(frame, backend=backend_name)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+        expected = labels.get(Path(path).name)
+        if expected is not None and expected in texts:
+            correct += 1
+
+    latencies.sort()
+    # Точность считается только по кадрам с разметкой в labels.json
+    labeled = len([p for p in frame_paths if Path(p).name in labels])
+    queue.put({
+        'backend': type(backend).__name__,
+        'frames': len(latencies),
+        'load_s': load_time,
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': latencies[len(latencies) // 2],
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'rss_start_mb': rss_start,
+        'rss_loaded_mb': rss_loaded,
+        'rss_peak_mb': _max_rss_mb(),
+        'accuracy': correct / labeled if labeled else None,
+    })
+
+def _format(value, pattern: str) -> str:
+    return pattern.format(value) if value is not None else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение задержки и памяти бэкендов OCR")
+    parser.add_argument('--frames', required=True, help="Каталог с записанными кадрами (области счетчиков)")
+    parser.add_argument('--backend', nargs='+', default=['easyocr', 'dnn'], help="Имена бэкендов")
+    parser.add_argument('--limit', type=int, default=0, help="Ограничение количества кадров")
+    args = parser.parse_args()
+
+    frames_dir = Path(args.frames)
+    frame_paths = sorted(str(p) for p in frames_dir.iterdir() if p.suffix.lower() in FRAME_SUFFIXES)
+    if args.limit:
+        frame_paths = frame_paths[:args.limit]
+    if not frame_paths:
+        print(f"Кадры не найдены в {frames_dir}")
+        return 1
+
+    labels_path = frames_dir / 'labels.json'
+    labels = json.loads(labels_path.read_text(encoding='utf-8')) if labels_path.exists() else {}
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'backend':<18}{'frames':>7}{'load s':>9}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'rss0 MB':>9}{'rss MB':>9}{'peak MB':>9}{'acc':>7}")
+    for name in args.backend:
+        queue = context.Queue()
+        process = context.Process(target=_run_backend, args=(name, frame_paths, labels, queue))
+        process.start()
+        process.join()
+        if queue.empty():
+            print(f"{name:<18} ошибка выполнения (код {process.exitcode})")
+            continue
+        r = queue.get()
+        print(f"{name + '/' + r['backend'][:8]:<18}{r['frames']:>7}{r['load_s']:>9.2f}{r['mean_ms']:>10.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{_format(r['rss_start_mb'], '{:>9.0f}'):>9}"
+              f"{_format(r['rss_loaded_mb'], '{:>9.0f}'):>9}{_format(r['rss_peak_mb'], '{:>9.0f}'):>9}"
+              f"{_format(r['accuracy'], '{:>7.2f}'):>7}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
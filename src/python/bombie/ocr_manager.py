@@ -1,15 +1,24 @@
-import torch
+import os
 import cv2
 from loguru import logger
 from dataclasses import dataclass, field
-import easyocr
+from dotenv import load_dotenv
 from .data_class import BoxCoordinates, BoxObject, GlobalBoxStorage
+from .text_matcher import KeywordMatcher
+from .ocr_backends import get_backend
+from .preprocess_pipeline import PreprocessPipeline, get_default_pipeline
+from .resource_config import ThreadBudget
 from typing import Optional, Tuple
 import numpy as np
 import certifi
 import ssl
 import urllib.request
 
+load_dotenv()
+
+# Бэкенд распознавания цифр по умолчанию (easyocr или dnn)
+OCR_NUMBERS_BACKEND = os.getenv('OCR_NUMBERS_BACKEND', 'easyocr')
+
 class OCRManager:
     _instance = None
     _reader = None
@@ -18,9 +27,15 @@ class OCRManager:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             try:
+                # torch и easyocr загружаются только при первом обращении к OCR,
+                # процессы с легким бэкендом их не импортируют
+                import torch
+                import easyocr
+
                 # Настройки для безопасной загрузки моделей
                 torch.backends.cudnn.enabled = False
                 torch.set_grad_enabled(False)
+                ThreadBudget().apply_torch(torch)
                 
                 # Настройка безопасного SSL-контекста
                 ssl_context = ssl.create_default_context(
@@ -65,6 +80,7 @@ class OCRManager:
             try:
                 logger.debug("Очистка ресурсов OCR Reader")
                 del self._reader
+                import torch
                 torch.cuda.empty_cache()
                 logger.debug("Ресурсы OCR Reader успешно очищены")
             except Exception as e:
@@ -81,59 +97,53 @@ class OCRCoordinator:
     """
 
     @staticmethod
-    def preprocess_image(image: np.ndarray) -> np.ndarray:
+    def preprocess_image(image: np.ndarray, pipeline: Optional[PreprocessPipeline] = None) -> np.ndarray:
         """
         Предварительная обработка изображения для улучшения распознавания цифр
+        
+        Args:
+            image: Изображение в формате numpy array
+            pipeline: Цепочка этапов (по умолчанию из OCR_PREPROCESS_STAGES)
         """
         try:
-            # Увеличение размера
-            image = cv2.resize(image, None, fx=1.5, fy=1.5, 
-                            interpolation=cv2.INTER_CUBIC)
-            
-            # Преобразование в оттенки серого
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Адаптивная бинаризация
-            binary = cv2.adaptiveThreshold(gray, 255, 
-                                        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                        cv2.THRESH_BINARY, 11, 2)
-            
-            # Удаление шума
-            denoised = cv2.fastNlMeansDenoising(binary)
-            
-            return denoised
+            return (pipeline or get_default_pipeline()).run(image)
         except Exception as e:
             logger.error(f"Ошибка предобработки изображения: {e}")
             return image
     
     @staticmethod
-    def get_numbers_from_image(image: np.ndarray) -> list[str]:
+    def get_numbers_from_image(image: np.ndarray, backend: Optional[str] = None) -> list[str]:
         """
         Оптимизированное получение текста с акцентом на цифры
+        
+        Args:
+            image: Изображение в формате numpy array
+            backend: Имя бэкенда распознавания (по умолчанию OCR_NUMBERS_BACKEND)
         """
         try:
-            reader = OCRManager().get_reader
+            ocr_backend = get_backend(backend or OCR_NUMBERS_BACKEND)
             
-            # Параметры для readtext метода
-            results = reader.readtext(
-                image,
-                decoder='beamsearch',  # Использовать beam search для лучшего распознавания
-                beamWidth=10,  # Увеличенная ширина луча для более точного поиска
-                batch_size=1,  # Размер пакета для обработки
-                allowlist='0123456789.',  # Разрешить только цифры и точку
-                detail=1,  # Возвращать детальную информацию
-                min_size=10,  # Минимальный размер текстового блока
-                text_threshold=0.3,  # Порог уверенности для текста
-                low_text=0.3,  # Нижний порог для слабого текста
-                link_threshold=0.3,  # Порог связности текстовых блоков
-                canvas_size=1280,  # Максимальный размер изображения
-                mag_ratio=1.5,  # Коэффициент увеличения для мелкого текста
-                slope_ths=0.2,  # Максимальный наклон для объединения блоков
-                ycenter_ths=0.7,  # Порог центрирования по Y
-                height_ths=0.7,  # Порог различия высоты блоков
-                width_ths=0.7,  # Порог расстояния между блоками
-                add_margin=0.15,  # Дополнительные отступы вокруг текста
-            )
+            # Параметры для readtext метода (легкие бэкенды используют только allowlist)
+            with ThreadBudget().track('ocr'):
+                results = ocr_backend.readtext(
+                    image,
+                    decoder='beamsearch',  # Использовать beam search для лучшего распознавания
+                    beamWidth=10,  # Увеличенная ширина луча для более точного поиска
+                    batch_size=1,  # Размер пакета для обработки
+                    allowlist='0123456789.',  # Разрешить только цифры и точку
+                    detail=1,  # Возвращать детальную информацию
+                    min_size=10,  # Минимальный размер текстового блока
+                    text_threshold=0.3,  # Порог уверенности для текста
+                    low_text=0.3,  # Нижний порог для слабого текста
+                    link_threshold=0.3,  # Порог связности текстовых блоков
+                    canvas_size=1280,  # Максимальный размер изображения
+                    mag_ratio=1.5,  # Коэффициент увеличения для мелкого текста
+                    slope_ths=0.2,  # Максимальный наклон для объединения блоков
+                    ycenter_ths=0.7,  # Порог центрирования по Y
+                    height_ths=0.7,  # Порог различия высоты блоков
+                    width_ths=0.7,  # Порог расстояния между блоками
+                    add_margin=0.15,  # Дополнительные отступы вокруг текста
+                )
             
             logger.info(f"Найденные тексты: {results}")
             
@@ -165,19 +175,45 @@ class OCRCoordinator:
             logger.error(f"Ошибка распознавания текста: {e}")
             return ["1"]  # Также возвращаем 1 в случае ошибки
 
+    @staticmethod
+    def match_keywords(results: list, matcher: KeywordMatcher, threshold: float) -> list[dict]:
+        """
+        Поиск ключевых слов в результатах readtext одним проходом по каждому тексту
+        
+        Returns:
+            list[dict]: ключевое слово, позиция в тексте, bbox и вероятность
+        """
+        found_matches = []
+        for bbox, detected_text, prob in results:
+            if prob < threshold:
+                continue
+            for match in matcher.find_all(detected_text):
+                found_matches.append({
+                    'text': match.keyword,
+                    'matched_text': match.matched_text,
+                    'span': (match.start, match.end),
+                    'bbox': bbox,
+                    'prob': prob
+                })
+                logger.info(f"Найден текст '{match.keyword}' ('{match.matched_text}' "
+                            f"[{match.start}:{match.end}]) с вероятностью {prob:.2f}")
+        return found_matches
+
     @staticmethod
     def check_text_in_area(image: np.ndarray, 
-                          texts: str | list[str], 
+                          texts: str | list[str] | KeywordMatcher, 
                           zone: Optional[BoxCoordinates] = None, 
-                          threshold: float = 0.85) -> Tuple[bool, float]:
+                          threshold: float = 0.85,
+                          backend: str = 'easyocr') -> Tuple[bool, float]:
         """
         Проверяет наличие текстов в указанной зоне или во всем изображении
         
         Args:
             image: Изображение в формате numpy array
-            texts: Искомый текст или список текстов
+            texts: Искомый текст, список текстов или готовый KeywordMatcher
             zone: Опциональная зона поиска. Если None, используется все изображение
             threshold: Минимальный порог вероятности распознавания
+            backend: Имя бэкенда распознавания
         """
         logger.debug(f"Поиск текстов{' в зоне: ' + str(zone) if zone else ' во всем изображении'}")
         
@@ -221,30 +257,20 @@ class OCRCoordinator:
                 return False, 0.0
 
             # Дальнейшая обработка текста
-            reader = OCRManager().get_reader
-            texts_to_check = [texts] if isinstance(texts, str) else texts
+            ocr_backend = get_backend(backend)
+            matcher = texts if isinstance(texts, KeywordMatcher) else KeywordMatcher.for_keywords(texts)
             
-            results = reader.readtext(image_to_process)
+            with ThreadBudget().track('ocr'):
+                results = ocr_backend.readtext(image_to_process)
             logger.debug(f"Найденные тексты: {results}")
             
-            found_matches = []
-            total_prob = 0
-            
-            for _, detected_text, prob in results:
-                for search_text in texts_to_check:
-                    if search_text.lower() in detected_text.lower() and prob >= threshold:
-                        found_matches.append({
-                            'text': search_text,
-                            'prob': prob
-                        })
-                        total_prob += prob
-                        logger.info(f"Найден текст '{search_text}' с вероятностью {prob:.2f}")
+            found_matches = OCRCoordinator.match_keywords(results, matcher, threshold)
             
             if found_matches:
-                avg_prob = total_prob / len(found_matches)
+                avg_prob = sum(match['prob'] for match in found_matches) / len(found_matches)
                 return True, avg_prob
                 
-            logger.debug(f"Тексты {texts_to_check} не найдены")
+            logger.debug(f"Тексты {list(matcher.keywords.values())} не найдены")
             return False, 0.0
             
         except cv2.error as cv_err:
@@ -0,0 +1,201 @@
+# ocr_service.py
+import asyncio
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
+from loguru import logger
+from dotenv import load_dotenv
+from .cv_manager import CVManager
+from .data_class import BoxCoordinates
+from .frame_ring import FrameDescriptor, SharedFrameRing, get_frame_ring
+from .ocr_manager import OCRCoordinator, OCRManager
+from .resource_config import ThreadBudget
+from .text_matcher import KeywordMatcher
+
+load_dotenv()
+
+# Распознавание в отдельных процессах вместо текущего интерпретатора
+ENABLE_OCR_POOL = os.getenv('ENABLE_OCR_POOL', 'false').lower() == 'true'
+# Количество процессов OCR и потоков torch в каждом из них
+# (0 - бюджет потоков сессии делится между процессами при запуске пула)
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+OCR_WORKER_THREADS = int(os.getenv('OCR_WORKER_THREADS', '0'))
+
+# Состояние рабочего процесса
+_worker_ring: Optional[SharedFrameRing] = None
+
+def _venv_python() -> Optional[str]:
+    """
+    Интерпретатор для рабочих процессов
+    Внутри Rust-хоста sys.executable - бинарник бота, а не Python: spawn запустил бы бота заново
+    """
+    windows = sys.platform.startswith('win')
+    # Окружение создается лаунчером в текущей директории (python_env), иначе ищется в корне проекта
+    for root in (Path.cwd(), Path(__file__).resolve().parents[3]):
+        venv_python = root / 'python_env' / ('Scripts' if windows else 'bin') / ('python.exe' if windows else 'python')
+        if venv_python.exists():
+            return str(venv_python)
+    if Path(sys.executable).name.lower().startswith('python'):
+        return sys.executable
+    return None
+
+def _worker_init(num_threads: int, ring_name: Optional[str]):
+    """Инициализация рабочего процесса: бюджет потоков и однократная загрузка модели"""
+    global _worker_ring
+    import torch
+
+    # Бюджет процесса задается до OCRManager: иначе apply_torch вернет бюджет всей сессии
+    ThreadBudget().override(num_threads)
+    torch.set_grad_enabled(False)
+    OCRManager()
+    if ring_name:
+        _worker_ring = SharedFrameRing.attach(ring_name)
+    logger.info(f"Процесс OCR {os.getpid()} готов (потоков torch: {num_threads})")
+
+def _worker_image(image: np.ndarray | FrameDescriptor) -> np.ndarray:
+    """Получение изображения: массив передан напрямую или находится в общем буфере"""
+    if isinstance(image, FrameDescriptor):
+        if _worker_ring is None:
+            raise RuntimeError("Процесс OCR не подключен к буферу кадров")
+        frame = _worker_ring.read(image, copy=True)
+        if frame is None:
+            raise RuntimeError(f"Кадр {image.sequence} перезаписан до обработки")
+        return frame
+    return image
+
+def _worker_numbers(image, backend: Optional[str]) -> list[str]:
+    return OCRCoordinator.get_numbers_from_image(_worker_image(image), backend)
+
+def _worker_numbers_from_frame(frame: FrameDescriptor, roi: BoxCoordinates, backend: Optional[str]) -> list[str]:
+    """Полный кадр читается из общего буфера, область вырезается и обрабатывается в процессе OCR"""
+    image = CVManager.crop_roi(_worker_image(frame), roi)
+    return OCRCoordinator.get_numbers_from_image(OCRCoordinator.preprocess_image(image), backend)
+
+def _worker_check_text(image, texts, zone, threshold: float, backend: str) -> Tuple[bool, float]:
+    return OCRCoordinator.check_text_in_area(_worker_image(image), texts, zone, threshold, backend)
+
+def _worker_readtext(image) -> list:
+    return OCRManager().get_reader.readtext(_worker_image(image))
+
+class OCRService:
+    """
+    Пул процессов OCR с моделью, загруженной в каждом процессе один раз
+    - Каждый процесс ограничен OCR_WORKER_THREADS потоками torch
+    - Процессы запускаются интерпретатором python_env; без него распознавание
+      выполняется в потоке текущего процесса
+    - Изображения передаются через общий буфер кадров (если включен), иначе сериализуются
+    - Асинхронный клиент повторяет интерфейс OCRCoordinator
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self.ring = get_frame_ring()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.worker_threads = OCR_WORKER_THREADS or max(1, ThreadBudget().threads // max(1, OCR_WORKERS))
+
+        executable = _venv_python()
+        if executable is None:
+            logger.error(f"Интерпретатор Python для пула OCR не найден ({sys.executable} - не Python), "
+                         f"распознавание выполняется в текущем процессе")
+            return
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(executable)
+        self.executor = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            mp_context=context,
+            initializer=_worker_init,
+            initargs=(self.worker_threads, self.ring.name if self.ring else None)
+        )
+        logger.info(f"Пул OCR запущен: {OCR_WORKERS} процессов по {self.worker_threads} потоков ({executable})")
+
+    def _pack(self, image: np.ndarray) -> np.ndarray | FrameDescriptor:
+        """Запись изображения в общий буфер, в очередь передается только описание"""
+        if self.ring is not None:
+            try:
+                return self.ring.write(image)
+            except Exception as e:
+                logger.debug(f"Изображение передается напрямую: {e}")
+        return image
+
+    async def _submit(self, function, image: np.ndarray, *args):
+        """Выполнение задачи в пуле; при потере кадра в буфере повтор с прямой передачей"""
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            return await loop.run_in_executor(None, function, image, *args)
+        packed = self._pack(image)
+        try:
+            return await loop.run_in_executor(self.executor, function, packed, *args)
+        except RuntimeError as e:
+            if not isinstance(packed, FrameDescriptor):
+                raise
+            logger.warning(f"Повтор задачи OCR без общего буфера: {e}")
+            return await loop.run_in_executor(self.executor, function, image, *args)
+
+    @staticmethod
+    def preprocess_image(image: np.ndarray) -> np.ndarray:
+        """Предобработка выполняется в текущем процессе (дешевле передачи)"""
+        return OCRCoordinator.preprocess_image(image)
+
+    async def get_numbers_from_image(self, image: np.ndarray, backend: Optional[str] = None) -> list[str]:
+        """Распознавание цифр в пуле процессов"""
+        try:
+            return await self._submit(_worker_numbers, image, backend)
+        except Exception as e:
+            logger.error(f"Ошибка распознавания цифр в пуле OCR: {e}")
+            return ["1"]
+
+    async def get_numbers_from_frame(self, frame: FrameDescriptor, roi: BoxCoordinates,
+                                     backend: Optional[str] = None) -> Optional[list[str]]:
+        """
+        Распознавание цифр в области кадра, опубликованного ScreenManager в общий буфер
+        В очередь передаются только описание кадра и область, без копии изображения
+        None - кадр недоступен (перезаписан или пул без процессов), изображение передается напрямую
+        """
+        if self.executor is None or self.ring is None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _worker_numbers_from_frame, frame, roi, backend)
+        except RuntimeError as e:
+            logger.warning(f"Кадр из общего буфера недоступен: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка распознавания цифр в пуле OCR: {e}")
+            return ["1"]
+
+    async def check_text_in_area(self, image: np.ndarray,
+                                 texts: str | list[str] | KeywordMatcher,
+                                 zone: Optional[BoxCoordinates] = None,
+                                 threshold: float = 0.85,
+                                 backend: str = 'easyocr') -> Tuple[bool, float]:
+        """Проверка наличия текстов в пуле процессов"""
+        try:
+            return await self._submit(_worker_check_text, image, texts, zone, threshold, backend)
+        except Exception as e:
+            logger.error(f"Ошибка поиска текста в пуле OCR: {e}")
+            return False, 0.0
+
+    async def readtext(self, image: np.ndarray) -> list:
+        """Полное распознавание изображения в пуле процессов"""
+        try:
+            return await self._submit(_worker_readtext, image)
+        except Exception as e:
+            logger.error(f"Ошибка распознавания в пуле OCR: {e}")
+            return []
+
+    def shutdown(self):
+        """Остановка процессов пула"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        OCRService._instance = None
+        logger.info("Пул OCR остановлен")
@@ -0,0 +1,125 @@
+# preprocess_pipeline.py
+import os
+import time
+import cv2
+import numpy as np
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence
+from loguru import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Этапы предобработки по умолчанию (имена из STAGES через запятую)
+OCR_PREPROCESS_STAGES = os.getenv('OCR_PREPROCESS_STAGES', 'resize,grayscale,threshold,nlmeans')
+
+def _resize(image: np.ndarray) -> np.ndarray:
+    """Увеличение размера в 1.5 раза"""
+    return cv2.resize(image, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_CUBIC)
+
+def _grayscale(image: np.ndarray) -> np.ndarray:
+    """Преобразование в оттенки серого"""
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def _threshold(image: np.ndarray) -> np.ndarray:
+    """Адаптивная бинаризация"""
+    return cv2.adaptiveThreshold(_grayscale(image), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, 11, 2)
+
+def _otsu(image: np.ndarray) -> np.ndarray:
+    """Глобальная бинаризация методом Оцу"""
+    _, binary = cv2.threshold(_grayscale(image), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+_OPEN_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+
+def _open(image: np.ndarray) -> np.ndarray:
+    """Морфологическое открытие: удаление одиночных точек"""
+    return cv2.morphologyEx(image, cv2.MORPH_OPEN, _OPEN_KERNEL)
+
+def _median(image: np.ndarray) -> np.ndarray:
+    """Медианный фильтр 3x3"""
+    return cv2.medianBlur(image, 3)
+
+def _nlmeans(image: np.ndarray) -> np.ndarray:
+    """Удаление шума методом non-local means (самый дорогой этап)"""
+    return cv2.fastNlMeansDenoising(image)
+
+# Реестр этапов предобработки
+STAGES: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'resize': _resize,
+    'grayscale': _grayscale,
+    'threshold': _threshold,
+    'otsu': _otsu,
+    'open': _open,
+    'median': _median,
+    'nlmeans': _nlmeans,
+}
+
+class PreprocessPipeline:
+    """
+    Настраиваемая цепочка этапов предобработки изображения для OCR
+    - Этапы задаются именами из STAGES
+    - Время каждого этапа накапливается для анализа стоимости
+    """
+
+    def __init__(self, stages: Sequence[str] | str = OCR_PREPROCESS_STAGES):
+        if isinstance(stages, str):
+            stages = [name.strip() for name in stages.split(',') if name.strip()]
+        unknown = [name for name in stages if name not in STAGES]
+        if unknown:
+            raise ValueError(f"Неизвестные этапы предобработки: {', '.join(unknown)}")
+        self.stages: List[str] = list(stages)
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def __repr__(self) -> str:
+        return f"PreprocessPipeline({','.join(self.stages)})"
+
+    # Основная функция выполнения цепочки
+    def run(self, image: np.ndarray) -> np.ndarray:
+        """Последовательное применение этапов с замером времени"""
+        for name in self.stages:
+            started = time.perf_counter()
+            image = STAGES[name](image)
+            self.timings[name] += (time.perf_counter() - started) * 1000
+            self.calls[name] += 1
+        return image
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Среднее и суммарное время этапов в мс"""
+        return {
+            name: {
+                'calls': self.calls[name],
+                'total_ms': self.timings[name],
+                'mean_ms': self.timings[name] / self.calls[name] if self.calls[name] else 0.0
+            }
+            for name in self.stages
+        }
+
+    def log_stats(self):
+        """Вывод статистики этапов в лог"""
+        if not any(self.calls.values()):
+            return
+        summary = ', '.join(f"{name}={values['mean_ms']:.2f} мс"
+                            for name, values in self.stats().items())
+        logger.info(f"Время этапов предобработки: {summary}")
+
+    def reset_stats(self):
+        """Сброс накопленной статистики"""
+        self.timings.clear()
+        self.calls.clear()
+
+_default_pipeline: Optional[PreprocessPipeline] = None
+
+def get_default_pipeline() -> PreprocessPipeline:
+    """Цепочка из OCR_PREPROCESS_STAGES (создается один раз)"""
+    global _default_pipeline
+    if _default_pipeline is None:
+        _default_pipeline = PreprocessPipeline()
+        logger.debug(f"Цепочка предобработки: {_default_pipeline}")
+    return _default_pipeline
@@ -0,0 +1,97 @@
+# preprocess_search.py
+"""
+Подбор самой дешевой цепочки предобработки на записанных кадрах
+
+Запуск из src/python:
+    python -m bombie.preprocess_search --frames ./frames --backend easyocr
+
+Каталог кадров должен содержать labels.json ({"имя_файла": "ожидаемое число"}).
+Для каждой комбинации этапов считается точность распознавания и среднее время
+предобработки; выводятся цепочки, точность которых не ниже базовой цепочки
+(с допуском --tolerance), от самой дешевой к самой дорогой.
+"""
+import argparse
+import itertools
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from bombie.ocr_manager import OCRCoordinator
+from bombie.preprocess_pipeline import OCR_PREPROCESS_STAGES, PreprocessPipeline
+
+FRAME_SUFFIXES = ('.png', '.jpg', '.jpeg')
+
+# Варианты каждого шага цепочки (пустой кортеж - шаг пропускается)
+SEARCH_SPACE = (
+    ((), ('resize',)),
+    (('grayscale',),),
+    ((), ('threshold',), ('otsu',)),
+    ((), ('open',), ('median',), ('nlmeans',), ('open', 'median')),
+)
+
+def candidate_pipelines() -> List[Tuple[str, ...]]:
+    """Все комбинации этапов из SEARCH_SPACE"""
+    return [sum(choice, ()) for choice in itertools.product(*SEARCH_SPACE)]
+
+def evaluate(stages: Tuple[str, ...], frames: List[Tuple[str, np.ndarray]],
+             labels: Dict[str, str], backend: str) -> Tuple[float, float]:
+    """Точность и среднее время предобработки цепочки в мс"""
+    pipeline = PreprocessPipeline(stages)
+    correct = 0
+    for name, frame in frames:
+        processed = pipeline.run(frame)
+        texts = OCRCoordinator.get_numbers_from_image(processed, backend=backend)
+        if labels[name] in texts:
+            correct += 1
+    total_ms = sum(values['total_ms'] for values in pipeline.stats().values())
+    return correct / len(frames), total_ms / len(frames)
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор цепочки предобработки для OCR цифр")
+    parser.add_argument('--frames', required=True, help="Каталог с кадрами и labels.json")
+    parser.add_argument('--backend', default='easyocr', help="Бэкенд распознавания")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="Допустимая потеря точности")
+    args = parser.parse_args()
+
+    frames_dir = Path(args.frames)
+    labels_path = frames_dir / 'labels.json'
+    if not labels_path.exists():
+        print(f"Не найден {labels_path}")
+        return 1
+    labels = json.loads(labels_path.read_text(encoding='utf-8'))
+
+    frames = []
+    for path in sorted(frames_dir.iterdir()):
+        if path.suffix.lower() in FRAME_SUFFIXES and path.name in labels:
+            frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append((path.name, frame))
+    if not frames:
+        print(f"Размеченные кадры не найдены в {frames_dir}")
+        return 1
+
+    baseline = tuple(name.strip() for name in OCR_PREPROCESS_STAGES.split(',') if name.strip())
+    baseline_accuracy, baseline_ms = evaluate(baseline, frames, labels, args.backend)
+    print(f"Базовая цепочка {','.join(baseline)}: точность {baseline_accuracy:.2f}, {baseline_ms:.2f} мс")
+
+    results = []
+    for stages in candidate_pipelines():
+        accuracy, mean_ms = evaluate(stages, frames, labels, args.backend)
+        results.append((stages, accuracy, mean_ms))
+        print(f"  {','.join(stages):<40} точность {accuracy:.2f}, {mean_ms:.2f} мс")
+
+    accepted = sorted((r for r in results if r[1] >= baseline_accuracy - args.tolerance),
+                      key=lambda r: (r[2], -r[1]))
+    print("\nЦепочки без потери точности (от дешевой к дорогой):")
+    for stages, accuracy, mean_ms in accepted:
+        print(f"  {','.join(stages):<40} точность {accuracy:.2f}, {mean_ms:.2f} мс")
+    if accepted:
+        print(f"\nOCR_PREPROCESS_STAGES={','.join(accepted[0][0])}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# readiness.py
+import os
+import time
+import asyncio
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from loguru import logger
+from playwright.async_api import Page
+from dotenv import load_dotenv
+from .bombie_objects import ScreenManager
+from .screen_classifier import ScreenClassifier, ScreenId
+
+load_dotenv()
+
+# Максимальное время ожидания готовности игры (сек)
+READINESS_TIMEOUT = float(os.getenv('READINESS_TIMEOUT', '30'))
+# Максимальное время появления #GameCanvas (сек): без canvas ожидание прекращается сразу
+CANVAS_TIMEOUT = float(os.getenv('CANVAS_TIMEOUT', '15'))
+# Интервал опроса (сек)
+READINESS_POLL_INTERVAL = 0.25
+
+@dataclass
+class ReadinessResult:
+    """Результат ожидания готовности игры"""
+    ready: bool
+    elapsed: float
+    checks: Dict[str, bool] = field(default_factory=dict)
+    reason: str = ""
+
+class GameReadinessDetector:
+    """
+    Составной сигнал готовности игры вместо networkidle и фиксированных пауз
+    - canvas: на странице есть #GameCanvas
+    - webapp: инициализирован Telegram WebApp
+    - screen: ScreenClassifier определяет любой экран, кроме загрузки (меню, всплывающее окно,
+      сундук), или кадр canvas перестал заметно меняться
+    Всплывающие окна при запуске (награды и т.п.) считаются готовностью: их закрывает control_processes
+    Ожидание завершается неудачей только без canvas или если до таймаута виден экран загрузки
+    """
+    # Максимальное расстояние Хэмминга между хешами соседних кадров (из 256 бит):
+    # анимация простоя меняет несколько процентов бит, загрузка - перерисовывает экран
+    STABLE_DISTANCE = 24
+    # Количество подряд идущих стабильных кадров
+    STABLE_FRAMES = 2
+
+    def __init__(self, page: Page, screen_manager: Optional[ScreenManager] = None):
+        self.page = page
+        self.screen_manager = screen_manager or ScreenManager(page)
+        self.classifier = ScreenClassifier()
+
+    async def _page_state(self) -> Dict[str, bool]:
+        """Проверка canvas и WebApp одним вызовом в странице"""
+        return await self.page.evaluate("""
+            () => ({
+                canvas: !!document.querySelector('#GameCanvas'),
+                webapp: !!window.Telegram?.WebApp
+            })
+        """)
+
+    # Функция ожидания готовности игры
+    async def wait_until_ready(self, timeout: float = READINESS_TIMEOUT,
+                               require_frames: bool = True) -> ReadinessResult:
+        """
+        Ожидание готовности игры
+
+        Args:
+            timeout: Максимальное время ожидания
+            require_frames: Проверять экран по кадрам canvas
+                            (False - только наличие canvas и WebApp)
+        """
+        started = time.perf_counter()
+        checks = {'canvas': False, 'webapp': False}
+        if require_frames:
+            checks['screen'] = False
+
+        previous_hash: Optional[np.ndarray] = None
+        stable_frames = 0
+        screen = ScreenId.UNKNOWN
+
+        try:
+            while True:
+                elapsed = time.perf_counter() - started
+                if self.page.is_closed():
+                    return ReadinessResult(False, elapsed, checks, "страница закрыта")
+                if elapsed > timeout:
+                    if not checks['canvas']:
+                        return ReadinessResult(False, elapsed, checks, "canvas не найден")
+                    if screen == ScreenId.LOADING:
+                        return ReadinessResult(False, elapsed, checks, "экран загрузки до таймаута")
+                    # Canvas есть и загрузка не видна: дальнейшие экраны обрабатывает логика
+                    logger.warning(f"Готовность игры не подтверждена за {elapsed:.1f} сек "
+                                   f"({checks}), продолжаем")
+                    return ReadinessResult(True, elapsed, checks, "таймаут")
+
+                state = await self._page_state()
+                checks['canvas'] = state['canvas']
+                checks['webapp'] = state['webapp']
+                if not checks['canvas'] and elapsed > CANVAS_TIMEOUT:
+                    return ReadinessResult(False, elapsed, checks, "canvas не найден")
+
+                if checks['canvas'] and require_frames:
+                    frame = await self.screen_manager.take_screenshot()
+                    if frame is not None:
+                        frame_hash = self.classifier.frame_hash(frame)
+                        if previous_hash is not None:
+                            distance = self.classifier.hash_distance(previous_hash, frame_hash)
+                            stable_frames = stable_frames + 1 if distance <= self.STABLE_DISTANCE else 0
+                        previous_hash = frame_hash
+                        screen = self.classifier.classify(frame).screen
+                        if screen == ScreenId.LOADING:
+                            checks['screen'] = False
+                        else:
+                            checks['screen'] = screen != ScreenId.UNKNOWN or stable_frames >= self.STABLE_FRAMES
+
+                if all(checks.values()):
+                    elapsed = time.perf_counter() - started
+                    logger.info(f"Игра готова за {elapsed:.1f} сек (экран: {screen.value})")
+                    return ReadinessResult(True, elapsed, checks)
+
+                await asyncio.sleep(READINESS_POLL_INTERVAL)
+
+        except Exception as e:
+            logger.error(f"Ошибка проверки готовности игры: {e}")
+            return ReadinessResult(False, time.perf_counter() - started, checks, str(e))
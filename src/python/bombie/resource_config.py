@@ -0,0 +1,156 @@
+# resource_config.py
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict
+from loguru import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Количество одновременно работающих сессий бота на машине
+BOT_SESSION_COUNT = max(1, int(os.getenv('BOT_SESSION_COUNT', '1')))
+# Явное количество потоков на сессию (0 - ядра процессора поровну между сессиями)
+BOT_THREADS_PER_SESSION = int(os.getenv('BOT_THREADS_PER_SESSION', '0'))
+
+# Переменные окружения, ограничивающие потоки BLAS/OpenMP
+BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                 'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS')
+# Значение, заданное до запуска интерпретатора (лаунчером или родительским процессом):
+# библиотеки BLAS читают переменные только при загрузке numpy
+_BLAS_PRESET = os.environ.get('OPENBLAS_NUM_THREADS')
+
+class ThreadBudget:
+    """
+    Единая настройка потоков torch, OpenCV и BLAS
+    - Бюджет потоков вычисляется из количества ядер и BOT_SESSION_COUNT
+    - Переменные BLAS задает лаунчер до запуска интерпретатора, они наследуются дочерними процессами
+    - Уже загруженные библиотеки BLAS ограничиваются через threadpoolctl
+    - Время работы компонентов накапливается для оценки загрузки процессора
+    """
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
+        return cls._instance
+
+    def _initialize(self):
+        self.cpu_count = os.cpu_count() or 1
+        self.sessions = BOT_SESSION_COUNT
+        self.threads = BOT_THREADS_PER_SESSION or max(1, self.cpu_count // self.sessions)
+        self.applied: Dict[str, int] = {}
+        self.busy_time: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.started_wall = time.monotonic()
+        self.started_cpu = time.process_time()
+        self.apply_blas()
+        logger.info(f"Бюджет потоков: {self.threads} на сессию "
+                    f"(ядер: {self.cpu_count}, сессий: {self.sessions})")
+
+    def apply_blas(self):
+        """Ограничение потоков BLAS/OpenMP"""
+        # Переменные действуют только на библиотеки, загруженные позже (дочерние процессы)
+        for name in BLAS_ENV_VARS:
+            os.environ.setdefault(name, str(self.threads))
+
+        # Библиотеки BLAS, загруженные до этого момента, ограничиваются через threadpoolctl
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=self.threads)
+            self.applied['blas'] = self.threads
+            return
+        except ImportError:
+            pass
+
+        if 'numpy' not in sys.modules or _BLAS_PRESET == str(self.threads):
+            self.applied['blas'] = self.threads
+        else:
+            self.applied.pop('blas', None)
+            logger.warning(f"Потоки BLAS не ограничены: numpy загружен до настройки "
+                           f"(переменные окружения: {_BLAS_PRESET or 'не заданы'}), threadpoolctl не установлен")
+
+    def apply_torch(self, torch_module=None):
+        """Ограничение внутренних потоков torch"""
+        torch_module = torch_module or sys.modules.get('torch')
+        if torch_module is None:
+            return
+        try:
+            torch_module.set_num_threads(self.threads)
+            self.applied['torch'] = self.threads
+        except Exception as e:
+            logger.error(f"Ошибка настройки потоков torch: {e}")
+
+    def apply_cv(self):
+        """Ограничение внутренних потоков OpenCV"""
+        try:
+            import cv2
+            cv2.setNumThreads(self.threads)
+            self.applied['cv2'] = self.threads
+        except Exception as e:
+            logger.error(f"Ошибка настройки потоков OpenCV: {e}")
+
+    def apply(self):
+        """Применение бюджета ко всем уже загруженным библиотекам"""
+        self.apply_blas()
+        self.apply_cv()
+        self.apply_torch()
+
+    def override(self, threads: int):
+        """
+        Бюджет потоков текущего процесса вместо бюджета сессии
+        Рабочие процессы пула OCR делят бюджет сессии между собой: переменные BLAS,
+        унаследованные от родителя, перезаписываются, загруженные библиотеки ограничиваются заново
+        """
+        self.threads = max(1, threads)
+        for name in BLAS_ENV_VARS:
+            os.environ[name] = str(self.threads)
+        self.apply()
+
+    @contextmanager
+    def track(self, component: str):
+        """Учет времени работы компонента (ocr, cv)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy_time[component] += time.perf_counter() - started
+            self.calls[component] += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Статистика загрузки для подбора BOT_SESSION_COUNT и бюджета потоков"""
+        wall = max(1e-6, time.monotonic() - self.started_wall)
+        cpu = time.process_time() - self.started_cpu
+        return {
+            'threads_per_session': self.threads,
+            'sessions': self.sessions,
+            'applied': dict(self.applied),
+            'active_threads': threading.active_count(),
+            # Доля бюджета потоков, занятая процессом (1.0 - бюджет использован полностью)
+            'cpu_utilisation': cpu / (wall * self.threads),
+            'components': {
+                name: {
+                    'calls': self.calls[name],
+                    'busy_s': self.busy_time[name],
+                    'busy_share': self.busy_time[name] / wall
+                }
+                for name in self.busy_time
+            }
+        }
+
+    def log_stats(self):
+        """Вывод статистики загрузки в лог"""
+        stats = self.stats()
+        components = ', '.join(f"{name}={values['busy_share']:.1%} ({values['calls']} вызовов)"
+                               for name, values in stats['components'].items())
+        logger.info(f"Загрузка: CPU {stats['cpu_utilisation']:.1%} от бюджета {stats['threads_per_session']} потоков, "
+                    f"потоков процесса {stats['active_threads']}{', ' + components if components else ''}")
@@ -0,0 +1,213 @@
+# screen_classifier.py
+import os
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+from loguru import logger
+from dotenv import load_dotenv
+from .cv_manager import CVManager
+
+load_dotenv()
+
+# Пополнение индекса кадрами, подтвержденными через OCR
+# Ключевые слова меню видны и под всплывающими окнами, поэтому обучение включается вручную
+ENABLE_SCREEN_LEARNING = os.getenv('ENABLE_SCREEN_LEARNING', 'false').lower() == 'true'
+# Каталог кадров, записанных при обучении (вне templates, чтобы не менять шаблоны репозитория)
+SCREEN_CACHE_DIR = os.getenv('SCREEN_CACHE_DIR', './cache/screens')
+# Минимальная уверенность, при которой другой распознанный экран принимается без проверки OCR
+SCREEN_TRUST_CONFIDENCE = float(os.getenv('SCREEN_TRUST_CONFIDENCE', '0.5'))
+
+class ScreenId(Enum):
+    """Известные экраны игры"""
+    MAIN_MENU = "main_menu"
+    CHEST_OPEN = "chest_open"
+    TASK_LIST = "task_list"
+    SHOP = "shop"
+    POPUP = "popup"
+    LOADING = "loading"
+    UNKNOWN = "unknown"
+
+@dataclass
+class ScreenPrediction:
+    """Результат классификации экрана"""
+    screen: ScreenId
+    distance: int
+    confidence: float
+    elapsed_ms: float
+
+    @property
+    def is_known(self) -> bool:
+        return self.screen != ScreenId.UNKNOWN
+
+    @property
+    def is_confident(self) -> bool:
+        """Экран распознан достаточно уверенно, чтобы не перепроверять его через OCR"""
+        return self.is_known and self.confidence >= SCREEN_TRUST_CONFIDENCE
+
+class ScreenClassifier:
+    """
+    Определение текущего экрана игры за один проход
+    - Кадр уменьшается до миниатюры и кодируется разностным хешем (dHash)
+    - Индекс хешей строится из кадров templates/screens/<screen_id>/ и SCREEN_CACHE_DIR/<screen_id>/
+    - Ближайший кадр по расстоянию Хэмминга определяет экран
+    """
+    _instance = None
+    _lock = Lock()
+
+    # Размер хеша: HASH_SIZE x HASH_SIZE бит
+    HASH_SIZE = 16
+    # Максимальное расстояние Хэмминга для уверенного совпадения
+    MAX_DISTANCE = 40
+    # Максимальное количество кадров одного экрана при обучении
+    MAX_SAMPLES_PER_SCREEN = 20
+
+    # Таблица количества единичных битов для байта
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize()
+                    cls._instance = instance
+        return cls._instance
+
+    def _initialize(self):
+        """Построение индекса из записанных кадров"""
+        self.screens_dir: Path = CVManager().templates_dir / "screens"
+        self.cache_dir = Path(SCREEN_CACHE_DIR)
+        self._hashes = np.empty((0, self.HASH_SIZE * self.HASH_SIZE // 8), dtype=np.uint8)
+        self._labels: List[ScreenId] = []
+        self.load_index()
+
+    def load_index(self):
+        """Загрузка записанных кадров и построение индекса хешей"""
+        hashes = []
+        labels = []
+        for screen in ScreenId:
+            if screen == ScreenId.UNKNOWN:
+                continue
+            paths = []
+            for root in (self.screens_dir, self.cache_dir):
+                screen_dir = root / screen.value
+                if screen_dir.is_dir():
+                    paths.extend(sorted(screen_dir.iterdir()))
+            for path in paths:
+                if path.suffix.lower() not in ('.png', '.jpg', '.jpeg'):
+                    continue
+                frame = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+                if frame is None:
+                    logger.warning(f"Не удалось загрузить кадр экрана: {path}")
+                    continue
+                hashes.append(self.frame_hash(frame))
+                labels.append(screen)
+
+        if hashes:
+            self._hashes = np.stack(hashes)
+        self._labels = labels
+        logger.info(f"Индекс экранов построен: {len(labels)} кадров "
+                    f"({', '.join(sorted({label.value for label in labels})) or 'пусто'})")
+        if not labels:
+            if ENABLE_SCREEN_LEARNING:
+                logger.info(f"Индекс экранов пуст: кадры будут записаны в {self.cache_dir} "
+                            f"после подтверждения экрана через OCR")
+            else:
+                logger.warning("Индекс экранов пуст и обучение отключено (ENABLE_SCREEN_LEARNING): "
+                               "экраны определяются только через OCR")
+
+    @property
+    def is_empty(self) -> bool:
+        return not self._labels
+
+    @classmethod
+    def frame_hash(cls, frame: np.ndarray) -> np.ndarray:
+        """Разностный хеш миниатюры кадра (упакованные биты)"""
+        # Сначала уменьшаем кадр, затем усредняем каналы: порядок RGB/BGR не влияет на хеш
+        thumbnail = cv2.resize(frame, (cls.HASH_SIZE + 1, cls.HASH_SIZE), interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = thumbnail[:, :, :3].mean(axis=2)
+        diff = thumbnail[:, 1:] > thumbnail[:, :-1]
+        return np.packbits(diff.flatten())
+
+    @classmethod
+    def hash_distance(cls, first: np.ndarray, second: np.ndarray) -> int:
+        """Расстояние Хэмминга между двумя хешами"""
+        return int(cls._POPCOUNT[np.bitwise_xor(first, second)].sum())
+
+    def knows(self, screen: ScreenId) -> bool:
+        """Есть ли в индексе кадры экрана"""
+        return screen in self._labels
+
+    # Основная функция классификации экрана
+    def classify(self, frame: np.ndarray) -> ScreenPrediction:
+        """Определение экрана по кадру"""
+        started = time.perf_counter()
+        try:
+            if frame is None or frame.size == 0 or self.is_empty:
+                return ScreenPrediction(ScreenId.UNKNOWN, -1, 0.0, (time.perf_counter() - started) * 1000)
+
+            query = self.frame_hash(frame)
+            distances = self._POPCOUNT[np.bitwise_xor(self._hashes, query)].sum(axis=1, dtype=np.int32)
+            best = int(np.argmin(distances))
+            distance = int(distances[best])
+
+            screen = self._labels[best] if distance <= self.MAX_DISTANCE else ScreenId.UNKNOWN
+            confidence = max(0.0, 1.0 - distance / self.MAX_DISTANCE) if screen != ScreenId.UNKNOWN else 0.0
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            logger.debug(f"Классификация экрана: {screen.value} (distance={distance}, "
+                         f"confidence={confidence:.2f}, {elapsed_ms:.2f} мс)")
+            return ScreenPrediction(screen, distance, confidence, elapsed_ms)
+
+        except Exception as e:
+            logger.error(f"Ошибка классификации экрана: {e}")
+            return ScreenPrediction(ScreenId.UNKNOWN, -1, 0.0, (time.perf_counter() - started) * 1000)
+
+    # Функция записи кадра в индекс
+    def record_frame(self, frame: np.ndarray, screen: ScreenId) -> Optional[Path]:
+        """Сохранение кадра известного экрана и добавление его в индекс"""
+        if screen == ScreenId.UNKNOWN or frame is None or frame.size == 0:
+            return None
+        try:
+            screen_dir = self.cache_dir / screen.value
+            screen_dir.mkdir(parents=True, exist_ok=True)
+            path = screen_dir / f"{screen.value}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.png"
+            if not cv2.imwrite(str(path), frame):
+                logger.error(f"Не удалось сохранить кадр экрана: {path}")
+                return None
+
+            with self._lock:
+                self._hashes = np.vstack([self._hashes, self.frame_hash(frame)[None, :]])
+                self._labels.append(screen)
+            logger.info(f"Кадр экрана {screen.value} добавлен в индекс: {path}")
+            return path
+
+        except Exception as e:
+            logger.error(f"Ошибка записи кадра экрана: {e}")
+            return None
+
+    # Функция обучения индекса по кадрам, подтвержденным через OCR
+    def learn(self, frame: np.ndarray, screen: ScreenId) -> bool:
+        """Добавление подтвержденного кадра, если экран еще слабо представлен в индексе"""
+        if not ENABLE_SCREEN_LEARNING:
+            return False
+        samples = sum(1 for label in self._labels if label == screen)
+        if samples >= self.MAX_SAMPLES_PER_SCREEN:
+            return False
+        if self.classify(frame).screen == screen:
+            return False
+        return self.record_frame(frame, screen) is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Количество кадров каждого экрана в индексе"""
+        counts: Dict[str, int] = {}
+        for label in self._labels:
+            counts[label.value] = counts.get(label.value, 0) + 1
+        return counts
@@ -0,0 +1,200 @@
+# screencast.py
+import asyncio
+import base64
+import io
+import os
+import time
+import weakref
+import numpy as np
+from typing import Optional, Tuple
+from PIL import Image
+from loguru import logger
+from playwright.async_api import CDPSession, Page
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Непрерывный поток кадров через CDP Page.startScreencast вместо снимков по запросу
+ENABLE_SCREENCAST = os.getenv('ENABLE_SCREENCAST', 'false').lower() == 'true'
+SCREENCAST_FPS = max(1, int(os.getenv('SCREENCAST_FPS', '10')))
+# png - без потерь, кадры совпадают с page.screenshot; jpeg - дешевле, но с артефактами сжатия,
+# которые сдвигают корреляцию шаблонов и пороги цвета
+SCREENCAST_FORMAT = os.getenv('SCREENCAST_FORMAT', 'png').lower()
+SCREENCAST_QUALITY = int(os.getenv('SCREENCAST_QUALITY', '85'))
+# Кадр старше этого значения (сек) не используется, снимок делается через page.screenshot
+SCREENCAST_MAX_AGE = float(os.getenv('SCREENCAST_MAX_AGE', '5'))
+
+# Частота кадров компоновщика, от которой считается everyNthFrame
+COMPOSITOR_FPS = 60
+
+class ScreencastStream:
+    """
+    Поток кадров страницы через CDP screencast
+    - Кадры приходят в PNG (или JPEG) с размером viewport в CSS-пикселях и декодируются в фоне
+      в RGBA, как и снимки page.screenshot
+    - Декодирование идет в задний буфер, затем буферы меняются местами:
+      чтение последнего кадра не ждет захвата и не блокируется декодированием
+    - Пока декодируется один кадр, новые кадры пропускаются (остается самый свежий)
+    """
+    _streams: 'weakref.WeakKeyDictionary[Page, ScreencastStream]' = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_page(cls, page: Page, width: int, height: int) -> 'ScreencastStream':
+        """Один поток на страницу, общий для всех ScreenManager"""
+        stream = cls._streams.get(page)
+        if stream is None:
+            stream = cls(page, width, height)
+            cls._streams[page] = stream
+        return stream
+
+    @classmethod
+    async def stop_for_page(cls, page: Page):
+        """Остановка трансляции страницы с выводом статистики (при закрытии контекста)"""
+        stream = cls._streams.pop(page, None)
+        if stream is None:
+            return
+        stream.log_stats()
+        await stream.stop()
+
+    def __init__(self, page: Page, width: int, height: int):
+        self.page = page
+        self.width = width
+        self.height = height
+        self.session: Optional[CDPSession] = None
+        self._buffers = [np.zeros((height, width, 4), dtype=np.uint8) for _ in range(2)]
+        self._front = 0
+        self._frame_time = 0.0
+        self._sequence = 0
+        self._decoding = False
+        self._pending: Optional[str] = None
+        self._new_frame = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self.stats = {'received': 0, 'decoded': 0, 'dropped': 0}
+
+    @property
+    def is_running(self) -> bool:
+        return self.session is not None
+
+    @property
+    def sequence(self) -> int:
+        """Номер последнего декодированного кадра"""
+        return self._sequence
+
+    @property
+    def frame_age(self) -> float:
+        """Возраст последнего кадра в секундах (inf - кадров еще не было)"""
+        if not self._sequence:
+            return float('inf')
+        return time.monotonic() - self._frame_time
+
+    async def ensure_started(self) -> bool:
+        """Запуск трансляции при первом обращении"""
+        if self.is_running:
+            return True
+        async with self._start_lock:
+            if self.is_running:
+                return True
+            try:
+                session = await self.page.context.new_cdp_session(self.page)
+                session.on('Page.screencastFrame', self._on_frame)
+                params = {
+                    'format': 'jpeg' if SCREENCAST_FORMAT == 'jpeg' else 'png',
+                    'maxWidth': self.width,
+                    'maxHeight': self.height,
+                    'everyNthFrame': max(1, round(COMPOSITOR_FPS / SCREENCAST_FPS))
+                }
+                if params['format'] == 'jpeg':
+                    params['quality'] = SCREENCAST_QUALITY
+                await session.send('Page.startScreencast', params)
+                self.session = session
+                self.page.on('close', lambda _: self._reset())
+                logger.info(f"Трансляция кадров запущена: {params['format']}, {SCREENCAST_FPS} FPS, "
+                            f"{self.width}x{self.height}")
+                return True
+            except Exception as e:
+                logger.error(f"Ошибка запуска трансляции кадров: {e}")
+                return False
+
+    def _reset(self):
+        self.session = None
+
+    def _on_frame(self, params):
+        """Обработчик Page.screencastFrame"""
+        self.stats['received'] += 1
+        asyncio.create_task(self._acknowledge(params['sessionId']))
+        if self._decoding:
+            # Декодирование занято: сохраняем только самый свежий кадр
+            if self._pending is not None:
+                self.stats['dropped'] += 1
+            self._pending = params['data']
+            return
+        self._decoding = True
+        asyncio.create_task(self._decode_loop(params['data']))
+
+    async def _acknowledge(self, session_id: int):
+        try:
+            await self.session.send('Page.screencastFrameAck', {'sessionId': session_id})
+        except Exception as e:
+            logger.debug(f"Ошибка подтверждения кадра трансляции: {e}")
+
+    async def _decode_loop(self, data: str):
+        loop = asyncio.get_running_loop()
+        try:
+            while data is not None:
+                back = 1 - self._front
+                await loop.run_in_executor(None, self._decode_into, data, self._buffers[back])
+                self._front = back
+                self._frame_time = time.monotonic()
+                self._sequence += 1
+                self.stats['decoded'] += 1
+                self._new_frame.set()
+                self._new_frame.clear()
+                data, self._pending = self._pending, None
+        except Exception as e:
+            logger.error(f"Ошибка декодирования кадра трансляции: {e}")
+        finally:
+            self._decoding = False
+
+    def _decode_into(self, data: str, buffer: np.ndarray):
+        """Декодирование кадра в буфер RGBA размером viewport"""
+        image = Image.open(io.BytesIO(base64.b64decode(data))).convert('RGBA')
+        if image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height), Image.BILINEAR)
+        np.copyto(buffer, np.asarray(image))
+
+    def latest(self, max_age: float = SCREENCAST_MAX_AGE) -> Optional[Tuple[np.ndarray, float]]:
+        """Копия последнего кадра (RGBA) и его возраст; None, если кадра нет или он устарел"""
+        age = self.frame_age
+        if max_age and age > max_age:
+            return None
+        return self._buffers[self._front].copy(), age
+
+    async def wait_for_frame(self, after_sequence: int, timeout: float) -> bool:
+        """Ожидание кадра новее after_sequence"""
+        deadline = time.monotonic() + timeout
+        while self._sequence <= after_sequence:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._new_frame.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def log_stats(self):
+        """Вывод статистики трансляции в лог"""
+        logger.info(f"Трансляция кадров: получено {self.stats['received']}, "
+                    f"декодировано {self.stats['decoded']}, пропущено {self.stats['dropped']}")
+
+    async def stop(self):
+        """Остановка трансляции"""
+        if self.session is None:
+            return
+        try:
+            await self.session.send('Page.stopScreencast')
+            await self.session.detach()
+        except Exception as e:
+            logger.debug(f"Ошибка остановки трансляции кадров: {e}")
+        finally:
+            self.session = None
@@ -5,6 +5,7 @@ import asyncio
 import random
 import traceback
 from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
 from threading import Lock
 
@@ -16,9 +17,25 @@ from typing import Tuple, Optional
 from .cv_manager import CVManager
 from .ocr_manager import OCRCoordinator
 from .bombie_objects import ScreenManager
+from .screen_classifier import ScreenId
 from .chest_action import ChestActions
+from .flow_machine import FlowStateMachine, RetryPolicy, RETRY
 from .cordination_module import ViewportConfig, box_storage, BoxCoordinates, GameObjects
 
+class TaskFlowState(Enum):
+    """Состояния сценария обработки ежедневных заданий"""
+    FREE_REWARDS = "free_rewards"
+    CHECK_MENU = "check_menu"
+    RECOVER_MENU = "recover_menu"
+    CHECK_DAILY = "check_daily"
+    OPEN_TASKS = "open_tasks"
+    CHECK_REWARDS = "check_rewards"
+    COLLECT = "collect"
+    LEAVE = "leave"
+    CONTINUE = "continue"
+    DONE = "done"
+    ERROR = "error"
+
 class TaskActions:
     def __init__(self, page):
         self.page = page
@@ -96,17 +113,27 @@ class TaskActions:
                 logger.error("Не удалось получить скриншот")
                 return False
             
-            # Проверяем наличие текста
-            continue_texts = [
-                'нажмите', 'область', 'закрыть',
-                'click', 'area', 'close'
-            ]
-            
-            result, confidence = self.coordinator.check_text_in_area(
-                image,
-                continue_texts,
-                threshold=0.2
-            )
+            # Быстрое определение экрана без OCR
+            prediction = await self.screen.classify_screen(image)
+            if prediction.screen == ScreenId.POPUP:
+                result, confidence = True, 1.0
+            elif prediction.is_confident:
+                logger.debug(f"Текущий экран: {prediction.screen.value}, клик для продолжения не требуется")
+                return False
+            else:
+                # Проверяем наличие текста
+                continue_texts = [
+                    'нажмите', 'область', 'закрыть',
+                    'click', 'area', 'close'
+                ]
+                
+                result, confidence = self.coordinator.check_text_in_area(
+                    image,
+                    continue_texts,
+                    threshold=0.2
+                )
+                if result and confidence > 0.6:
+                    self.screen.classifier.learn(image, ScreenId.POPUP)
             
             if result and confidence > 0.6:
                 logger.info(f"Обнаружен текст для продолжения (confidence: {confidence:.2f})")
@@ -144,14 +171,15 @@ class TaskActions:
             task_button_area = self.objects.get_default_task_button()
             expanded_area = self.objects.expand_area(task_button_area, 0.4)
             
-            # Делаем скриншот расширенной области
-            screenshot = await self.screen.take_screenshot(expanded_area)
-            if screenshot is None:
+            # Делаем скриншот
+            image = await self.screen.take_screenshot()
+            if image is None:
                 logger.error("Не удалось получить скриншот")
                 return False
                 
-            # Проверяем состояние наград
-            result = self.cv_manager.find_daily_task_rewards(screenshot)
+            # Проверяем состояние наград в расширенной области
+            decisions = self.cv_manager.match_many(image, [(expanded_area, 'daily_task_rewards')])
+            result = 'daily_task_rewards' in decisions and decisions['daily_task_rewards'].result
             logger.debug(f"Результат проверки ежедневных наград: {result}")
 
             return result
@@ -163,40 +191,51 @@ class TaskActions:
             return False
 
     # Функция проверки нахождения в меню заданий
-    async def check_task_menu(self, retry_count=0) -> bool:
+    async def check_task_menu(self, max_attempts: int = 2) -> bool:
         """
         Проверка нахождения в меню заданий
         Нужно изменить логику проверки самой кнопки и ее совпадений
         Через CV manager.
         """
         try:
-            image = await self.screen.take_screenshot()
-            if image is None:
-                logger.error("Не удалось получить скриншот")
-                return False
-                
-            # Проверяем наличие текста "Daily Task" в области
-            task_area = self.objects.get_default_dayli_task_button()
-            result, confidence = self.coordinator.check_text_in_area(
-                image,
-                ['Dayli task', 'Task', 'Dally' 'task', 'начать', 'получен', 'start', 'get', 'Permanent Task'],
-                task_area,
-                threshold=0.45
-            )
-            
-            logger.debug(f"Проверка меню заданий: {result} (confidence: {confidence:.2f})")
-            
-            # Если первая попытка не удалась, пробуем еще раз
-            if not result and retry_count == 0:
-                logger.info("Первая попытка проверки меню не удалась, пробуем еще раз")
-                await asyncio.sleep(1.0)  # Добавляем задержку перед повторной попыткой
-                return await self.check_task_menu(retry_count=1)
-            # Если вторая попытка не удалась, перезапускаем process_daily_tasks
-            elif not result and retry_count == 1:
-                logger.warning("Вторая попытка проверки меню не удалась, перезапускаем process_daily_tasks")
-                await self.process_daily_tasks()
-                
-            return result
+            for attempt in range(max_attempts):
+                image = await self.screen.take_screenshot()
+                if image is None:
+                    logger.error("Не удалось получить скриншот")
+                    return False
+
+                # Быстрое определение экрана без OCR
+                prediction = await self.screen.classify_screen(image)
+                if prediction.screen == ScreenId.TASK_LIST:
+                    logger.debug(f"Меню заданий определено классификатором (confidence: {prediction.confidence:.2f})")
+                    return True
+
+                if prediction.is_confident:
+                    # Экран уверенно распознан и это не меню заданий, OCR не требуется
+                    logger.debug(f"Текущий экран: {prediction.screen.value}, не меню заданий")
+                else:
+                    # Проверяем наличие текста "Daily Task" в области
+                    task_area = self.objects.get_default_dayli_task_button()
+                    result, confidence = self.coordinator.check_text_in_area(
+                        image,
+                        ['Dayli task', 'Task', 'Dally' 'task', 'начать', 'получен', 'start', 'get', 'Permanent Task'],
+                        task_area,
+                        threshold=0.45
+                    )
+
+                    logger.debug(f"Проверка меню заданий: {result} (confidence: {confidence:.2f})")
+                    if result:
+                        self.screen.classifier.learn(image, ScreenId.TASK_LIST)
+                        return True
+
+                # Если попытка не удалась, пробуем еще раз после задержки
+                if attempt + 1 < max_attempts:
+                    logger.info(f"Попытка {attempt + 1}/{max_attempts} проверки меню не удалась, пробуем еще раз")
+                    await self.screen.wait_for_change(1.0)
+
+            # Повтор всего сценария выполняет автомат process_daily_tasks
+            logger.warning("Проверка меню заданий не удалась")
+            return False
             
         except Exception as e:
             logger.error(f"Ошибка при проверке меню заданий: {e}")
@@ -235,50 +274,53 @@ class TaskActions:
             logger.error(f"Ошибка при открытии ежедневных заданий: {e}")
             return False
             
-    async def check_rewards_available(self) -> bool:
+    async def check_rewards_available(self, max_continue_clicks: int = 3) -> bool:
         """Проверка наличия доступных наград"""
         try:
             logger.info("Начало проверки наличия доступных наград")
-            '''
-            # Получаем область наград и расширяем её на 40%
-            rewards_area = self.objects.get_default_daily_task_rewards_button()
-            expanded_area = self.objects.expand_area(rewards_area, 0.4)
-            screenshot = await self.screen.take_screenshot(expanded_area)
-            '''
-            screenshot = await self.screen.take_screenshot()
-            if screenshot is None:
-                logger.error("Не удалось получить скриншот области наград")
-                return False
+            for _ in range(max_continue_clicks + 1):
+                screenshot = await self.screen.take_screenshot()
+                if screenshot is None:
+                    logger.error("Не удалось получить скриншот области наград")
+                    return False
+
+                # Награды ищутся только в меню заданий: другой распознанный экран проверяется без OCR
+                prediction = await self.screen.classify_screen(screenshot)
+                if prediction.is_confident and prediction.screen not in (ScreenId.TASK_LIST, ScreenId.POPUP):
+                    logger.info(f"Текущий экран: {prediction.screen.value}, не меню заданий")
+                    return False
+
+                if prediction.screen != ScreenId.POPUP:
+                    # Проверяем наличие текста "Получить"
+                    result, confidence = self.coordinator.check_text_in_area(
+                        screenshot,
+                        ['получ', 'получить', 'get'],
+                        threshold=0.6
+                    )
+                    logger.debug(f"Проверка наличия доступных наград: {result} (confidence: {confidence:.2f})")
+
+                    if result:
+                        logger.info("Обнаружены доступные награды")
+                        return True
                 
-            # Проверяем наличие текста "Получить"
-            result, confidence = self.coordinator.check_text_in_area(
-                screenshot,
-                ['получ', 'получить', 'get'],
-                threshold=0.6
-            )
-            logger.debug(f"Проверка наличия доступных наград: {result} (confidence: {confidence:.2f})")
-
-            if result:
-                logger.info("Обнаружены доступные награды")
-                return True
-            
-            if not result:
                 # Проверяем необходимость клика для продолжения
-                if await self.click_to_continue():
-                    logger.info("Выполнен клик для продолжения, повторяем проверку наград")
-                    return await self.check_rewards_available()
-                return False
+                if not await self.click_to_continue():
+                    return False
+                logger.info("Выполнен клик для продолжения, повторяем проверку наград")
+
+            logger.warning("Превышено количество кликов для продолжения")
+            return False
             
         except Exception as e:
             logger.error(f"Ошибка при проверке наград: {e}")
             return False
             
     # Функция сбора наград за ежедневные задания
-    async def collect_rewards(self) -> bool:
+    async def collect_rewards(self, max_rewards: int = 20) -> bool:
         """Сбор наград за ежедневные задания"""
         try:
             logger.info("Начало сбора наград")
-            while True:
+            for _ in range(max_rewards):
                 # Проверяем наличие наград
                 if not await self.check_rewards_available():
                     logger.info("Нет доступных наград")
@@ -302,7 +344,9 @@ class TaskActions:
                 
                 # Ждем анимацию получения наград
                 await asyncio.sleep(0.7)
-                await self.collect_rewards()
+
+            logger.warning(f"Превышено количество собираемых наград за один проход ({max_rewards})")
+            return 'done'
                 
         except Exception as e:
             logger.error(f"Ошибка при сборе наград: {e}")
@@ -324,56 +368,97 @@ class TaskActions:
             'done' - если нет доступных наград
             'error' - если произошла ошибка
         """
-        try:
-            logger.info("Начало обработки ежедневных заданий")
-
-            # Обрабатываем бесплатные награды
-            free_rewards_result = await self.process_free_dayli_rewards()
-            if not free_rewards_result:
-                logger.error("Ошибка при обработке бесплатных наград")
-                return 'done'
-
-            # Проверка главного меню
-            if not await self.chest_actions.main_menu():
-                logger.warning("Не в главном меню")
-                await self.back_to_main_menu()
-                await asyncio.sleep(0.5)
-                return await self.process_daily_tasks()
-
-            # Проверяем наличие доступных наград
-            if not await self.check_daily_rewards():
-                logger.info("Нет доступных наград")
-                await self.back_to_main_menu()
-                await HumanBehavior.random_delay()
-                return 'done'
-            
-            # Открываем меню заданий
-            if not await self.open_daily_tasks():
-                logger.error("Не удалось открыть меню заданий")
-                return 'done'
-            
-            # Проверяем наличие наград
-            await asyncio.sleep(1.4)
-            if not await self.check_rewards_available():
-                logger.info("Нет доступных наград")
-                await self.back_to_main_menu()
-                await HumanBehavior.random_delay()
-                return 'done'
-            
-            # Собираем награды
-            if not await self.collect_rewards():
-                logger.error("Не удалось собрать награды")
-                await self.back_to_main_menu()
-                await HumanBehavior.random_delay()
-                return 'done'
-            
-            logger.info("Обработка всех наград завершена")
-
-            return 'continue'
-            
-        except Exception as e:
-            logger.error(f"Ошибка при обработке ежедневных заданий: {e}")
-            return 'error'
+        logger.info("Начало обработки ежедневных заданий")
+
+        machine = FlowStateMachine(
+            name="daily_tasks",
+            initial=TaskFlowState.FREE_REWARDS,
+            handlers={
+                TaskFlowState.FREE_REWARDS: self._state_free_rewards,
+                TaskFlowState.CHECK_MENU: self._state_check_menu,
+                TaskFlowState.RECOVER_MENU: self._state_recover_menu,
+                TaskFlowState.CHECK_DAILY: self._state_check_daily,
+                TaskFlowState.OPEN_TASKS: self._state_open_tasks,
+                TaskFlowState.CHECK_REWARDS: self._state_check_rewards,
+                TaskFlowState.COLLECT: self._state_collect,
+                TaskFlowState.LEAVE: self._state_leave,
+            },
+            results={
+                TaskFlowState.CONTINUE: 'continue',
+                TaskFlowState.DONE: 'done',
+                TaskFlowState.ERROR: 'error',
+            },
+            retry_state=TaskFlowState.CHECK_MENU,
+            exhausted_state=TaskFlowState.ERROR,
+            retry_policy=RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=8.0),
+            timeouts={
+                TaskFlowState.FREE_REWARDS: 180.0,
+                TaskFlowState.CHECK_MENU: 30.0,
+                TaskFlowState.RECOVER_MENU: 10.0,
+                TaskFlowState.CHECK_DAILY: 30.0,
+                TaskFlowState.OPEN_TASKS: 60.0,
+                TaskFlowState.CHECK_REWARDS: 60.0,
+                TaskFlowState.COLLECT: 300.0,
+                TaskFlowState.LEAVE: 10.0,
+            }
+        )
+        return await machine.run()
+
+    # Состояние: сбор бесплатных наград
+    async def _state_free_rewards(self):
+        if not await self.process_free_dayli_rewards():
+            logger.error("Ошибка при обработке бесплатных наград")
+            return TaskFlowState.DONE
+        return TaskFlowState.CHECK_MENU
+
+    # Состояние: проверка главного меню
+    async def _state_check_menu(self):
+        if not await self.chest_actions.main_menu():
+            logger.warning("Не в главном меню")
+            return TaskFlowState.RECOVER_MENU
+        return TaskFlowState.CHECK_DAILY
+
+    # Состояние: возврат в главное меню
+    async def _state_recover_menu(self):
+        await self.back_to_main_menu()
+        await asyncio.sleep(0.5)
+        return RETRY
+
+    # Состояние: проверка наличия доступных наград на кнопке заданий
+    async def _state_check_daily(self):
+        if not await self.check_daily_rewards():
+            logger.info("Нет доступных наград")
+            return TaskFlowState.LEAVE
+        return TaskFlowState.OPEN_TASKS
+
+    # Состояние: открытие меню заданий
+    async def _state_open_tasks(self):
+        if not await self.open_daily_tasks():
+            logger.error("Не удалось открыть меню заданий")
+            return TaskFlowState.DONE
+        return TaskFlowState.CHECK_REWARDS
+
+    # Состояние: проверка наличия наград
+    async def _state_check_rewards(self):
+        await asyncio.sleep(1.4)
+        if not await self.check_rewards_available():
+            logger.info("Нет доступных наград")
+            return TaskFlowState.LEAVE
+        return TaskFlowState.COLLECT
+
+    # Состояние: сбор наград
+    async def _state_collect(self):
+        if not await self.collect_rewards():
+            logger.error("Не удалось собрать награды")
+            return TaskFlowState.LEAVE
+        logger.info("Обработка всех наград завершена")
+        return TaskFlowState.CONTINUE
+
+    # Состояние: выход в главное меню и завершение
+    async def _state_leave(self):
+        await self.back_to_main_menu()
+        await HumanBehavior.random_delay()
+        return TaskFlowState.DONE
 
     # Глобальная функция сбора разных бесплатных плюшек 
     async def process_free_dayli_rewards(self) -> bool:
@@ -0,0 +1,119 @@
+# text_matcher.py
+import re
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+# Группы символов, которые OCR путает между кириллицей, латиницей и цифрами.
+# Каждый символ группы приводится к первому символу группы.
+CONFUSABLE_GROUPS = (
+    'аa@', 'вb', 'еeё', 'кk', 'мm', 'нh', 'оo0', 'рp', 'сc',
+    'тt', 'уy', 'хx', 'з3', 'б6', 'иu', 's5', 'ilі1|!',
+)
+
+def _build_confusable_table() -> Dict[int, str]:
+    """Таблица перевода похожих символов к единому виду (1:1 по длине)"""
+    table = {}
+    for group in CONFUSABLE_GROUPS:
+        canonical = group[0]
+        for char in group[1:]:
+            table[ord(char)] = canonical
+    return table
+
+_CONFUSABLE_TABLE = _build_confusable_table()
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """Найденное ключевое слово и его позиция в распознанном тексте"""
+    keyword: str
+    start: int
+    end: int
+    matched_text: str
+
+class KeywordMatcher:
+    """
+    Предкомпилированный поиск ключевых слов в тексте OCR
+    - Ключевые слова нормализуются один раз при создании
+    - Поиск выполняется одним проходом regex-альтернации
+    - Похожие символы кириллицы/латиницы считаются одинаковыми
+    """
+
+    _cache: Dict[Tuple[Tuple[str, ...], bool], 'KeywordMatcher'] = {}
+    _cache_lock = Lock()
+
+    def __init__(self, keywords: List[str], fuzzy: bool = True):
+        self.fuzzy = fuzzy
+        self.keywords: Dict[str, str] = {}
+
+        for keyword in keywords:
+            normalized = self.normalize(keyword)
+            if normalized and normalized not in self.keywords:
+                self.keywords[normalized] = keyword
+
+        # Длинные слова первыми, чтобы альтернация выбирала наиболее полное совпадение
+        alternatives = sorted(self.keywords, key=len, reverse=True)
+        self.pattern: Optional[re.Pattern] = (
+            re.compile('|'.join(re.escape(word) for word in alternatives))
+            if alternatives else None
+        )
+        logger.debug(f"Скомпилирован поиск ключевых слов: {list(self.keywords.values())}")
+
+    @classmethod
+    def for_keywords(cls, keywords: str | List[str], fuzzy: bool = True) -> 'KeywordMatcher':
+        """Получение скомпилированного поиска из кэша по набору ключевых слов"""
+        keywords = [keywords] if isinstance(keywords, str) else list(keywords)
+        key = (tuple(keywords), fuzzy)
+        matcher = cls._cache.get(key)
+        if matcher is None:
+            with cls._cache_lock:
+                matcher = cls._cache.get(key)
+                if matcher is None:
+                    matcher = cls(keywords, fuzzy)
+                    cls._cache[key] = matcher
+        return matcher
+
+    def normalize(self, text: str) -> str:
+        """Нормализация текста без изменения длины (позиции совпадений сохраняются)"""
+        text = text.lower()
+        if self.fuzzy:
+            text = text.translate(_CONFUSABLE_TABLE)
+        return text
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Поиск всех ключевых слов в тексте за один проход"""
+        if not text or self.pattern is None:
+            return []
+
+        normalized = self.normalize(text)
+        # Нормализация может изменить длину только для редких символов Unicode
+        same_length = len(normalized) == len(text)
+
+        matches = []
+        for match in self.pattern.finditer(normalized):
+            start, end = match.span()
+            matches.append(KeywordMatch(
+                keyword=self.keywords[match.group()],
+                start=start,
+                end=end,
+                matched_text=text[start:end] if same_length else match.group()
+            ))
+        return matches
+
+    def search(self, text: str) -> Optional[KeywordMatch]:
+        """Поиск первого ключевого слова в тексте"""
+        if not text or self.pattern is None:
+            return None
+
+        normalized = self.normalize(text)
+        match = self.pattern.search(normalized)
+        if not match:
+            return None
+
+        start, end = match.span()
+        return KeywordMatch(
+            keyword=self.keywords[match.group()],
+            start=start,
+            end=end,
+            matched_text=text[start:end] if len(normalized) == len(text) else match.group()
+        )
@@ -1,13 +1,26 @@
 import asyncio
+import json
+import subprocess
 from pathlib import Path
+import time
 from typing import Optional, Dict, Any
+from urllib.parse import urlparse
 from loguru import logger
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 from utils import ScreenRecorder, HumanBehavior
 from tracer import TracerManager
+from asset_cache import AssetCache, ENABLE_ASSET_CACHE
+import render_profile
+from browser_pool import BrowserPool, BrowserLease, ENABLE_BROWSER_POOL
+from render_profile import RenderMetrics
 from web_modules import GameCanvasHandler
 from device_emulation import get_telegram_device_config
 from bombie.bot_logic import WebAppLogic
+from bombie.readiness import GameReadinessDetector
+from bombie.bombie_objects import SCREEN_CAPTURE_BACKEND, PRESERVE_DRAWING_BUFFER_SCRIPT
+from bombie.screencast import ScreencastStream, ENABLE_SCREENCAST
+from bombie.resource_config import ThreadBudget
+from bombie.preprocess_pipeline import get_default_pipeline
 from dotenv import load_dotenv
 import os
 
@@ -24,12 +37,35 @@ ENABLE_HEADLESS = os.getenv('ENABLE_HEADLESS', 'false').lower() == 'true'
 # Статические настройки
 MAX_RECONNECT_ATTEMPTS = 3
 RECONNECT_DELAY = 5
+# Уровни переподключения от дешевого к дорогому:
+# reload - перезагрузка страницы игры (вне игры - повторная навигация)
+# context - новый контекст в запущенном браузере
+# browser - перезапуск браузера
+RECONNECT_TIERS = ('reload', 'context', 'browser')
+# Хост страницы игры после редиректа из WebApp
+GAME_HOST = 'games.pluto.vision'
+
+# Интервалы проверки доступности WebApp (сек): после каждой успешной проверки
+# интервал удваивается, после сбоя или переподключения возвращается к минимуму
+PROBE_MIN_INTERVAL = 15
+PROBE_MAX_INTERVAL = 120
+
+# Перезапуски логики WebApp после ее завершения с ошибкой (задержка удваивается с каждым)
+MAX_LOGIC_RESTARTS = 3
+# Логика, проработавшая дольше (сек), считается здоровой: счетчик перезапусков сбрасывается
+LOGIC_HEALTHY_AFTER = 300
 
 # Размеры viewport и окна браузера
 VIEWPORT_WIDTH = 412
 VIEWPORT_HEIGHT = 815
 
+# Файл-отметка успешной проверки браузера в кэше Playwright
+BROWSER_STAMP_FILE = 'browser-check.json'
+
 class BotHandler:
+    # Браузер проверен в текущем процессе
+    _browser_checked = False
+
     def __init__(self, webapp_url: str):
         self.webapp_url = webapp_url
         self.playwright = None
@@ -42,6 +78,26 @@ class BotHandler:
         self.human: HumanBehavior = HumanBehavior()
         self.is_running = False
         self.reconnect_attempts = 0
+        # Завершения логики WebApp с ошибкой подряд (отдельно от переподключений:
+        # повторная навигация удается, даже если игра каждый раз не загружается)
+        self.logic_failures = 0
+        self.logic_failed = False
+        self.logic_started_at = 0.0
+        # Событие потери соединения (закрытие/сбой страницы, отключение браузера)
+        self.connection_lost = asyncio.Event()
+        self.loss_reason: Optional[str] = None
+        self.probe_interval = PROBE_MIN_INTERVAL
+        # Логика WebApp, перезапускаемая на новой странице после переподключения
+        self.webapp_logic: Optional[WebAppLogic] = None
+        self.logic_task: Optional[asyncio.Task] = None
+        self.render_metrics: Optional[RenderMetrics] = None
+        # Контекст из общего пула браузеров (только при ENABLE_BROWSER_POOL)
+        self.lease: Optional[BrowserLease] = None
+        # Статистика уровней переподключения: попытки, успехи, суммарное время
+        self.reconnect_stats: Dict[str, Dict[str, float]] = {
+            tier: {'attempts': 0, 'successes': 0, 'total_time': 0.0}
+            for tier in RECONNECT_TIERS
+        }
 
         # Настройка логирования в зависимости от ENABLE_LOGGING
         if ENABLE_LOGGING:
@@ -54,8 +110,49 @@ class BotHandler:
                 diagnose=True,
             )
 
+    @staticmethod
+    def _browser_stamp(playwright_cache: str, browsers: list) -> Dict[str, Any]:
+        """Ключ проверки браузера: версия Playwright и пути установленных браузеров"""
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            playwright_version = version('playwright')
+        except PackageNotFoundError:
+            playwright_version = 'unknown'
+        return {
+            'playwright_version': playwright_version,
+            'browsers': sorted(os.path.basename(path) for path in browsers),
+            'cache': playwright_cache
+        }
+
+    @staticmethod
+    def _read_browser_stamp(playwright_cache: str) -> Optional[Dict[str, Any]]:
+        """Чтение отметки предыдущей успешной проверки"""
+        try:
+            with open(os.path.join(playwright_cache, BROWSER_STAMP_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_browser_stamp(playwright_cache: str):
+        """Сохранение отметки успешной проверки"""
+        import glob
+        browsers = glob.glob(os.path.join(playwright_cache, 'chromium-*'))
+        try:
+            with open(os.path.join(playwright_cache, BROWSER_STAMP_FILE), 'w') as f:
+                json.dump(BotHandler._browser_stamp(playwright_cache, browsers), f)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить отметку проверки браузера: {e}")
+
     async def check_browser_installation(self):
-        """Проверка установки браузера"""
+        """
+        Проверка установки браузера
+        Результат запоминается на время работы процесса и сохраняется в отметке,
+        привязанной к версии Playwright и пути браузера: полная проверка
+        выполняется только при первом запуске или после обновления
+        """
+        if BotHandler._browser_checked:
+            return True
         try:
             from playwright.async_api import async_playwright
             import os
@@ -75,12 +172,21 @@ class BotHandler:
             try:
                 # Проверяем наличие браузера через glob
                 browser_path = os.path.join(playwright_cache, 'chromium-*')
-                if not glob.glob(browser_path):
+                browsers = glob.glob(browser_path)
+                if not browsers:
                     raise Exception("Executable doesn't exist")
+
+                # Отметка совпадает - браузер уже проверялся с этой версией Playwright
+                if self._read_browser_stamp(playwright_cache) == self._browser_stamp(playwright_cache, browsers):
+                    logger.debug(f"Браузер Playwright проверен ранее: {playwright_cache}")
+                    BotHandler._browser_checked = True
+                    return True
                     
                 playwright = await async_playwright().start()
                 await playwright.stop()
                 logger.info(f"Браузер Playwright доступен в {playwright_cache}")
+                self._write_browser_stamp(playwright_cache)
+                BotHandler._browser_checked = True
                 return True
             except Exception as e:
                 if "Executable doesn't exist" in str(e):
@@ -111,6 +217,8 @@ class BotHandler:
                         
                         if deps_process.returncode == 0:
                             logger.info(f"Браузеры Playwright успешно установлены в {playwright_cache}")
+                            self._write_browser_stamp(playwright_cache)
+                            BotHandler._browser_checked = True
                             return True
                         else:
                             logger.error(f"Ошибка установки зависимостей: {deps_stderr.decode()}")
@@ -132,31 +240,85 @@ class BotHandler:
                 logger.error("Браузер Playwright не установлен или не настроен")
                 return False
 
-            self.playwright = await async_playwright().start()
-            logger.debug("Playwright успешно инициализирован")
+            if ENABLE_BROWSER_POOL:
+                # Браузеры запускаются один раз и остаются в пуле между сессиями
+                await BrowserPool().start(self._launch_options())
+            else:
+                self.playwright = await async_playwright().start()
+                logger.debug("Playwright успешно инициализирован")
+
+                if not await self._launch_browser():
+                    return False
+            if not await self._create_page():
+                return False
+
+            # Инициализация записи
+            if ENABLE_SCREENSHOTS or ENABLE_VIDEO:
+                self.recorder = ScreenRecorder(
+                    enable_video=ENABLE_VIDEO,
+                    enable_screenshots=ENABLE_SCREENSHOTS
+                )
             
-            # Запуск браузера с явным указанием размера окна
-            self.browser = await self.playwright.chromium.launch(
-                headless=ENABLE_HEADLESS,
-                args=[
-                    f'--window-size={VIEWPORT_WIDTH},{VIEWPORT_HEIGHT}',
-                    '--force-device-scale-factor=1',
-                    '--mute-audio',
-                    '--hide-scrollbars',
-                    '--window-position=0,0'
-                ]
-            )
+            logger.info("Браузер успешно инициализирован")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Ошибка инициализации браузера: {e}")
+            return False
+
+    def _launch_options(self) -> Dict[str, Any]:
+        """Параметры запуска Chromium с явным указанием размера окна"""
+        return {
+            'headless': ENABLE_HEADLESS,
+            'args': [
+                f'--window-size={VIEWPORT_WIDTH},{VIEWPORT_HEIGHT}',
+                '--force-device-scale-factor=1',
+                '--mute-audio',
+                '--hide-scrollbars',
+                '--window-position=0,0',
+                *render_profile.browser_args()
+            ]
+        }
+
+    async def _launch_browser(self) -> bool:
+        """Запуск Chromium с явным указанием размера окна"""
+        try:
+            self.browser = await self.playwright.chromium.launch(**self._launch_options())
             logger.info(f"Chromium браузер запущен в режиме отображения с размерами: {VIEWPORT_WIDTH}x{VIEWPORT_HEIGHT}")
-    
-            # Создание контекста с эмуляцией устройства
-            self.context = await self.browser.new_context(
-                viewport={"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
-                device_scale_factor=self.device_config['device_scale_factor'],
-                user_agent=self.device_config['user_agent']
-            )
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка запуска браузера: {e}")
+            return False
+
+    async def _create_page(self) -> bool:
+        """Создание контекста с эмуляцией устройства и страницы в запущенном браузере"""
+        try:
+            context_options = {
+                'viewport': {"width": VIEWPORT_WIDTH, "height": VIEWPORT_HEIGHT},
+                'device_scale_factor': render_profile.device_scale(self.device_config),
+                'user_agent': self.device_config['user_agent']
+            }
+            if ENABLE_BROWSER_POOL:
+                self.lease = await BrowserPool().lease(context_options)
+                self.lease.on_revoke = lambda: self._on_connection_lost(self.page, "браузер пула выводится из работы")
+                self.browser = self.lease.browser
+                self.context = self.lease.context
+            else:
+                self.context = await self.browser.new_context(**context_options)
+            await render_profile.apply_to_context(self.context)
+            # Захват кадра из canvas требует сохранения буфера WebGL после отрисовки
+            if SCREEN_CAPTURE_BACKEND == 'canvas':
+                await self.context.add_init_script(PRESERVE_DRAWING_BUFFER_SCRIPT)
+
+            # Кэш ресурсов игры и блокировка аналитики
+            if ENABLE_ASSET_CACHE:
+                await AssetCache().attach(self.context)
             
             # Создание страницы
             self.page = await self.context.new_page()
+            self._attach_liveness_handlers()
+            self.render_metrics = RenderMetrics(self.page)
+            await self.render_metrics.start()
 
             # Установка размера viewport
             await self.page.set_viewport_size({
@@ -169,21 +331,68 @@ class BotHandler:
             # Инициализация трейсера
             if ENABLE_TRACING:
                 self.tracer = TracerManager(self.page, self.device_config)
-            
-            # Инициализация записи
-            if ENABLE_SCREENSHOTS or ENABLE_VIDEO:
-                self.recorder = ScreenRecorder(
-                    enable_video=ENABLE_VIDEO,
-                    enable_screenshots=ENABLE_SCREENSHOTS
-                )
-            
-            logger.info("Браузер успешно инициализирован")
             return True
-            
         except Exception as e:
-            logger.error(f"Ошибка инициализации браузера: {e}")
+            logger.error(f"Ошибка создания контекста браузера: {e}")
             return False
 
+    def _attach_liveness_handlers(self):
+        """Подписка на события Playwright, сигнализирующие о потере соединения"""
+        page = self.page
+        browser = self.browser
+        page.on("close", lambda _: self._on_connection_lost(page, "страница закрыта"))
+        page.on("crash", lambda _: self._on_connection_lost(page, "сбой страницы"))
+        # Отключение браузера пула передается через BrowserLease.on_revoke
+        if self.lease is None:
+            browser.on("disconnected", lambda _: self._on_browser_disconnected(browser))
+        self.connection_lost.clear()
+        self.loss_reason = None
+        self.probe_interval = PROBE_MIN_INTERVAL
+
+    def _on_connection_lost(self, page: Page, reason: str):
+        """Обработчик событий страницы (события старых страниц игнорируются)"""
+        if page is not self.page:
+            return
+        logger.warning(f"Событие потери соединения: {reason}")
+        self.loss_reason = reason
+        self.connection_lost.set()
+
+    def _on_browser_disconnected(self, browser: Browser):
+        """Обработчик отключения браузера"""
+        if browser is not self.browser:
+            return
+        logger.warning("Событие потери соединения: браузер отключен")
+        self.loss_reason = "браузер отключен"
+        self.connection_lost.set()
+
+    async def wait_for_liveness_event(self) -> bool:
+        """
+        Ожидание события потери соединения или завершения логики WebApp
+        не дольше интервала проверки (True - событие)
+        """
+        lost = asyncio.ensure_future(self.connection_lost.wait())
+        waiters = {lost}
+        if self.logic_task:
+            waiters.add(self.logic_task)
+        try:
+            await asyncio.wait(waiters, timeout=self.probe_interval, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            lost.cancel()
+        if self.connection_lost.is_set():
+            return True
+        if self.logic_task and self.logic_task.done():
+            # Логика завершилась с ошибкой (например, игра не загрузилась) - переподключаемся сразу
+            if self.logic_task.cancelled() or self.logic_task.exception() or not self.logic_task.result():
+                if time.monotonic() - self.logic_started_at >= LOGIC_HEALTHY_AFTER:
+                    self.logic_failures = 0
+                self.logic_failures += 1
+                self.logic_failed = True
+                self.loss_reason = "логика WebApp завершилась с ошибкой"
+                logger.warning(f"Событие потери соединения: {self.loss_reason} ({self.logic_failures} подряд)")
+                return True
+            self.is_running = False
+        return False
+
     async def _setup_webapp_event_handlers(self):
         """Настройка обработчиков событий WebApp"""
         await self.page.evaluate("""
@@ -269,6 +478,18 @@ class BotHandler:
 
     async def navigate_to_webapp(self) -> bool:
         """Навигация к WebApp"""
+        navigation = AssetCache().begin_navigation() if ENABLE_ASSET_CACHE else None
+        success = False
+        try:
+            success = await self._navigate_to_webapp()
+            return success
+        finally:
+            # Индекс кэша и статистика записываются при любом исходе навигации
+            if navigation:
+                AssetCache().end_navigation(navigation, success)
+
+    async def _navigate_to_webapp(self) -> bool:
+        """Переход к WebApp с повторными попытками"""
         MAX_RETRY_ATTEMPTS = 2
         retry_count = 0
         
@@ -295,7 +516,7 @@ class BotHandler:
                 # Переход по URL с обновленной версией
                 response = await self.page.goto(
                     webapp_url,
-                    wait_until='networkidle'
+                    wait_until='load'
                 )
                 
                 if not response or not response.ok:
@@ -366,13 +587,16 @@ class BotHandler:
                         
                         # Ждем редирект с таймаутом
                         await self.page.wait_for_function(
-                            "() => window.location.href.includes('games.pluto.vision')",
+                            f"() => window.location.href.includes('{GAME_HOST}')",
                             timeout=50000
                         )
                         logger.info(f"Редирект выполнен успешно: {self.page.url}")
                         
-                        # Ждем загрузку страницы после редиректа
-                        await self.page.wait_for_load_state('networkidle')
+                        # Ждем появления canvas игры и WebApp после редиректа
+                        readiness = await GameReadinessDetector(self.page).wait_until_ready(require_frames=False)
+                        if not readiness.ready:
+                            logger.error(f"Страница игры не загрузилась: {readiness.reason}")
+                            return False
                         logger.info("Страница успешно загружена")
                         
                         # Инициализируем обработчик canvas только после полной загрузки
@@ -441,7 +665,7 @@ class BotHandler:
             return await self.try_reconnect()
 
     async def try_reconnect(self) -> bool:
-        """Попытка переподключения"""
+        """Попытка переподключения с переходом от дешевых уровней восстановления к дорогим"""
         if self.reconnect_attempts >= MAX_RECONNECT_ATTEMPTS:
             logger.error(f"Превышено максимальное количество попыток переподключения ({MAX_RECONNECT_ATTEMPTS})")
             self.is_running = False
@@ -449,34 +673,192 @@ class BotHandler:
             
         self.reconnect_attempts += 1
         logger.info(f"Попытка переподключения {self.reconnect_attempts}/{MAX_RECONNECT_ATTEMPTS}")
-        
-        logger.debug(f"Ожидание {RECONNECT_DELAY} секунд перед переподключением...")
-        await asyncio.sleep(RECONNECT_DELAY)
-        
+
+        handlers = {
+            'reload': self._reconnect_reload,
+            'context': self._reconnect_context,
+            'browser': self._reconnect_browser
+        }
+        for tier in RECONNECT_TIERS:
+            stats = self.reconnect_stats[tier]
+            stats['attempts'] += 1
+            started = time.perf_counter()
+            try:
+                success = await handlers[tier]()
+            except Exception as e:
+                logger.error(f"Ошибка переподключения ({tier}): {e}")
+                success = False
+            elapsed = time.perf_counter() - started
+            stats['total_time'] += elapsed
+
+            if success:
+                stats['successes'] += 1
+                logger.info(f"Переподключение успешно выполнено ({tier}) за {elapsed:.1f} сек")
+                self.reconnect_attempts = 0
+                await self._restart_logic()
+                return True
+            logger.warning(f"Переподключение ({tier}) не удалось за {elapsed:.1f} сек")
+
+        return False
+
+    async def _reconnect_reload(self) -> bool:
+        """Уровень 1: перезагрузка страницы игры, вне игры - повторная навигация"""
+        if self.lease and self.lease.revoked:
+            return False
+        if self.page is None or self.page.is_closed() or not self.browser.is_connected():
+            return False
+
+        if urlparse(self.page.url).hostname == GAME_HOST:
+            if not await self._reload_game_page():
+                return False
+        else:
+            logger.debug("Страница вне игры, повторная навигация...")
+            if not await self.navigate_to_webapp():
+                return False
+        self._reset_liveness()
+        return True
+
+    # Функция перезагрузки страницы игры без повторного входа через WebApp
+    async def _reload_game_page(self) -> bool:
+        """Перезагрузка текущей страницы игры с ожиданием готовности canvas"""
         try:
-            logger.debug("Очистка текущей сессии...")
-            await self.cleanup(full=False)
-            
-            logger.debug("Попытка переинициализации браузера...")
-            if await self.setup_browser():
-                logger.debug("Попытка повторной навигации...")
-                if await self.navigate_to_webapp():
-                    logger.info("Переподключение успешно выполнено")
-                    self.reconnect_attempts = 0
-                    return True
-                else:
-                    logger.error("Ошибка навигации при переподключении")
-            else:
+            logger.debug(f"Перезагрузка страницы игры: {self.page.url}")
+            response = await self.page.reload(wait_until='load')
+            if response is not None and not response.ok:
+                logger.error(f"Ошибка перезагрузки страницы. Статус: {response.status}")
+                return False
+
+            readiness = await GameReadinessDetector(self.page).wait_until_ready(require_frames=False)
+            if not readiness.ready:
+                logger.error(f"Страница игры не загрузилась после перезагрузки: {readiness.reason}")
+                return False
+
+            if not await GameCanvasHandler(self.page).initialize():
+                logger.error("Не удалось инициализировать canvas после перезагрузки")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка перезагрузки страницы игры: {e}")
+            return False
+
+    async def _reconnect_context(self) -> bool:
+        """Уровень 2: новый контекст в запущенном браузере (в пуле - в наименее загруженном)"""
+        if self.lease is None and (self.browser is None or not self.browser.is_connected()):
+            return False
+        logger.debug("Пересоздание контекста браузера...")
+        await self._close_context()
+        if not await self._create_page():
+            return False
+        if ENABLE_TRACING:
+            await self.tracer.start_tracing()
+        return await self.navigate_to_webapp()
+
+    async def _reconnect_browser(self) -> bool:
+        """Уровень 3: перезапуск браузера"""
+        logger.debug(f"Ожидание {RECONNECT_DELAY} секунд перед перезапуском браузера...")
+        await asyncio.sleep(RECONNECT_DELAY)
+
+        logger.debug("Очистка текущей сессии...")
+        await self.cleanup(full=False)
+
+        logger.debug("Попытка переинициализации браузера...")
+        if not ENABLE_BROWSER_POOL:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            if not await self._launch_browser():
                 logger.error("Ошибка инициализации браузера при переподключении")
-                
+                return False
+        if not await self._create_page():
+            logger.error("Ошибка инициализации браузера при переподключении")
+            return False
+        if ENABLE_TRACING:
+            await self.tracer.start_tracing()
+
+        logger.debug("Попытка повторной навигации...")
+        if not await self.navigate_to_webapp():
+            logger.error("Ошибка навигации при переподключении")
+            return False
+        return True
+
+    def _reset_liveness(self):
+        """Сброс события потери соединения после восстановления на той же странице"""
+        self.connection_lost.clear()
+        self.loss_reason = None
+        self.probe_interval = PROBE_MIN_INTERVAL
+
+    async def _close_context(self):
+        """Закрытие текущего контекста без остановки браузера"""
+        try:
+            if ENABLE_SCREENCAST and self.page:
+                await ScreencastStream.stop_for_page(self.page)
+            if self.tracer:
+                await self.tracer.stop_tracing()
+                self.tracer = None
+            if self.lease:
+                await self.lease.release()
+            elif self.context:
+                await self.context.close()
         except Exception as e:
-            logger.error(f"Ошибка во время переподключения: {e}")
-            
-        return False
+            logger.debug(f"Ошибка закрытия контекста: {e}")
+        finally:
+            self.context = None
+            self.lease = None
+
+    async def start_logic(self):
+        """Запуск логики WebApp на текущей странице"""
+        self.webapp_logic = WebAppLogic(self.page)
+        self.logic_started_at = time.monotonic()
+        self.logic_task = asyncio.create_task(self.webapp_logic.start_logic())
+
+    async def stop_logic(self):
+        """Остановка логики WebApp"""
+        if self.webapp_logic:
+            self.webapp_logic.is_running = False
+        if self.logic_task:
+            if not self.logic_task.done():
+                self.logic_task.cancel()
+            try:
+                await self.logic_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"Ошибка при остановке логики WebApp: {e}")
+        self.webapp_logic = None
+        self.logic_task = None
+
+    async def _restart_logic(self):
+        """Перезапуск логики WebApp на странице, полученной при переподключении"""
+        if self.logic_task is None:
+            return
+        await self.stop_logic()
+        await self.start_logic()
+
+    def log_reconnect_stats(self):
+        """Вывод статистики переподключений в лог"""
+        used = {tier: stats for tier, stats in self.reconnect_stats.items() if stats['attempts']}
+        if not used:
+            return
+        summary = ', '.join(
+            f"{tier}: {int(stats['successes'])}/{int(stats['attempts'])}, "
+            f"среднее {stats['total_time'] / stats['attempts']:.1f} сек"
+            for tier, stats in used.items()
+        )
+        logger.info(f"Переподключения: {summary}")
 
     async def cleanup(self, full: bool = True):
         """Очистка ресурсов"""
         try:
+            if ENABLE_ASSET_CACHE:
+                AssetCache().flush()
+
+            if self.lease:
+                # Браузер принадлежит пулу: освобождается только контекст
+                await self._close_context()
+                return
+
+            if ENABLE_SCREENCAST and self.page:
+                await ScreencastStream.stop_for_page(self.page)
+
             if self.tracer:
                 await self.tracer.stop_tracing()
                 
@@ -518,12 +900,33 @@ class BotHandler:
 
             # Инициализация и запуск логики WebApp
             logger.info("Запуск основной логики действий бота")
-            webapp_logic = WebAppLogic(self.page)
-            logic_task = asyncio.create_task(webapp_logic.start_logic())
+            await self.start_logic()
             
-            # Основной цикл работы
+            # Основной цикл работы: ожидание событий Playwright с редкой проверкой WebApp
             while self.is_running:
                 try:
+                    if await self.wait_for_liveness_event():
+                        if self.logic_failed:
+                            self.logic_failed = False
+                            if self.logic_failures > MAX_LOGIC_RESTARTS:
+                                logger.error(f"Логика WebApp завершилась с ошибкой {self.logic_failures} раз подряд, "
+                                             f"завершение работы")
+                                return False
+                            delay = RECONNECT_DELAY * 2 ** (self.logic_failures - 1)
+                            logger.info(f"Перезапуск логики WebApp {self.logic_failures}/{MAX_LOGIC_RESTARTS} "
+                                        f"через {delay} сек")
+                            await asyncio.sleep(delay)
+
+                        # При закрытии окна вручную событие отключения браузера приходит после закрытия страницы
+                        await asyncio.sleep(0.5)
+                        if self.lease is None and not self.browser.is_connected():
+                            logger.info("Браузер был закрыт вручную - успешное завершение")
+                            return True
+                        if not await self.try_reconnect():
+                            logger.warning("Потеряно соединение, завершение работы")
+                            break
+                        continue
+
                     if not await self.check_connection():
                         # Проверяем, был ли браузер закрыт вручную
                         if self.browser.is_connected() == False:
@@ -531,9 +934,10 @@ class BotHandler:
                             return True
                         logger.warning("Потеряно соединение, завершение работы")
                         break
-                    
-                    # Имитация человеческого поведения
-                    delay = await self.human.random_delay()
+
+                    # Соединение стабильно: следующая проверка выполняется реже
+                    self.probe_interval = min(self.probe_interval * 2, PROBE_MAX_INTERVAL)
+                    await self.render_metrics.log_sample()
                                         
                     # Создание скриншота
                     if self.recorder and ENABLE_SCREENSHOTS:
@@ -551,8 +955,7 @@ class BotHandler:
                     raise
             
             # Останавливаем логику WebApp
-            webapp_logic.is_running = False
-            await logic_task
+            await self.stop_logic()
             
             logger.info("Завершение работы обработчика")
             return True
@@ -562,6 +965,9 @@ class BotHandler:
             return False
             
         finally:
+            ThreadBudget().log_stats()
+            get_default_pipeline().log_stats()
+            self.log_reconnect_stats()
             logger.debug("Очистка ресурсов...")
             await self.cleanup()
 
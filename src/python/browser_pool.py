@@ -0,0 +1,301 @@
+# browser_pool.py
+"""
+Общий пул процессов Chromium
+- BROWSER_POOL_SIZE браузеров запускаются заранее и остаются запущенными между сессиями
+- Каждая сессия получает изолированный BrowserContext в наименее загруженном браузере
+- Браузер, превысивший BROWSER_POOL_MAX_MEMORY_MB или проработавший дольше
+  BROWSER_POOL_RECYCLE_AFTER, выводится из работы: сессии получают сигнал на переподключение
+  и переходят в другие браузеры, после освобождения браузер перезапускается
+- Пул живет в общем цикле событий runtime_control и закрывается при shutdown()
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+from loguru import logger
+from playwright.async_api import async_playwright, Browser, BrowserContext
+from dotenv import load_dotenv
+
+try:
+    import psutil
+except ImportError:  # Без psutil память браузеров не измеряется
+    psutil = None
+
+load_dotenv()
+
+ENABLE_BROWSER_POOL = os.getenv('ENABLE_BROWSER_POOL', 'false').lower() == 'true'
+BROWSER_POOL_SIZE = max(1, int(os.getenv('BROWSER_POOL_SIZE', '1')))
+BROWSER_POOL_MAX_MEMORY_MB = float(os.getenv('BROWSER_POOL_MAX_MEMORY_MB', '1500'))
+BROWSER_POOL_RECYCLE_AFTER = float(os.getenv('BROWSER_POOL_RECYCLE_AFTER', '3600'))
+BROWSER_POOL_CHECK_INTERVAL = float(os.getenv('BROWSER_POOL_CHECK_INTERVAL', '60'))
+# Файл, в который записывается статистика пула при каждой проверке (пусто - не записывать)
+BROWSER_POOL_STATS_FILE = os.getenv('BROWSER_POOL_STATS_FILE', '')
+
+@dataclass(eq=False)
+class PooledBrowser:
+    """Процесс Chromium в пуле"""
+    index: int
+    browser: Browser
+    started: float = field(default_factory=time.monotonic)
+    leases: Set['BrowserLease'] = field(default_factory=set)
+    retiring: bool = False
+    memory_mb: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started
+
+class BrowserLease:
+    """Контекст браузера, выданный сессии"""
+    def __init__(self, pool: 'BrowserPool', pooled: PooledBrowser, context: BrowserContext):
+        self.pool = pool
+        self.pooled = pooled
+        self.context = context
+        self.revoked = False
+        # Вызывается, когда браузер выводится из работы и сессии нужно переподключиться
+        self.on_revoke: Optional[Callable[[], None]] = None
+
+    @property
+    def browser(self) -> Browser:
+        return self.pooled.browser
+
+    def revoke(self):
+        """Сигнал сессии о переходе в другой браузер"""
+        if self.revoked:
+            return
+        self.revoked = True
+        if self.on_revoke:
+            try:
+                self.on_revoke()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика вывода браузера из работы: {e}")
+
+    async def release(self):
+        await self.pool.release(self)
+
+class BrowserPool:
+    """Пул запущенных браузеров с выдачей изолированных контекстов"""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance._initialize()
+            cls._instance = instance
+        return cls._instance
+
+    def _initialize(self):
+        self.size = BROWSER_POOL_SIZE
+        self.playwright = None
+        self.launch_options: Dict[str, Any] = {}
+        self.browsers: List[PooledBrowser] = []
+        self._next_index = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self.counters = {'leases': 0, 'released': 0, 'recycled': 0,
+                         'retired_memory': 0, 'retired_age': 0, 'crashed': 0}
+
+    @property
+    def is_started(self) -> bool:
+        return self.playwright is not None
+
+    async def start(self, launch_options: Dict[str, Any]):
+        """Запуск Playwright и BROWSER_POOL_SIZE браузеров (повторный вызов ничего не делает)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.is_started:
+                return
+            self.launch_options = launch_options
+            if psutil is None and BROWSER_POOL_MAX_MEMORY_MB:
+                logger.warning("psutil не установлен: память браузеров пула не измеряется, "
+                               "вывод из работы по BROWSER_POOL_MAX_MEMORY_MB отключен")
+            self.playwright = await async_playwright().start()
+            started = time.perf_counter()
+            await asyncio.gather(*(self._launch() for _ in range(self.size)))
+            logger.info(f"Пул браузеров запущен: {len(self.browsers)} процессов за "
+                        f"{time.perf_counter() - started:.1f} сек")
+            self._maintenance = asyncio.create_task(self._maintenance_loop())
+            self._register_shutdown()
+
+    def _register_shutdown(self):
+        """Закрытие пула вместе с циклом событий автоматизации"""
+        try:
+            import runtime_control
+            runtime_control.register_shutdown(self.close)
+        except ImportError:
+            logger.debug("runtime_control недоступен, пул закрывается только вручную")
+
+    async def _launch(self) -> PooledBrowser:
+        browser = await self.playwright.chromium.launch(**self.launch_options)
+        pooled = PooledBrowser(index=self._next_index, browser=browser)
+        self._next_index += 1
+        browser.on("disconnected", lambda _: self._on_disconnected(pooled))
+        self.browsers.append(pooled)
+        logger.debug(f"Браузер пула #{pooled.index} запущен")
+        return pooled
+
+    def _on_disconnected(self, pooled: PooledBrowser):
+        """Аварийное завершение процесса браузера"""
+        if pooled not in self.browsers:
+            return
+        logger.warning(f"Браузер пула #{pooled.index} отключился")
+        self.counters['crashed'] += 1
+        self.browsers.remove(pooled)
+        for lease in list(pooled.leases):
+            lease.revoke()
+        asyncio.create_task(self._launch_replacement())
+
+    # Функция выдачи контекста сессии
+    async def lease(self, context_options: Dict[str, Any]) -> BrowserLease:
+        """Создание изолированного контекста в наименее загруженном браузере"""
+        async with self._lock:
+            candidates = [pooled for pooled in self.browsers
+                          if not pooled.retiring and pooled.browser.is_connected()]
+            if not candidates:
+                candidates = [await self._launch()]
+            pooled = min(candidates, key=lambda item: (len(item.leases), item.memory_mb))
+
+        context = await pooled.browser.new_context(**context_options)
+        lease = BrowserLease(self, pooled, context)
+        pooled.leases.add(lease)
+        self.counters['leases'] += 1
+        logger.debug(f"Контекст выдан в браузере пула #{pooled.index} "
+                     f"(контекстов: {len(pooled.leases)})")
+        return lease
+
+    async def release(self, lease: BrowserLease):
+        """Закрытие контекста сессии и перезапуск выведенного из работы браузера"""
+        pooled = lease.pooled
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.debug(f"Ошибка закрытия контекста пула: {e}")
+        if lease in pooled.leases:
+            pooled.leases.discard(lease)
+            self.counters['released'] += 1
+        if pooled.retiring and not pooled.leases:
+            await self._recycle(pooled)
+
+    async def _recycle(self, pooled: PooledBrowser):
+        """Закрытие освободившегося браузера и запуск замены"""
+        async with self._lock:
+            if pooled not in self.browsers:
+                return
+            self.browsers.remove(pooled)
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.debug(f"Ошибка закрытия браузера пула #{pooled.index}: {e}")
+            self.counters['recycled'] += 1
+            logger.info(f"Браузер пула #{pooled.index} перезапущен "
+                        f"(возраст {pooled.age / 60:.0f} мин, память {pooled.memory_mb:.0f} МБ)")
+            if len([item for item in self.browsers if not item.retiring]) < self.size:
+                await self._launch()
+
+    def _retire(self, pooled: PooledBrowser, reason: str):
+        """Вывод браузера из работы: новые контексты не выдаются, сессии переподключаются"""
+        if pooled.retiring:
+            return
+        # Последний рабочий браузер не выводится, пока нет замены
+        if not [item for item in self.browsers if item is not pooled and not item.retiring]:
+            asyncio.create_task(self._launch_replacement())
+        pooled.retiring = True
+        self.counters[f'retired_{reason}'] += 1
+        logger.info(f"Браузер пула #{pooled.index} выводится из работы ({reason}), "
+                    f"сессий для переноса: {len(pooled.leases)}")
+        for lease in list(pooled.leases):
+            lease.revoke()
+        if not pooled.leases:
+            asyncio.create_task(self._recycle(pooled))
+
+    async def _launch_replacement(self):
+        async with self._lock:
+            await self._launch()
+
+    async def _memory_mb(self, pooled: PooledBrowser) -> float:
+        """Память процессов браузера (основной, рендеры, GPU) через CDP и psutil"""
+        if psutil is None:
+            return 0.0
+        try:
+            session = await pooled.browser.new_browser_cdp_session()
+            try:
+                info = await session.send('SystemInfo.getProcessInfo')
+            finally:
+                await session.detach()
+            total = 0
+            for process in info.get('processInfo', []):
+                try:
+                    total += psutil.Process(process['id']).memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / 1024 / 1024
+        except Exception as e:
+            logger.debug(f"Не удалось получить память браузера пула #{pooled.index}: {e}")
+            return 0.0
+
+    async def _maintenance_loop(self):
+        """Периодическая проверка памяти и возраста браузеров"""
+        while self.is_started:
+            await asyncio.sleep(BROWSER_POOL_CHECK_INTERVAL)
+            try:
+                for pooled in list(self.browsers):
+                    pooled.memory_mb = await self._memory_mb(pooled)
+                    if pooled.retiring:
+                        continue
+                    if BROWSER_POOL_MAX_MEMORY_MB and pooled.memory_mb > BROWSER_POOL_MAX_MEMORY_MB:
+                        self._retire(pooled, 'memory')
+                    elif BROWSER_POOL_RECYCLE_AFTER and pooled.age > BROWSER_POOL_RECYCLE_AFTER:
+                        self._retire(pooled, 'age')
+                self.export_stats()
+            except Exception as e:
+                logger.error(f"Ошибка проверки пула браузеров: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула"""
+        return {
+            'size': self.size,
+            'browsers': [
+                {
+                    'index': pooled.index,
+                    'contexts': len(pooled.leases),
+                    'memory_mb': round(pooled.memory_mb, 1),
+                    'age_s': round(pooled.age),
+                    'retiring': pooled.retiring
+                }
+                for pooled in self.browsers
+            ],
+            'contexts': sum(len(pooled.leases) for pooled in self.browsers),
+            **self.counters
+        }
+
+    def export_stats(self):
+        """Вывод статистики в лог и в BROWSER_POOL_STATS_FILE"""
+        stats = self.stats()
+        logger.info(f"Пул браузеров: {len(stats['browsers'])} процессов, {stats['contexts']} контекстов, "
+                    f"перезапущено {stats['recycled']}")
+        if BROWSER_POOL_STATS_FILE:
+            try:
+                with open(BROWSER_POOL_STATS_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(stats, f, indent=2)
+            except OSError as e:
+                logger.error(f"Ошибка записи статистики пула браузеров: {e}")
+
+    async def close(self):
+        """Закрытие всех браузеров и Playwright"""
+        if not self.is_started:
+            return
+        if self._maintenance:
+            self._maintenance.cancel()
+        browsers = list(self.browsers)
+        self.browsers.clear()
+        for pooled in browsers:
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.debug(f"Ошибка закрытия браузера пула #{pooled.index}: {e}")
+        await self.playwright.stop()
+        self.playwright = None
+        logger.info("Пул браузеров закрыт")
@@ -4,7 +4,7 @@ import asyncio
 from pathlib import Path
 from typing import Optional, Tuple, Union, List, Dict, Any
 from telethon import TelegramClient, events, functions
-from telethon.tl.types import Message
+from telethon.tl.types import Message, InputPeerUser
 from telethon.errors import SessionPasswordNeededError, AuthKeyUnregisteredError
 from telethon.tl.custom.button import Button
 from loguru import logger
@@ -15,6 +15,63 @@ from datetime import datetime
 import json
 import time
 
+load_dotenv()
+
+# Количество последних диалогов, просматриваемых при поиске бота по имени
+BOT_DIALOG_SCAN_LIMIT = int(os.getenv('BOT_DIALOG_SCAN_LIMIT', '200'))
+# Время жизни сохраненного URL WebApp (сек, 0 - URL ищется каждый раз)
+BOT_URL_CACHE_TTL = int(os.getenv('BOT_URL_CACHE_TTL', '86400'))
+
+class BotEntityCache:
+    """
+    Сохраненные данные бота для файла сессии
+    username/имя бота -> id, access_hash и последний найденный URL WebApp
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            temp_path = self.path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения данных бота: {e}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def fresh_url(self, key: str) -> Optional[str]:
+        """Сохраненный URL WebApp, если он не устарел"""
+        entry = self.entries.get(key)
+        if not entry or not entry.get('webapp_url') or not BOT_URL_CACHE_TTL:
+            return None
+        if time.time() - entry.get('url_updated', 0) > BOT_URL_CACHE_TTL:
+            return None
+        return entry['webapp_url']
+
+    def store(self, key: str, metadata: Dict[str, Any], url: Optional[str]):
+        entry = dict(self.entries.get(key, {}))
+        entry.update(metadata)
+        if url:
+            entry['webapp_url'] = url
+            entry['url_updated'] = time.time()
+        self.entries[key] = entry
+        self._save()
+
+    def forget(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self._save()
+
 class TelegramLogin:
     def __init__(self, api_id: int, api_hash: str, phone: str):
         self.api_id = api_id
@@ -22,6 +79,7 @@ class TelegramLogin:
         self.phone = phone
         self.session_dir = Path(".py_session")
         self.session_file = self.session_dir / f"{phone.replace('+', '')}.session"
+        self.bot_cache = BotEntityCache(self.session_dir / f"{phone.replace('+', '')}.bots.json")
         self.client: Optional[TelegramClient] = None
         self.device_config = None
 
@@ -112,44 +170,63 @@ class TelegramLogin:
             logger.error(f"Критическая ошибка входа: {e}")
             return False
 
+    async def resolve_bot(self, client: TelegramClient, bot_key: str, bot_username: str, bot_name: str):
+        """
+        Получение сущности бота
+        1. Сохраненные id и access_hash (без запросов к Telegram)
+        2. Username через get_input_entity
+        3. Поиск по имени в последних BOT_DIALOG_SCAN_LIMIT диалогах
+        """
+        cached = self.bot_cache.get(bot_key)
+        if cached and cached.get('bot_id') and cached.get('access_hash'):
+            try:
+                peer = await client.get_input_entity(InputPeerUser(cached['bot_id'], cached['access_hash']))
+                logger.info(f"Бот найден в сохраненных данных: {cached.get('username') or bot_key}")
+                return await client.get_entity(peer)
+            except Exception as e:
+                logger.warning(f"Сохраненные данные бота недействительны: {e}")
+                self.bot_cache.forget(bot_key)
+
+        if bot_username:
+            try:
+                logger.info(f"Пытаемся найти бота по username: {bot_username}")
+                peer = await client.get_input_entity(bot_username)
+                entity = await client.get_entity(peer)
+                logger.info(f"Бот найден: {entity.username}")
+                return entity
+            except Exception as e:
+                logger.error(f"Ошибка поиска бота по username: {e}")
+
+        if bot_name:
+            async for dialog in client.iter_dialogs(limit=BOT_DIALOG_SCAN_LIMIT):
+                if dialog.name == bot_name:
+                    logger.info(f"Найден бот: {bot_name}")
+                    return dialog.entity
+            logger.warning(f"Бот {bot_name} не найден в последних {BOT_DIALOG_SCAN_LIMIT} диалогах")
+        return None
+
     async def find_bot_url(self, client: TelegramClient) -> Tuple[Optional[str], Dict[str, Any]]:
         """Поиск URL бота с учетом приоритетов"""
         try:
             bot_name = os.getenv("TELEGRAM_BOT_NAME")
+            bot_username = os.getenv("BOT_URL", "").strip().lstrip('@')
+            bot_key = bot_username or bot_name
             found_url = None
             bot_metadata = None
 
-            # Ищем бота в диалогах
-            async for dialog in client.iter_dialogs():
-                if dialog.name == bot_name:
-                    logger.info(f"Найден бот: {bot_name}")
-                    found_url, bot_metadata = await self.process_bot_chat(client, dialog)
-                    break
-            
-            # Если бот не найден в диалогах, пробуем найти по username
-            if not found_url:
-                bot_username = os.getenv("BOT_URL", "").strip()
-                if bot_username:
-                    if bot_username.startswith('@'):
-                        bot_username = bot_username[1:]
-                    logger.info(f"Пытаемся найти бота по username: {bot_username}")
-                    
-                    try:
-                        bot_entity = await client.get_entity(bot_username)
-                        logger.info(f"Бот найден: {bot_entity.username}")
-                        
-                        logger.info("Отправляем команду /start")
-                        await client.send_message(bot_entity, "/start")
-                        await asyncio.sleep(2)
-                        
-                        # Получаем диалог с ботом
-                        async for dialog in client.iter_dialogs():
-                            if dialog.entity.id == bot_entity.id:
-                                logger.info("Обрабатываем новый диалог с ботом")
-                                found_url, bot_metadata = await self.process_bot_chat(client, dialog)
-                                break
-                    except Exception as e:
-                        logger.error(f"Ошибка при инициализации бота: {e}")
+            cached = self.bot_cache.get(bot_key)
+            cached_url = self.bot_cache.fresh_url(bot_key)
+            if cached_url:
+                logger.info(f"Используем сохраненный URL бота: {cached_url}")
+                found_url = cached_url
+                bot_metadata = {name: cached.get(name) for name in
+                                ('bot_id', 'access_hash', 'username', 'bot_info_version')}
+            else:
+                bot_entity = await self.resolve_bot(client, bot_key, bot_username, bot_name)
+                if bot_entity:
+                    found_url, bot_metadata = await self.process_bot_chat(client, bot_entity)
+                    if bot_metadata:
+                        self.bot_cache.store(bot_key, bot_metadata, found_url)
 
             # Проверяем результаты и приоритеты
             env_bot_url = os.getenv("TELEGRAM_BOT_URL", "").strip()
@@ -205,9 +282,9 @@ class TelegramLogin:
             return {}
 
     async def process_bot_chat(self, client: TelegramClient, dialog) -> Tuple[Optional[str], Dict[str, Any]]:
-        """Обработка чата бота для поиска URL и получения метаданных"""
+        """Обработка чата бота (диалог или сущность) для поиска URL и получения метаданных"""
         try:
-            bot_entity = await client.get_entity(dialog.entity)
+            bot_entity = await client.get_entity(getattr(dialog, 'entity', dialog))
             metadata = await self.get_bot_metadata(bot_entity)
             url = await self._find_bot_url_internal(client, dialog)
             logger.debug(f"Найден URL бота: {url}, метаданные бота: {metadata}, диалог: {dialog}")
@@ -483,18 +560,22 @@ class TelegramLogin:
             logger.info("Начинаем процесс подключения к Telegram")
             await self.ensure_session_directory()
             
-            # Добавляем обработку ожидаемой ошибки блокировки базы данных от телеграм
-            try:
-                self.client = await self.initialize_client()
-                logger.debug("Клиент Telegram инициализирован")
-            except Exception as e:
-                if "database is locked" in str(e):
-                    logger.warning("😱 !СЫНОК ТЕБЯ ВЗЛОМАЛИ! 😂 Шучу, ожидаемая ошибка, продолжаем работу: %s", str(e))
-                else:
-                    raise
-            
-            await self.client.connect()
-            logger.debug("Установлено соединение с Telegram")
+            if self.client is not None and self.client.is_connected():
+                # Клиент сохранен с предыдущего запуска сессии
+                logger.info("Используется подключенный клиент Telegram")
+            else:
+                # Добавляем обработку ожидаемой ошибки блокировки базы данных от телеграм
+                try:
+                    self.client = await self.initialize_client()
+                    logger.debug("Клиент Telegram инициализирован")
+                except Exception as e:
+                    if "database is locked" in str(e):
+                        logger.warning("😱 !СЫНОК ТЕБЯ ВЗЛОМАЛИ! 😂 Шучу, ожидаемая ошибка, продолжаем работу: %s", str(e))
+                    else:
+                        raise
+                
+                await self.client.connect()
+                logger.debug("Установлено соединение с Telegram")
 
             # Проверка авторизации и вход
             try:
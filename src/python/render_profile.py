@@ -0,0 +1,155 @@
+# render_profile.py
+"""
+Профиль отрисовки с минимальной нагрузкой на процессор для одной сессии
+- Масштаб устройства ограничивается MAX_DEVICE_SCALE: canvas рисуется с меньшим разрешением
+- requestAnimationFrame ограничивается RENDER_FPS_CAP кадрами в секунду,
+  периодические таймеры не срабатывают чаще одного кадра
+- Chromium запускается без GPU-композитинга и фоновых служб
+- Скриншоты снимаются с scale='css', клики выполняются в CSS-пикселях,
+  поэтому координаты областей (ROI) не зависят от масштаба устройства
+"""
+import os
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from playwright.async_api import BrowserContext, CDPSession, Page
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENABLE_PERFORMANCE_PROFILE = os.getenv('ENABLE_PERFORMANCE_PROFILE', 'false').lower() == 'true'
+MAX_DEVICE_SCALE = float(os.getenv('MAX_DEVICE_SCALE', '1.0'))
+RENDER_FPS_CAP = int(os.getenv('RENDER_FPS_CAP', '30'))
+
+# Флаги Chromium профиля производительности
+PERFORMANCE_BROWSER_ARGS = [
+    '--disable-gpu-compositing',
+    '--disable-smooth-scrolling',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-extensions',
+    '--disable-sync',
+    '--disable-breakpad',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--metrics-recording-only'
+]
+
+# Ограничение частоты кадров и периодических таймеров внутри страницы
+FPS_CAP_SCRIPT = """
+(() => {
+    const frameInterval = 1000 / %d;
+    const nativeRequest = window.requestAnimationFrame.bind(window);
+    const nativeSetInterval = window.setInterval.bind(window);
+    const callbacks = new Map();
+    let nextId = 1;
+    let scheduled = false;
+    let lastFrame = 0;
+
+    const flush = (timestamp) => {
+        if (timestamp - lastFrame < frameInterval - 1) {
+            nativeRequest(flush);
+            return;
+        }
+        lastFrame = timestamp;
+        scheduled = false;
+        const pending = Array.from(callbacks.values());
+        callbacks.clear();
+        for (const callback of pending) {
+            try {
+                callback(timestamp);
+            } catch (error) {
+                setTimeout(() => { throw error; });
+            }
+        }
+    };
+
+    window.requestAnimationFrame = (callback) => {
+        const id = nextId++;
+        callbacks.set(id, callback);
+        if (!scheduled) {
+            scheduled = true;
+            nativeRequest(flush);
+        }
+        return id;
+    };
+    window.cancelAnimationFrame = (id) => { callbacks.delete(id); };
+    window.setInterval = (handler, timeout, ...args) =>
+        nativeSetInterval(handler, Math.max(timeout || 0, frameInterval), ...args);
+})();
+"""
+
+def browser_args() -> List[str]:
+    """Дополнительные флаги запуска Chromium"""
+    return list(PERFORMANCE_BROWSER_ARGS) if ENABLE_PERFORMANCE_PROFILE else []
+
+def device_scale(device_config: Dict[str, Any]) -> float:
+    """Масштаб устройства для контекста браузера"""
+    scale = device_config['device_scale_factor']
+    if ENABLE_PERFORMANCE_PROFILE:
+        return min(scale, MAX_DEVICE_SCALE)
+    return scale
+
+async def apply_to_context(context: BrowserContext):
+    """Ограничение частоты кадров для всех страниц контекста"""
+    if not ENABLE_PERFORMANCE_PROFILE:
+        return
+    await context.add_init_script(FPS_CAP_SCRIPT % RENDER_FPS_CAP)
+    logger.info(f"Профиль производительности: масштаб до {MAX_DEVICE_SCALE}, {RENDER_FPS_CAP} FPS")
+
+class RenderMetrics:
+    """Загрузка процессора и память страницы через CDP Performance.getMetrics"""
+    def __init__(self, page: Page):
+        self.page = page
+        self.session: Optional[CDPSession] = None
+        self._last: Dict[str, float] = {}
+        self._last_time = 0.0
+
+    async def start(self) -> bool:
+        try:
+            self.session = await self.page.context.new_cdp_session(self.page)
+            await self.session.send('Performance.enable')
+            self._last = await self._read()
+            self._last_time = time.monotonic()
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка подключения метрик производительности: {e}")
+            self.session = None
+            return False
+
+    async def _read(self) -> Dict[str, float]:
+        result = await self.session.send('Performance.getMetrics')
+        return {metric['name']: metric['value'] for metric in result['metrics']}
+
+    async def sample(self) -> Optional[Dict[str, float]]:
+        """Метрики с момента предыдущего замера"""
+        if self.session is None:
+            return None
+        try:
+            current = await self._read()
+            now = time.monotonic()
+            wall = max(1e-6, now - self._last_time)
+            delta = lambda name: current.get(name, 0.0) - self._last.get(name, 0.0)
+            sample = {
+                # Доля времени основного потока страницы, занятая задачами
+                'cpu_share': delta('TaskDuration') / wall,
+                'script_share': delta('ScriptDuration') / wall,
+                'layout_share': (delta('LayoutDuration') + delta('RecalcStyleDuration')) / wall,
+                'js_heap_mb': current.get('JSHeapUsedSize', 0.0) / 1024 / 1024,
+                'nodes': current.get('Nodes', 0.0)
+            }
+            self._last = current
+            self._last_time = now
+            return sample
+        except Exception as e:
+            logger.debug(f"Не удалось получить метрики производительности: {e}")
+            return None
+
+    async def log_sample(self):
+        """Вывод метрик в лог"""
+        sample = await self.sample()
+        if sample:
+            logger.info(f"Нагрузка страницы: CPU {sample['cpu_share']:.1%} "
+                        f"(скрипты {sample['script_share']:.1%}, layout {sample['layout_share']:.1%}), "
+                        f"JS heap {sample['js_heap_mb']:.1f} МБ")
@@ -0,0 +1,133 @@
+# runtime_control.py
+"""
+Управление циклом событий автоматизации из Rust
+- run() выполняет корутину в общем цикле событий (вызывается из блокирующего потока Rust)
+- request_cancel() потокобезопасно отменяет основную задачу
+- heartbeat_age() показывает, сколько секунд цикл событий не отвечал
+- Цикл событий сохраняется между запусками, поэтому объекты, привязанные к нему
+  (клиент Telegram), остаются рабочими при перезапуске сессии супервизором
+- shutdown() выполняет зарегистрированные обработчики очистки и закрывает цикл
+- Если предыдущий запуск еще выполняется в зависшем потоке, его цикл оставляется,
+  а для нового запуска создается новый цикл (теплое состояние старого цикла не используется)
+"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional
+from loguru import logger
+
+# Интервал обновления heartbeat в секундах
+HEARTBEAT_INTERVAL = 1.0
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_main_task: Optional[asyncio.Task] = None
+_last_heartbeat: float = 0.0
+_running = False
+_shutdown_callbacks: List[Callable[[], Awaitable]] = []
+_lock = threading.Lock()
+
+async def _heartbeat():
+    """Периодическая отметка о том, что цикл событий не заблокирован"""
+    global _last_heartbeat
+    while True:
+        _last_heartbeat = time.monotonic()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+async def _supervised(entrypoint: Callable[[], Awaitable]):
+    """Выполнение точки входа вместе с heartbeat"""
+    global _main_task
+    heartbeat = asyncio.create_task(_heartbeat())
+    try:
+        task = asyncio.create_task(entrypoint())
+        with _lock:
+            _main_task = task
+        return await task
+    finally:
+        heartbeat.cancel()
+
+def run(entrypoint: Callable[[], Awaitable]):
+    """
+    Запуск корутины в общем цикле событий (создается при первом запуске)
+    Отмена через request_cancel() возвращает False
+    """
+    global _loop, _main_task, _last_heartbeat, _running
+    with _lock:
+        if _running and _loop is not None:
+            # Предыдущий запуск не завершился: его цикл занят зависшим потоком
+            logger.warning("Предыдущий цикл событий еще выполняется, создается новый цикл")
+            _abandon_loop()
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+        loop = _loop
+        _last_heartbeat = time.monotonic()
+        _running = True
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_supervised(entrypoint))
+    except asyncio.CancelledError:
+        logger.warning("Автоматизация отменена")
+        return False
+    finally:
+        with _lock:
+            # Оставленный цикл не сбрасывает состояние нового запуска
+            if _loop is loop:
+                _main_task = None
+                _running = False
+
+def _abandon_loop():
+    """Отказ от зависшего цикла (вызывается под _lock)"""
+    global _loop, _main_task, _running
+    # Обработчики очистки привязаны к старому циклу и не могут выполняться в новом
+    _shutdown_callbacks.clear()
+    _loop = None
+    _main_task = None
+    _running = False
+
+def register_shutdown(callback: Callable[[], Awaitable]):
+    """Регистрация корутины очистки, выполняемой при shutdown()"""
+    _shutdown_callbacks.append(callback)
+
+def shutdown():
+    """Очистка теплого состояния и закрытие цикла событий"""
+    global _loop
+    with _lock:
+        loop = _loop
+        _loop = None
+    if loop is None or loop.is_closed():
+        return
+    if loop.is_running():
+        # Цикл занят зависшим потоком, закрыть его из другого потока нельзя
+        logger.error("Цикл событий автоматизации еще выполняется, закрытие пропущено")
+        return
+    try:
+        for callback in reversed(_shutdown_callbacks):
+            try:
+                loop.run_until_complete(callback())
+            except Exception as e:
+                logger.error(f"Ошибка обработчика очистки: {e}")
+        _shutdown_callbacks.clear()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+        logger.info("Цикл событий автоматизации закрыт")
+
+def request_cancel() -> bool:
+    """Кооперативная отмена основной задачи (вызывается из любого потока)"""
+    with _lock:
+        if _loop is None or _main_task is None or _loop.is_closed():
+            return False
+        logger.warning("Получен запрос на остановку автоматизации")
+        _loop.call_soon_threadsafe(_main_task.cancel)
+        return True
+
+def is_running() -> bool:
+    """Выполняется ли автоматизация"""
+    with _lock:
+        return _running and _loop is not None
+
+def heartbeat_age() -> float:
+    """Время с последнего heartbeat в секундах (-1, если автоматизация не запущена)"""
+    if not is_running():
+        return -1.0
+    return time.monotonic() - _last_heartbeat
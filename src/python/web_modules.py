@@ -97,8 +97,8 @@ class GameCanvasHandler:
 
     async def initialize(self) -> bool:
         try:
-            # Ждем загрузки страницы
-            await self.page.wait_for_load_state('networkidle')
+            # Ждем появления canvas игры
+            await self.page.wait_for_selector('#GameCanvas', state='attached')
             logger.info("Страница для web_modules успешно загружена")
                 
             await self.tracker.start_tracking()
@@ -0,0 +1,112 @@
+use anyhow::{Result, anyhow};
+use log::{info, error, warn};
+use pyo3::{Python, PyResult};
+use std::sync::Arc;
+use std::time::{Duration, Instant};
+use tokio::time::sleep;
+
+use crate::config::SystemConfig;
+use crate::py_automation;
+
+/// Настройки перезапуска сессий
+pub struct SupervisorConfig {
+    // Максимальное количество перезапусков подряд
+    pub max_restarts: u32,
+    // Начальная задержка перед перезапуском
+    pub base_delay: Duration,
+    // Максимальная задержка перед перезапуском
+    pub max_delay: Duration,
+    // Сессия, проработавшая дольше, сбрасывает счетчик перезапусков
+    pub stable_after: Duration,
+}
+
+impl SupervisorConfig {
+    pub fn from_env() -> Self {
+        let read = |name: &str, default: u64| -> u64 {
+            std::env::var(name)
+                .ok()
+                .and_then(|value| value.parse().ok())
+                .unwrap_or(default)
+        };
+        Self {
+            max_restarts: read("SUPERVISOR_MAX_RESTARTS", 5) as u32,
+            base_delay: Duration::from_secs(read("SUPERVISOR_BASE_DELAY", 2)),
+            max_delay: Duration::from_secs(read("SUPERVISOR_MAX_DELAY", 60)),
+            stable_after: Duration::from_secs(read("SUPERVISOR_STABLE_AFTER", 300)),
+        }
+    }
+
+    /// Экспоненциальная задержка для перезапуска с номером restart (начиная с 1)
+    pub fn delay(&self, restart: u32) -> Duration {
+        let factor = 2u32.saturating_pow(restart.saturating_sub(1));
+        self.base_delay.saturating_mul(factor).min(self.max_delay)
+    }
+}
+
+/// Закрывает цикл событий Python и отключает сохраненный клиент Telegram
+fn shutdown_python_runtime() {
+    let result = Python::with_gil(|py| -> PyResult<()> {
+        py.import("runtime_control")?
+            .getattr("shutdown")?
+            .call0()?;
+        Ok(())
+    });
+    if let Err(e) = result {
+        error!("Ошибка закрытия Python окружения автоматизации: {:?}", e);
+    }
+}
+
+/// Запускает автоматизацию и перезапускает ее с задержкой после сбоя.
+/// Интерпретатор Python живет все время работы процесса, поэтому модель OCR,
+/// шаблоны, индекс экранов и клиент Telegram сохраняются между перезапусками
+pub async fn supervise(config: Arc<SystemConfig>) -> Result<()> {
+    let settings = SupervisorConfig::from_env();
+    let mut restarts = 0u32;
+
+    let outcome = loop {
+        let started = Instant::now();
+        let result = py_automation::run_automation(Arc::clone(&config)).await;
+        let uptime = started.elapsed();
+
+        match &result {
+            Ok(true) => {
+                info!("Автоматизация успешно завершена");
+                break Ok(());
+            }
+            Ok(false) => warn!("Сессия завершилась неудачно после {:.0} сек", uptime.as_secs_f64()),
+            Err(e) => error!("Сессия завершилась с ошибкой после {:.0} сек: {}", uptime.as_secs_f64(), e),
+        }
+
+        if config.is_shutdown_requested() {
+            info!("Запрошена остановка, перезапуск не выполняется");
+            break Ok(());
+        }
+
+        // Долго работавшая сессия считается стабильной: бюджет перезапусков восстанавливается
+        if uptime >= settings.stable_after {
+            restarts = 0;
+        }
+        restarts += 1;
+        if restarts > settings.max_restarts {
+            error!("Превышено количество перезапусков ({})", settings.max_restarts);
+            break match result {
+                Err(e) => Err(e),
+                Ok(_) => Err(anyhow!("Автоматизация завершилась неудачно")),
+            };
+        }
+
+        let delay = settings.delay(restarts);
+        info!(
+            "Перезапуск сессии {}/{} через {:.0} сек",
+            restarts,
+            settings.max_restarts,
+            delay.as_secs_f64()
+        );
+        sleep(delay).await;
+    };
+
+    if let Err(e) = tokio::task::spawn_blocking(shutdown_python_runtime).await {
+        error!("Ошибка потока закрытия Python окружения: {}", e);
+    }
+    outcome
+}
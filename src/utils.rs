@@ -5,6 +5,10 @@ use std::fs;
 use crate::py_modules::py_imports::get_import_name;
 // use crate::emulation::{get_device_metadata, get_device_browser, EmulatedBrowser};
 use std::env;
+use std::collections::hash_map::DefaultHasher;
+use std::hash::{Hash, Hasher};
+use std::path::{Path, PathBuf};
+use std::time::{Duration, Instant, UNIX_EPOCH};
 
 // Пытается импортировать пакет с различными вариантами написания имени
 pub fn try_import_package(py: Python<'_>, package: &str) -> Result<()> {
@@ -82,4 +86,105 @@ pub fn delete_logs() -> Result<()> {
     }
 
     Ok(())
-}
\ No newline at end of file
+}
+
+/// Файл с отпечатком виртуального окружения последнего успешного запуска
+pub fn fingerprint_path() -> Result<PathBuf> {
+    Ok(env::current_dir()?.join("target").join("venv.fingerprint"))
+}
+
+/// Добавляет в хеш путь, время изменения и размер файла или директории
+fn hash_metadata(hasher: &mut DefaultHasher, path: &Path) {
+    path.hash(hasher);
+    if let Ok(metadata) = fs::metadata(path) {
+        metadata.len().hash(hasher);
+        if let Ok(modified) = metadata.modified() {
+            if let Ok(since_epoch) = modified.duration_since(UNIX_EPOCH) {
+                since_epoch.as_nanos().hash(hasher);
+            }
+        }
+    }
+}
+
+/// Вычисляет отпечаток окружения: содержимое requirements.txt и время изменения
+/// site-packages (меняется при установке или удалении пакетов)
+pub fn venv_fingerprint(venv_path: &Path, requirements_path: &Path) -> Result<u64> {
+    let mut hasher = DefaultHasher::new();
+    fs::read(requirements_path)?.hash(&mut hasher);
+    hash_metadata(&mut hasher, &venv_path.join("pyvenv.cfg"));
+
+    let pattern = if cfg!(windows) {
+        venv_path.join("Lib").join("site-packages")
+    } else {
+        venv_path.join("lib").join("python*").join("site-packages")
+    };
+    let pattern = pattern.to_str().ok_or_else(|| anyhow!("Невалидный путь site-packages"))?;
+    let mut site_packages: Vec<PathBuf> = glob::glob(pattern)?.filter_map(|entry| entry.ok()).collect();
+    site_packages.sort();
+    for path in &site_packages {
+        hash_metadata(&mut hasher, path);
+    }
+
+    Ok(hasher.finish())
+}
+
+/// Читает сохраненный отпечаток окружения
+pub fn read_fingerprint() -> Option<u64> {
+    let path = fingerprint_path().ok()?;
+    fs::read_to_string(path).ok()?.trim().parse().ok()
+}
+
+/// Сохраняет отпечаток окружения после успешной проверки импортов
+pub fn write_fingerprint(fingerprint: u64) -> Result<()> {
+    let path = fingerprint_path()?;
+    if let Some(parent) = path.parent() {
+        fs::create_dir_all(parent)?;
+    }
+    fs::write(path, fingerprint.to_string())?;
+    Ok(())
+}
+
+/// Проверяет импорт всех пакетов, захватывая GIL отдельно для каждого пакета
+pub fn import_sweep(packages: &[String]) -> Result<()> {
+    for package in packages {
+        Python::with_gil(|py| try_import_package(py, package)).map_err(|e| {
+            error!("Ошибка импорта пакета {}: {}", package, e);
+            anyhow!("Ошибка импорта: {}", e)
+        })?;
+    }
+    Ok(())
+}
+
+/// Замер длительности этапов запуска
+pub struct StartupTimings {
+    started: Instant,
+    phase_started: Instant,
+    phases: Vec<(&'static str, Duration)>,
+}
+
+impl StartupTimings {
+    pub fn new() -> Self {
+        let now = Instant::now();
+        Self { started: now, phase_started: now, phases: Vec::new() }
+    }
+
+    /// Завершает текущий этап и начинает следующий
+    pub fn phase(&mut self, name: &'static str) {
+        let now = Instant::now();
+        self.phases.push((name, now - self.phase_started));
+        self.phase_started = now;
+    }
+
+    /// Выводит длительность всех этапов
+    pub fn report(&self) {
+        let phases: Vec<String> = self.phases
+            .iter()
+            .map(|(name, duration)| format!("{}={:.2}с", name, duration.as_secs_f64()))
+            .collect();
+        info!(
+            "Этапы запуска: {} (всего {:.2}с)",
+            phases.join(", "),
+            self.started.elapsed().as_secs_f64()
+        );
+    }
+}